@@ -0,0 +1,90 @@
+"""
+bench_compressed.py
+
+Throughput benchmark of parsing compressed log files directly against decompressing them to disk first.
+
+A synthetic log file is generated with `benchmarks.generate_log` and compressed with gzip, bz2 and xz. For every
+compression two ways of getting its summaries are timed:
+
+- `stream`: `LogFileParser(compressed_path).parse()`, decompressing on the fly while streaming the lines.
+- `decompress+parse`: decompressing to a temporary file on disk first, then `LogFileParser(plain_path).parse()`.
+
+The plain log file itself is parsed as a reference. Every number is the best wall time of `--repeat` runs, the
+throughput is given in MB/s of decompressed log.
+
+Usage:
+    $ python -m benchmarks.bench_compressed --size-mb 50
+"""
+import argparse
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from logparser.compressed import open_log
+from logparser.log_file_parser import LogFileParser
+from benchmarks.generate_log import generate_log
+
+COMPRESSIONS = {"gzip": (gzip.open, ".gz"), "bz2": (bz2.open, ".bz2"), "xz": (lzma.open, ".xz")}
+
+
+def parse(log_file_path):
+    with warnings.catch_warnings():
+        # A multi-query log file has every header many times
+        warnings.simplefilter("ignore")
+        LogFileParser(log_file_path).parse()
+
+
+def decompress_and_parse(compressed_path, plain_path):
+    with open_log(compressed_path) as source, open(plain_path, 'wb') as target:
+        shutil.copyfileobj(source, target, 1 << 20)
+    parse(plain_path)
+    os.remove(plain_path)
+
+
+def best_of(repeat, function, *args):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    arg_parser.add_argument("--size-mb", type=float, default=20, help="Size of the generated (decompressed) log file (default: 20).")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the best one counts (default: 3).")
+    arg_parser.add_argument("--only", nargs="*", choices=list(COMPRESSIONS), help="Benchmark only these compressions.")
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file_path = os.path.join(temp_dir, "synthetic.log")
+        generate_log(log_file_path, size_mb=args.size_mb, corruption=0.01)
+        size_mb = os.path.getsize(log_file_path) / 2**20
+        repeat = max(1, args.repeat)
+
+        plain_seconds = best_of(repeat, parse, log_file_path)
+        print(f"{'input':<22}{'seconds':>10}{'MB/s':>10}{'ratio':>8}{'file MB':>10}")
+        print(f"{'plain':<22}{plain_seconds:>10.3f}{size_mb / plain_seconds:>10.1f}{1:>8.2f}{size_mb:>10.2f}")
+
+        for compression, (open_compressed, suffix) in COMPRESSIONS.items():
+            if args.only and compression not in args.only:
+                continue
+            compressed_path = log_file_path + suffix
+            with open(log_file_path, 'rb') as source, open_compressed(compressed_path, 'wb') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            compressed_mb = os.path.getsize(compressed_path) / 2**20
+
+            stream_seconds = best_of(repeat, parse, compressed_path)
+            disk_seconds = best_of(repeat, decompress_and_parse, compressed_path, os.path.join(temp_dir, "decompressed.log"))
+            for name, seconds in ((f"{compression} stream", stream_seconds), (f"{compression} decompress+parse", disk_seconds)):
+                print(f"{name:<22}{seconds:>10.3f}{size_mb / seconds:>10.1f}{seconds / plain_seconds:>8.2f}{compressed_mb:>10.2f}")
+            os.remove(compressed_path)
+
+
+if __name__ == "__main__":
+    main()
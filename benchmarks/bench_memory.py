@@ -0,0 +1,79 @@
+"""
+bench_memory.py
+
+Memory benchmark of the parsed results of many queries: nested dictionaries of floats (what the parsers used to return)
+against the compact `VertexMetrics` and `CounterGroup` records.
+
+The summaries of the bundled valid test log are taken as a template and the results of `--queries` queries are built
+from it with both representations, every query with its own values (as real queries have). The memory held by each
+set of results is measured with `tracemalloc`.
+
+Usage:
+    $ python -m benchmarks.bench_memory --queries 100000
+"""
+import argparse
+import gc
+import os
+import random
+import tracemalloc
+from logparser.log_file_parser import LogFileParser
+from logparser.records import CounterGroup, VertexMetrics
+
+TEMPLATE_LOG = os.path.join(os.path.dirname(__file__), "..", "tests", "test_data", "test_log_valid.txt")
+
+
+def template():
+    parser = LogFileParser(TEMPLATE_LOG)
+    parser.parse()
+    task_shape = list(parser.task_summary)
+    detailed_shape = {header: list(group) for header, group in parser.detailed_summary.items()}
+    return task_shape, detailed_shape
+
+
+def build_dicts(task_shape, detailed_shape, queries, rng):
+    results = []
+    for _ in range(queries):
+        task_summary = {vertice: {key: rng.random() for key in VertexMetrics.KEYS} for vertice in task_shape}
+        detailed_summary = {header: {name: rng.random() for name in names} for header, names in detailed_shape.items()}
+        results.append((task_summary, detailed_summary))
+    return results
+
+
+def build_records(task_shape, detailed_shape, queries, rng):
+    results = []
+    for _ in range(queries):
+        task_summary = {vertice: VertexMetrics(*(rng.random() for _ in VertexMetrics.KEYS)) for vertice in task_shape}
+        detailed_summary = {header: CounterGroup(names, (rng.random() for _ in names)) for header, names in detailed_shape.items()}
+        results.append((task_summary, detailed_summary))
+    return results
+
+
+def measure(build, *args):
+    """Returns the number of bytes still allocated once `build` returned its results."""
+    gc.collect()
+    tracemalloc.start()
+    results = build(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return size
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    arg_parser.add_argument("--queries", type=int, default=100000, help="Number of queries to keep in memory (default: 100000).")
+    args = arg_parser.parse_args(argv)
+
+    task_shape, detailed_shape = template()
+    dict_bytes = measure(build_dicts, task_shape, detailed_shape, args.queries, random.Random(0))
+    record_bytes = measure(build_records, task_shape, detailed_shape, args.queries, random.Random(0))
+
+    print(f"{args.queries} queries, {len(task_shape)} vertices and "
+          f"{sum(len(names) for names in detailed_shape.values())} counters each")
+    print(f"dicts:   {dict_bytes / 2**20:9.1f} MB  ({dict_bytes / args.queries:7.0f} bytes/query)")
+    print(f"records: {record_bytes / 2**20:9.1f} MB  ({record_bytes / args.queries:7.0f} bytes/query)")
+    print(f"records use {record_bytes / dict_bytes:.0%} of the memory of dicts")
+
+
+if __name__ == "__main__":
+    main()
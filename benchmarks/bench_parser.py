@@ -0,0 +1,195 @@
+"""
+bench_parser.py
+
+Throughput and peak memory benchmarks of the parser hot paths.
+
+A synthetic log file is generated with `benchmarks.generate_log` (or an existing log file is used) and the following
+are measured separately:
+
+- `parse`: `LogFileParser.parse()` with the default memory mapped header search.
+- `parse_stream`: `LogFileParser.parse()` with `stream=True`.
+- `iter_queries`: `LogFileParser.iter_queries()`, every query of the file.
+- `query_summary`, `task_summary`, `detailed_metrics`: `QuerySummary`, `TaskExecutionSummary` and `DetailedMetrics` on
+  the section lines of every query, extracted beforehand so only the section parser itself is timed.
+
+Every benchmark reports the best wall time of `--repeat` runs, its throughput (MB/s of log file, or lines/s of section
+lines) and its peak memory (measured with `tracemalloc` in a separate run, since tracing slows everything down). The
+results can be written to a JSON file and compared with the JSON file of an earlier commit.
+
+Usage:
+    $ python -m benchmarks.bench_parser --size-mb 50 --output before.json
+    $ git checkout my-branch
+    $ python -m benchmarks.bench_parser --size-mb 50 --output after.json --compare before.json
+
+Notes:
+    With `--compare` the exit code is 1 if any benchmark got slower than the baseline by more than `--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from logparser.detailed_metrics import DetailedMetrics
+from logparser.log_file_parser import LogFileParser
+from logparser.query_summary import QuerySummary
+from logparser.section_stream import SECTIONS, SectionStream, QUERY_COMPLETED, iter_log_lines
+from logparser.task_execution_summary import TaskExecutionSummary
+from benchmarks.generate_log import generate_log
+
+
+def section_lines(log_file_path):
+    """Returns the lines of the three sections of every query block, as three lists of (idx, line) lists."""
+    blocks = ([], [], [])
+    sections = SectionStream(warn_duplicates=False)
+    with open(log_file_path, 'rb') as file:
+        for idx, _, line in iter_log_lines(file):
+            sections.feed(idx, line)
+            if QUERY_COMPLETED in line:
+                for block, (header, _, _) in zip(blocks, SECTIONS):
+                    if sections.section_lines[header]:
+                        block.append(sections.section_lines[header])
+                sections = SectionStream(warn_duplicates=False)
+    return blocks
+
+
+def parse(log_file_path, stream=False):
+    with warnings.catch_warnings():
+        # A multi-query log file has every header many times
+        warnings.simplefilter("ignore")
+        LogFileParser(log_file_path, stream=stream).parse()
+
+
+def iter_queries(log_file_path):
+    for _ in LogFileParser(log_file_path).iter_queries():
+        pass
+
+
+def run_section_parser(parser_class, blocks):
+    for lines in blocks:
+        parser_class(lines).data
+
+
+def measure(function, args, repeat):
+    """Returns the best wall time of `repeat` runs and the peak traced memory of one more run."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(log_file_path, repeat=3, selected=None):
+    """Runs the benchmarks on a log file and returns their results as a dictionary."""
+    size = os.path.getsize(log_file_path)
+    query_lines, task_lines, detailed_lines = section_lines(log_file_path)
+    benchmarks = {
+        "parse": (parse, (log_file_path,), size, None),
+        "parse_stream": (parse, (log_file_path, True), size, None),
+        "iter_queries": (iter_queries, (log_file_path,), size, None),
+        "query_summary": (run_section_parser, (QuerySummary, query_lines), None, sum(map(len, query_lines))),
+        "task_summary": (run_section_parser, (TaskExecutionSummary, task_lines), None, sum(map(len, task_lines))),
+        "detailed_metrics": (run_section_parser, (DetailedMetrics, detailed_lines), None, sum(map(len, detailed_lines))),
+    }
+
+    results = {}
+    for name, (function, args, num_bytes, num_lines) in benchmarks.items():
+        if selected and name not in selected:
+            continue
+        seconds, peak = measure(function, args, repeat)
+        result = {"seconds": seconds, "peak_kb": peak / 1024}
+        if num_bytes is not None:
+            result["mb_per_s"] = num_bytes / 2**20 / max(seconds, 1e-9)
+        if num_lines is not None:
+            result["lines_per_s"] = num_lines / max(seconds, 1e-9)
+        results[name] = result
+    return results
+
+
+def compare(results, baseline, threshold, file=None):
+    """Prints the ratio of every benchmark against the baseline, returns the names of the ones that got slower."""
+    file = file or sys.stdout
+    regressions = []
+    print(f"{'benchmark':<18}{'baseline s':>12}{'now s':>12}{'ratio':>8}{'peak ratio':>12}", file=file)
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        peak_ratio = result["peak_kb"] / max(before["peak_kb"], 1e-9)
+        flag = "  SLOWER" if ratio > 1 + threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<18}{before['seconds']:>12.4f}{result['seconds']:>12.4f}{ratio:>8.2f}{peak_ratio:>12.2f}{flag}", file=file)
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the parser hot paths on a synthetic (or given) log file.")
+    arg_parser.add_argument("--log", help="Benchmark this log file instead of generating one.")
+    arg_parser.add_argument("--size-mb", type=float, default=20, help="Size of the generated log file (default: 20).")
+    arg_parser.add_argument("--vertices", type=int, default=5, help="Vertices per query of the generated log (default: 5).")
+    arg_parser.add_argument("--counters", type=int, default=17, help="Counters per query of the generated log (default: 17).")
+    arg_parser.add_argument("--corruption", type=float, default=0.01, help="Share of corrupted summary lines (default: 0.01).")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed of the generated log (default: 0).")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the best one counts (default: 3).")
+    arg_parser.add_argument("--only", nargs="*", help="Run only these benchmarks.")
+    arg_parser.add_argument("--output", help="Write the results to this JSON file.")
+    arg_parser.add_argument("--compare", help="Compare the results with this JSON file of an earlier run.")
+    arg_parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown that counts as a regression with --compare (default: 0.1).")
+    args = arg_parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in ("size_mb", "vertices", "counters", "corruption", "seed")}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file_path = args.log
+        if log_file_path is None:
+            log_file_path = os.path.join(temp_dir, "synthetic.log")
+            generate_log(log_file_path, vertices=args.vertices, counters=args.counters, corruption=args.corruption,
+                         size_mb=args.size_mb, seed=args.seed)
+        results = run_benchmarks(log_file_path, max(1, args.repeat), args.only)
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "log": args.log,
+            "params": None if args.log else params,
+        },
+        "results": results,
+    }
+    for name, result in results.items():
+        throughput = f"{result['mb_per_s']:9.2f} MB/s" if "mb_per_s" in result else f"{result['lines_per_s']:9.0f} lines/s"
+        print(f"{name:<18}{result['seconds']:9.4f}s {throughput}  peak {result['peak_kb']:10.1f} KB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+fuzz_parsers.py
+
+Equivalence fuzzing of the section parsers against the reference regexes, and a regex backtracking check.
+
+`QuerySummary`, `TaskExecutionSummary` and `DetailedMetrics` have been rewritten for speed (one shared, precompiled
+classifier per section, compact records, bounded error collection). Every such engine has to give exactly the results
+the original per-parser regexes gave, which are kept here as the reference: `reference_query_summary`,
+`reference_task_summary` and `reference_detailed_metrics` are the parse loops of the first version of the parsers.
+
+The fuzzer mutates the summary lines of the test logs and of a generated log (characters inserted, deleted, replaced
+and duplicated, spans repeated, lines cut, prefixes changed) into as many lines as asked for, feeds them to an engine
+and to its reference in chunks and compares summaries and error messages. A chunk that differs is searched for the
+first line that differs on its own, so a mismatch is reported as one short line. Long runs are spread over worker
+processes, every worker with its own seed.
+
+The backtracking check times a line matcher on inputs made of a repeated unit at growing lengths and reports the
+(prefix, unit, tail) inputs whose time grows faster than linearly, e.g. nested quantifiers like
+`([a-zA-Z()]+(?:\\s[a-zA-Z()]+)*?)\\s+` retried at every split of a long corrupt line. These timings depend on the
+load of the machine, so they are only run here (and not in the unit tests): before trusting an empty report the check
+makes sure it does flag `FORMER_METRIC_PATTERN`, the quadratic metric value pattern it found in the first DetailedMetrics.
+
+Functions:
+- `reference_query_summary(lines)`, `reference_task_summary(lines)`, `reference_detailed_metrics(lines)`: The reference parsers.
+- `seed_lines()`: The summary lines the mutations start from, per section.
+- `mutate(line, rng)`: Returns a randomly mutated copy of a line.
+- `fuzz_lines(section, count, seed)`: Yields `count` mutated lines of a section.
+- `compare(section, lines, engine, chunk_size)`: Returns the lines on which an engine and the reference differ.
+- `fuzz(sections, count, seed, workers)`: Compares the engines with the references on `count` mutated lines per section.
+- `growth(match, make_line, sizes)`: Returns the exponent of the matching time growth, about 1 for linear time.
+- `find_backtracking(match, prefixes, threshold)`: Returns the repeated-unit inputs on which a matcher is superlinear.
+- `check_sensitivity(threshold)`: Returns the growth exponent of the former metric value pattern, and whether it was flagged.
+
+Usage:
+    $ python -m benchmarks.fuzz_parsers --lines 1000000 --workers 4 --seed 1
+
+Notes:
+    A reference parser crashes (ValueError from float()) on the lines whose value matches the pattern but is no
+    number, e.g. `INFO  :    HDFS_READ_OPS: ` or `INFO  : Run DAG 1.2.3s`. The engines report these lines as corrupt,
+    so the references here do too. The exit code is 1 if any mismatch or superlinear matcher was found.
+"""
+import argparse
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from logparser.detailed_metrics import DetailedMetrics
+from logparser.line_classifier import DETAILED_CLASSIFIER, QUERY_CLASSIFIER, TASK_CLASSIFIER
+from logparser.query_summary import QuerySummary
+from logparser.section_stream import SECTIONS, SectionStream, iter_log_lines
+from logparser.task_execution_summary import TaskExecutionSummary
+from benchmarks.generate_log import generate_log
+
+SECTION_NAMES = ("query_summary", "task_summary", "detailed_summary")
+ENGINES = {
+    "query_summary": QuerySummary,
+    "task_summary": TaskExecutionSummary,
+    "detailed_summary": DetailedMetrics,
+}
+TEST_LOGS = ("tests/test_data/test_log_valid.txt", "tests/test_data/test_log_semivalid.txt",
+             "tests/test_data/test_log_multi_query.txt")
+
+CRITICAL_OPERATIONS = ("Compile Query", "Prepare Plan", "Get Query Coordinator (AM)", "Submit Plan", "Start DAG", "Run DAG")
+
+# Characters the patterns care about, and a few they must not be confused by. No line breaks: a line never holds one
+ALPHABET = "0123456789.,:;()_- \t\xa0aAzZsSmMDINFOxé٣﻿"
+
+
+def reference_query_summary(lines):
+    """The original QuerySummary parse loop, returns (summary, error messages)."""
+    pattern = re.compile(r"^INFO\s{2}:\s([a-zA-Z()]+(?:\s[a-zA-Z()]+)*?)\s+([\d.]+)s")
+    summary, errors, encountered = {}, [], set()
+    for idx, line in lines:
+        match = pattern.search(line)
+        try:
+            duration = float(match.group(2)) if match else None
+        except ValueError:
+            match = None
+        if match:
+            operation = match.group(1).rstrip()
+            summary[operation] = f'{duration:.2f}'
+            encountered.add(operation)
+        else:
+            errors.append(f"Err parsing idx: {idx}, line: '{line.rstrip()}'. Line has corrupt structure... skipped")
+    for operation in CRITICAL_OPERATIONS:
+        if operation not in encountered:
+            errors.append(f"Critical operation: '{operation}' missing in the log data.")
+    return summary, errors
+
+
+def reference_task_summary(lines):
+    """The original TaskExecutionSummary parse loop, returns (summary, error messages)."""
+    pattern = re.compile(r"^INFO\s{2}:\s+([a-zA-Z]+)\s(\d+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)")
+    keys = ("DURATION", "CPU_TIME", "GC_TIME", "INPUT_RECORDS", "OUTPUT_RECORDS")
+    summary, errors = {}, []
+    for idx, line in lines:
+        line = line.replace(",", "")
+        match = pattern.search(line)
+        try:
+            metrics = dict(zip(keys, map(float, match.groups()[2:]))) if match else None
+        except ValueError:
+            match = None
+        if match:
+            summary[f"{match.group(1)} {match.group(2)}"] = metrics
+        else:
+            errors.append(f"Err parsing idx: {idx}, line: '{line}'. Line has corrupt structure... skipped")
+    return summary, errors
+
+
+def reference_detailed_metrics(lines):
+    """The original DetailedMetrics parse loop, returns (summary, error messages)."""
+    header_pattern = re.compile(r"^INFO\s{2}:\s([\w\s\.]+):$")
+    metric_pattern = re.compile(r"^INFO\s{2}:\s{4}([\w_]+):\s(\d+.\d*|\d*)$")
+    data, errors, current_header = {}, [], None
+    for idx, line in lines:
+        if header_pattern.search(line):
+            split_line = line.split("INFO  : ")
+            if len(split_line) < 2:
+                errors.append(f"Unexpected header format at idx: {idx}, line: '{line}'.")
+                continue
+            current_header = split_line[1].split(":")[0].strip()
+            data[current_header] = {}
+            continue
+        match = metric_pattern.search(line)
+        if match and current_header:
+            try:
+                data[current_header][match.group(1)] = float(match.group(2))
+                continue
+            except ValueError:
+                pass
+        errors.append(f"Err parsing idx: {idx}, line: '{line}'. Corrupt line, failed to match either header or metric pattern... skipped")
+    return data, errors
+
+
+REFERENCES = {
+    "query_summary": reference_query_summary,
+    "task_summary": reference_task_summary,
+    "detailed_summary": reference_detailed_metrics,
+}
+
+
+@lru_cache(maxsize=None)
+def seed_lines():
+    """Returns {section name: tuple of lines} of the summary sections of the test logs and of a generated log."""
+    seeds = {name: [] for name in SECTION_NAMES}
+    with tempfile.TemporaryDirectory() as directory:
+        generated = os.path.join(directory, "generated.log")
+        generate_log(generated, queries=20, vertices=6, counters=20, corruption=0.1, seed=0)
+        for path in TEST_LOGS + (generated,):
+            sections = SectionStream(warn_duplicates=False)
+            with open(path, 'rb') as file:
+                for idx, _, line in iter_log_lines(file):
+                    sections.feed(idx, line)
+            for name, (header, _, _) in zip(SECTION_NAMES, SECTIONS):
+                seeds[name].extend(line for _, line in sections.section_lines[header])
+    return {name: tuple(dict.fromkeys(lines)) for name, lines in seeds.items()}
+
+
+def mutate(line, rng):
+    """Returns a copy of the line with one to three random mutations."""
+    for _ in range(rng.randint(1, 3)):
+        pos = rng.randint(0, len(line))
+        kind = rng.randrange(8)
+        if kind == 0:
+            line = line[:pos] + rng.choice(ALPHABET) + line[pos:]
+        elif kind == 1:
+            line = line[:pos] + line[pos + 1:]
+        elif kind == 2:
+            line = line[:pos] + rng.choice(ALPHABET) + line[pos + 1:]
+        elif kind == 3:
+            # Repeat a short span, e.g. a digit run or the spaces between the columns
+            end = min(len(line), pos + rng.randint(1, 4))
+            line = line[:end] + line[pos:end] * rng.randint(1, 8) + line[end:]
+        elif kind == 4:
+            line = line[:pos]
+        elif kind == 5:
+            line = line.replace("INFO  :", rng.choice(("INFO :", "INFO   :", "INFO\t\t:", "WARN  :", "")), 1)
+        elif kind == 6:
+            line = line.replace(" ", rng.choice(("", "  ", "\t")), rng.randint(1, 3))
+        else:
+            line = line.upper() if rng.random() < 0.5 else line.lower()
+    return line
+
+
+def fuzz_lines(section, count, seed=0):
+    """Yields `count` lines of a section, a fifth unchanged seed lines and the others mutated."""
+    rng = random.Random(f"{section}:{seed}")
+    seeds = seed_lines()[section]
+    for _ in range(count):
+        line = rng.choice(seeds)
+        yield line if rng.random() < 0.2 else mutate(line, rng)
+
+
+def _results(parser, lines):
+    summary, errors = parser(lines)
+    summary = {key: dict(value) if hasattr(value, "keys") else value for key, value in (summary or {}).items()}
+    return summary, list(errors)
+
+
+def _engine_results(engine, lines):
+    # Keep every error, the references do not bound them
+    return _results(lambda lines: engine(lines, max_errors=None).data, lines)
+
+
+def compare(section, lines, engine=None, chunk_size=1000):
+    """
+    Returns the lines on which an engine (the current parser of the section by default) and the reference differ.
+
+    The lines are compared in chunks, within a differing chunk every line is compared on its own (after the first
+    header line of the chunk for the detailed metrics, whose metrics only count below a header).
+    """
+    engine = engine or ENGINES[section]
+    reference = REFERENCES[section]
+    lines = list(lines)
+    mismatches = []
+    for start in range(0, len(lines), chunk_size):
+        chunk = list(enumerate(lines[start:start + chunk_size], start))
+        if _engine_results(engine, chunk) == _results(reference, chunk):
+            continue
+        context = [pair for pair in chunk if pair[1].endswith(":")][:1] if section == "detailed_summary" else []
+        for pair in chunk:
+            single = context + [pair]
+            if _engine_results(engine, single) != _results(reference, single):
+                mismatches.append(pair[1])
+        if not mismatches:
+            # Only the combination of lines differs, report the chunk as a whole
+            mismatches.append("\n".join(line for _, line in chunk))
+    return mismatches
+
+
+def _fuzz_worker(section, count, seed):
+    start = time.perf_counter()
+    mismatches = compare(section, fuzz_lines(section, count, seed))
+    return section, count, mismatches, time.perf_counter() - start
+
+
+def fuzz(sections=SECTION_NAMES, count=100000, seed=0, workers=1):
+    """Compares the engines with the references on `count` mutated lines per section, returns {section: (mismatches, seconds)}."""
+    per_worker = -(-count // workers)
+    jobs = [(section, min(per_worker, count - i * per_worker), seed * workers + i)
+            for section in sections for i in range(workers) if count > i * per_worker]
+    report = {section: ([], 0.0) for section in sections}
+    if workers == 1:
+        results = [_fuzz_worker(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_fuzz_worker, *zip(*jobs)))
+    for section, _, mismatches, seconds in results:
+        found, total = report[section]
+        report[section] = (found + mismatches, total + seconds)
+    return report
+
+
+def _best_time(match, line, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        match(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def growth(match, make_line, sizes=(1000, 4000), repeat=3):
+    """Returns the exponent k of time ~ size^k of `match` on the lines `make_line(size)`, about 1 for linear time."""
+    small, large = sizes
+    # Below the timer resolution everything looks flat
+    small_time = max(_best_time(match, make_line(small), repeat), 1e-7)
+    large_time = max(_best_time(match, make_line(large), repeat), 1e-7)
+    return math.log(large_time / small_time) / math.log(large / small)
+
+
+BACKTRACKING_UNITS = ("a", " ", "1", ".", "(", ":", "_", "\t", "a ", "1 ", "1.", "a:", " 1", "(a) ", "1a", "a 1")
+BACKTRACKING_TAILS = ("", "x", "s", " s", ":", " :")
+
+
+def find_backtracking(match, prefixes=("INFO  : ",), threshold=1.5, min_seconds=1e-4):
+    """
+    Returns [(exponent, prefix, unit, tail)] of the inputs `prefix + unit * n + tail` (single and double units) on which
+    `match` takes superlinear time, i.e. grows with an exponent above `threshold` and takes at least `min_seconds`.
+    """
+    found = []
+    units = BACKTRACKING_UNITS + tuple(a + b for a in BACKTRACKING_UNITS for b in BACKTRACKING_UNITS if a != b)
+    for prefix in prefixes:
+        for unit in units:
+            for tail in BACKTRACKING_TAILS:
+                make_line = lambda size: prefix + unit * (size // len(unit)) + tail
+                if _best_time(match, make_line(4000), 1) < min_seconds:
+                    continue
+                exponent = growth(match, make_line)
+                if exponent > threshold:
+                    found.append((exponent, prefix, unit, tail))
+    return sorted(found, reverse=True)
+
+
+# The metric value pattern of the first DetailedMetrics, quadratic on a long run of digits followed by a non digit
+FORMER_METRIC_PATTERN = re.compile(r"^INFO\s{2}:\s{4}([\w_]+):\s(\d+.\d*|\d*)$")
+
+
+def check_sensitivity(threshold=1.5):
+    """Returns (exponent, flagged) of the former metric value pattern, a check that does not flag it is too noisy to trust."""
+    exponent = growth(FORMER_METRIC_PATTERN.match, lambda size: "INFO  :    HDFS_READ_OPS: " + "1" * size + " :")
+    return exponent, exponent > threshold
+
+
+MATCHERS = {
+    "query_summary": (QUERY_CLASSIFIER.pattern.match, ("INFO  : ", "INFO  : Run DAG ")),
+    "task_summary": (TASK_CLASSIFIER.pattern.match, ("INFO  : ", "INFO  :   Map 1 ")),
+    "detailed_summary": (DETAILED_CLASSIFIER.pattern.match, ("INFO  : ", "INFO  :    HDFS_READ_OPS: ")),
+}
+
+
+def main(argv=None):
+    """Runs the fuzzer and the backtracking check, prints a report and returns the exit code."""
+    parser = argparse.ArgumentParser(description="Fuzz the section parsers against the reference regexes.")
+    parser.add_argument("--lines", type=int, default=100000, help="Mutated lines per section.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("--sections", nargs="+", choices=SECTION_NAMES, default=SECTION_NAMES)
+    parser.add_argument("--no-backtracking", action="store_true", help="Skip the backtracking check.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for section, (mismatches, seconds) in fuzz(args.sections, args.lines, args.seed, args.workers).items():
+        print(f"{section:18s} {args.lines:>10,} lines  {args.lines / seconds:>10,.0f} lines/s  {len(mismatches)} mismatches")
+        for line in mismatches[:10]:
+            print(f"    {line!r}")
+        failed |= bool(mismatches)
+
+    if not args.no_backtracking:
+        exponent, flagged = check_sensitivity()
+        print(f"{'self check':18s} n^{exponent:.1f} on the former metric value pattern, {'flagged' if flagged else 'NOT flagged'}")
+        failed |= not flagged
+        for section in args.sections:
+            match, prefixes = MATCHERS[section]
+            found = find_backtracking(match, prefixes)
+            print(f"{section:18s} {len(found)} superlinear inputs")
+            for exponent, prefix, unit, tail in found[:10]:
+                print(f"    n^{exponent:.1f}: {prefix!r} + {unit!r} * n + {tail!r}")
+            failed |= bool(found)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
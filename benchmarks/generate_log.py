@@ -0,0 +1,112 @@
+"""
+generate_log.py
+
+Synthetic HiveServer2/beeline log generator for the benchmarks.
+
+Writes a log file made of query blocks like the ones in `tests/test_data`: some INFO noise, a Query Execution Summary,
+a Task Execution Summary, the DAG counters and the `Completed executing command(queryId=...)` line. The number of
+queries, vertices and counters, the amount of noise and the share of corrupted summary lines are configurable, and the
+output is deterministic for a given seed so results can be compared between commits.
+
+Usage:
+    $ python -m benchmarks.generate_log /tmp/synthetic.log --size-mb 100 --vertices 20 --counters 60 --corruption 0.01
+
+    from benchmarks.generate_log import generate_log
+    generate_log("/tmp/synthetic.log", queries=1000, vertices=8, counters=40, seed=1)
+
+Notes:
+    With `size_mb` the generator keeps adding queries until the file reaches that size, `queries` is then ignored.
+"""
+import argparse
+import random
+
+SEPARATOR = "INFO  : " + "-" * 94
+OPERATIONS = ("Compile Query", "Prepare Plan", "Get Query Coordinator (AM)", "Submit Plan", "Start DAG", "Run DAG")
+COUNTER_GROUPS = ("org.apache.tez.common.counters.DAGCounter", "File System Counters", "TaskCounter_Map_1_INPUT_Map_1",
+                  "HIVE", "Shuffle Errors", "org.apache.hadoop.hive.ql.exec.tez.HiveInputCounters")
+NOISE = (
+    "INFO  : Executing command(queryId={query_id}): SELECT * FROM t WHERE id = {n}",
+    "INFO  : Status: Running (Executing on YARN cluster with App id application_1588297860551_{n})",
+    "INFO  : Map 1: {n}(+12)/58\tReducer 2: 0/1",
+    "WARN  : Hive-on-MR is deprecated in Hive 2 and may not be available in the future versions.",
+    "2020-05-01 14:40:51,{n} DEBUG [main] session.SessionState: Session is using the default metastore client",
+    "",
+)
+
+
+def _corrupt(line, rng):
+    """Breaks a summary line the way real logs get broken: cut off, garbled or with stray characters."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        return line[:len(line) // 2]
+    if kind == 1:
+        return line + rng.choice(("dsad", "##", " ?"))
+    return line.replace(":", ";", 1)
+
+
+def query_lines(rng, query_number, vertices, counters, corruption, noise_lines):
+    """Returns the lines of one complete query block."""
+    query_id = f"hive_20200501144051_{query_number:08x}-b08a-45f2-a2af-{rng.getrandbits(48):012x}"
+    lines = [rng.choice(NOISE).format(query_id=query_id, n=rng.randrange(100000)) for _ in range(noise_lines)]
+
+    def data(line):
+        # Only the data lines get corrupted, broken headers or separators would change the section boundaries
+        return _corrupt(line, rng) if corruption and rng.random() < corruption else line
+
+    lines += ["INFO  : Query Execution Summary", SEPARATOR, "INFO  : OPERATION                            DURATION", SEPARATOR]
+    lines += [data(f"INFO  : {operation:<36}{rng.uniform(0, 120):>8.2f}s") for operation in OPERATIONS]
+    lines += [SEPARATOR, "INFO  : "]
+
+    lines += ["INFO  : Task Execution Summary", SEPARATOR,
+              "INFO  :   VERTICES      DURATION(ms)   CPU_TIME(ms)    GC_TIME(ms)   INPUT_RECORDS   OUTPUT_RECORDS", SEPARATOR]
+    for i in range(vertices):
+        vertex = f"{'Map' if i % 3 else 'Reducer'} {i + 1}"
+        lines.append(data(f"INFO  : {vertex:>10}  {rng.uniform(0, 100000):>16.2f} {rng.randrange(10**7):>14,} "
+                          f"{rng.randrange(10**5):>14,} {rng.randrange(10**9):>15,} {rng.randrange(10**6):>16,}"))
+    lines += [SEPARATOR, "INFO  : "]
+
+    # Spread the counters over the groups, the DAGCounter group always comes first
+    groups = COUNTER_GROUPS[:max(1, min(len(COUNTER_GROUPS), counters // 8))]
+    for i, group in enumerate(groups):
+        lines.append(f"INFO  : {group}:")
+        lines += [data(f"INFO  :    COUNTER_{j}: {rng.randrange(10**9)}") for j in range(i, counters, len(groups))]
+
+    lines.append(f"INFO  : Completed executing command(queryId={query_id}); Time taken: {rng.uniform(0, 300):.3f} seconds")
+    lines.append("INFO  : OK")
+    return lines
+
+
+def generate_log(path, queries=100, vertices=5, counters=17, corruption=0.0, noise_lines=20, size_mb=None, seed=0):
+    """Writes a synthetic log file, returns the number of queries and bytes written."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024 if size_mb else None
+    written = 0
+    query_number = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as file:
+        while (written < target) if target else (query_number < queries):
+            text = "\n".join(query_lines(rng, query_number, vertices, counters, corruption, noise_lines)) + "\n"
+            file.write(text)
+            written += len(text.encode('utf-8'))
+            query_number += 1
+    return query_number, written
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic HiveServer2/beeline log file.")
+    arg_parser.add_argument("path", help="Path of the log file to write.")
+    arg_parser.add_argument("--queries", type=int, default=100, help="Number of queries (default: 100).")
+    arg_parser.add_argument("--size-mb", type=float, help="Keep adding queries until the file has this size, instead of --queries.")
+    arg_parser.add_argument("--vertices", type=int, default=5, help="Vertices per Task Execution Summary (default: 5).")
+    arg_parser.add_argument("--counters", type=int, default=17, help="DAG counters per query (default: 17).")
+    arg_parser.add_argument("--corruption", type=float, default=0.0, help="Share of corrupted summary lines, 0 to 1 (default: 0).")
+    arg_parser.add_argument("--noise", type=int, default=20, help="Noise lines before every query (default: 20).")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    args = arg_parser.parse_args(argv)
+
+    queries, written = generate_log(args.path, args.queries, args.vertices, args.counters, args.corruption,
+                                    args.noise, args.size_mb, args.seed)
+    print(f"Wrote {queries} queries ({written / 2**20:.2f} MB) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,23 @@ Modules:
 - `QuerySummary`: Provides functionality to parse and extract summary metrics related to query execution.
 - `TaskExecutionSummary`: Used for parsing and summarizing metrics related to task executions in the log.
 - `DetailedMetrics`: Captures more granular metrics and details from the log, organizing them under relevant headers.
+- `LineClassifier`: Shared, precompiled classification of summary lines into typed (kind, values) tokens, used by the three section parsers.
+- `ErrorCollector`: Bounded collection of the parse errors, counted per error code with the first records of each kept, read like a list of messages.
+- `SectionRegistry`, `register_section`: The header, offset, end marker and parser of every section the parser collects, more sections can be registered.
+- `VertexMetrics`, `CounterGroup`: Compact, read-only records holding the metrics of a vertex and of a counter group, used like dictionaries.
+- `QueryRecord`: Holds the summaries and errors of a single query when a log file with many queries is parsed query by query.
+- `parse_parallel`: Parses a multi-query log file in byte ranges across a process pool and returns its `QueryRecord`s in order.
+- `aiter_queries`: Asynchronously yields a `QueryRecord` for every query of an async byte stream (socket, pipe, ...), parsing in an executor.
+- `LogFollower`: Follows a live, growing log file and parses each query as soon as it completes, keeping its progress in a checkpoint file.
+- `ResultCache`: Size bounded on-disk cache of parse results, so a log file that was parsed before is not read again.
+- `ResultWriter`: Writes the result files of save() atomically, through a temporary file swapped in with os.replace.
+- `ColumnarWriter`, `ColumnarReader`: Append the numbers of many parsed logs to one binary columnar file and read single columns back through a memory map.
+- `Aggregator`: Folds the results of many parses into mergeable, bounded-memory totals and p50/p95/p99 sketches per vertex type and counter.
+- `Baseline`, `RegressionDetector`: Per query fingerprint baseline of the phase and vertex durations, and the detection of runs beyond its thresholds.
+- `VertexTable`: Column wise vertex metrics of many queries with their CPU ratio, GC share, records/s, record ratio, fan-in/out and critical path.
+- `SQLiteIndex`: Writes every parsed query (queryId, file, offset, durations, vertices, counters) into an indexed SQLite database in batches.
+- `ParserService`: Resident pool of warm parser processes answering parse jobs as JSON over a Unix socket or localhost HTTP (`logparser.daemon`).
+- `ParserStats`: Opt-in per-stage timings and line/byte/match/error counters of `LogFileParser` (`LogFileParser(path, stats=True)`).
 - `LogFileParser`: Acts as a comprehensive parser that coordinates the parsing of all sections of the log, handling errors, and organizing results.
 
 This `__init__.py` file makes the classes from these modules directly accessible under the `logparser` namespace for convenience.
@@ -16,9 +33,47 @@ Example:
 
 Note:
     To extend the capabilities of this package, new modules can be added, and their primary classes or functions should be imported here for better accessibility.
+    `aiter_queries` and `ParserService` are imported on first access, so `import logparser` does not load asyncio and
+    the http/socket server modules.
 """
+import importlib
 from logparser.query_summary import QuerySummary
 from logparser.task_execution_summary import TaskExecutionSummary
 from logparser.detailed_metrics import DetailedMetrics
+from logparser.line_classifier import LineClassifier
+from logparser.error_collector import ErrorCollector
+from logparser.section_registry import SectionRegistry, register_section
+from logparser.records import VertexMetrics, CounterGroup
+from logparser.query_stream import QueryRecord
+from logparser.result_cache import ResultCache
+from logparser.result_writer import ResultWriter
+from logparser.columnar import ColumnarWriter, ColumnarReader
+from logparser.aggregation import Aggregator
+from logparser.regression import Baseline, RegressionDetector
+from logparser.vertex_analysis import VertexTable
+from logparser.instrumentation import ParserStats
 from logparser.log_file_parser import LogFileParser
+from logparser.parallel_parser import parse_parallel
+from logparser.sqlite_index import SQLiteIndex
+from logparser.log_follower import LogFollower
+
+# asyncio and the http/socket servers cost more to import than the rest of the package, so only the code that uses them
+# pays for it: these names are imported on first access
+_LAZY = {
+    "aiter_queries": "logparser.async_parser",
+    "ParserService": "logparser.daemon",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'logparser' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
@@ -0,0 +1,346 @@
+"""
+aggregation.py
+
+Cross-run aggregation of task and counter metrics in bounded memory.
+
+After thousands of logs have been parsed the interesting numbers are distributions: the p50/p95/p99 and the total of
+`DURATION`, `CPU_TIME` and `GC_TIME` per vertex type (Map, Reducer, ...) and of every counter of the detailed metrics.
+Keeping every value to sort them later grows with the number of logs, so the values are folded into streaming sketches
+instead: exact running counts, totals, minimums and maximums, and a quantile sketch with a bounded number of buckets.
+
+Every piece can be merged: workers aggregate the logs they parsed locally, send their `Aggregator` back (it pickles, or
+goes through to_dict()/from_dict() as JSON) and the results are merged into one.
+
+Classes:
+- `QuantileSketch`: Mergeable quantile sketch with a guaranteed relative error and a bounded number of buckets.
+- `MetricSummary`: Count, total, min, max and quantile sketch of one metric.
+- `Aggregator`: Folds parse results into a MetricSummary per (vertex type, metric) and per (counter group, counter).
+"""
+import math
+from collections.abc import Mapping
+
+VERTEX_METRICS = ("DURATION", "CPU_TIME", "GC_TIME")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """
+    QuantileSketch estimates the quantiles of a stream of non-negative values with a bounded relative error.
+
+    Attributes:
+        relative_accuracy (float): Every quantile is within this relative distance of a value of the stream of that rank.
+        max_buckets (int): Maximum number of buckets kept, the memory used never grows beyond it.
+        count (int): Number of values added.
+        zeros (int): Number of values that were 0.
+
+    Methods:
+        __init__(self, relative_accuracy, max_buckets): Constructor that initializes an empty sketch.
+        add(self, value, count): Adds a value (`count` times).
+        merge(self, other): Adds all values of another sketch with the same accuracy.
+        quantile(self, q): Returns the estimated q-quantile (0 <= q <= 1), None for an empty sketch.
+        to_dict(self): Returns the sketch as a JSON serializable dictionary.
+        from_dict(cls, state): Builds a sketch back from a dictionary made by to_dict().
+
+    Description:
+        The value range is cut in buckets growing geometrically by `gamma = (1 + a) / (1 - a)`, value x falls in bucket
+        ceil(log_gamma(x)) and only the count of every bucket is kept (the approach of DDSketch). Any value of a bucket
+        is within the relative accuracy `a` of the middle of the bucket, which is what quantile() returns. Two sketches
+        with the same accuracy merge exactly, by adding up their bucket counts, so merging the sketches of several
+        workers gives the very same sketch as adding all values to one.
+
+    Notes:
+        When more than `max_buckets` buckets are needed the lowest ones are collapsed into each other, so only the
+        lowest quantiles lose their accuracy and p95/p99 keep it. With the default 1% accuracy 2048 buckets cover
+        values from 1 to about 10^17.
+    """
+    __slots__ = ("relative_accuracy", "max_buckets", "count", "zeros", "_log_gamma", "_buckets")
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """Constructor that initializes an empty sketch."""
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        if max_buckets < 1:
+            raise ValueError(f"max_buckets must be at least 1, got {max_buckets}")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.count = 0
+        self.zeros = 0
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._buckets = {}
+
+    def add(self, value, count=1):
+        """Adds a value (`count` times)."""
+        if value > 0:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[key] = self._buckets.get(key, 0) + count
+            if len(self._buckets) > self.max_buckets:
+                self._collapse()
+        elif value == 0:
+            self.zeros += count
+        else:
+            raise ValueError(f"Only non-negative values can be added, got {value}")
+        self.count += count
+
+    def merge(self, other):
+        """Adds all values of another sketch with the same accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(f"Can not merge sketches of different accuracy: {self.relative_accuracy} and {other.relative_accuracy}")
+        for key, count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """Folds the lowest buckets into the lowest one that is kept, until only max_buckets are left."""
+        keys = sorted(self._buckets)
+        excess = len(keys) - self.max_buckets
+        kept = keys[excess]
+        self._buckets[kept] += sum(self._buckets.pop(key) for key in keys[:excess])
+
+    def quantile(self, q):
+        """Returns the estimated q-quantile (0 <= q <= 1), None for an empty sketch."""
+        if not 0 <= q <= 1:
+            raise ValueError(f"q must be between 0 and 1, got {q}")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen > rank:
+                # The middle of the bucket (gamma^(key-1), gamma^key], in relative terms
+                return 2 * math.exp(key * self._log_gamma) / (1 + math.exp(self._log_gamma))
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def to_dict(self):
+        """Returns the sketch as a JSON serializable dictionary."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "count": self.count,
+            "zeros": self.zeros,
+            "buckets": {str(key): count for key, count in self._buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Builds a sketch back from a dictionary made by to_dict()."""
+        sketch = cls(state["relative_accuracy"], state["max_buckets"])
+        sketch.count = state["count"]
+        sketch.zeros = state["zeros"]
+        sketch._buckets = {int(key): count for key, count in state["buckets"].items()}
+        return sketch
+
+    def __repr__(self):
+        return f"QuantileSketch(count={self.count}, buckets={len(self._buckets)}, relative_accuracy={self.relative_accuracy})"
+
+
+class MetricSummary:
+    """
+    MetricSummary holds the exact count, total, min and max of a metric, and a QuantileSketch of its values.
+
+    Attributes:
+        count (int): Number of values added.
+        total (float): Sum of the values.
+        min (float): Smallest value (None while empty).
+        max (float): Largest value (None while empty).
+        sketch (QuantileSketch): Quantile sketch of the values.
+
+    Methods:
+        add(self, value): Adds a value.
+        merge(self, other): Adds all values of another summary.
+        quantile(self, q): Returns the estimated q-quantile, clamped to the exact min and max.
+        report(self, quantiles): Returns count, total, mean, min, max and the given quantiles (as "p50", ...) as a dictionary.
+        to_dict(self), from_dict(cls, state): Conversion to and from a JSON serializable dictionary.
+    """
+    __slots__ = ("count", "total", "min", "max", "sketch")
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """Constructor that initializes an empty summary."""
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(relative_accuracy, max_buckets)
+
+    def add(self, value):
+        """Adds a value."""
+        self.sketch.add(value)
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds all values of another summary."""
+        self.sketch.merge(other.sketch)
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def quantile(self, q):
+        """Returns the estimated q-quantile, clamped to the exact min and max."""
+        value = self.sketch.quantile(q)
+        return None if value is None else min(max(value, self.min), self.max)
+
+    def report(self, quantiles=QUANTILES):
+        """Returns count, total, mean, min, max and the given quantiles (as "p50", "p95", ...) as a dictionary."""
+        report = {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in quantiles:
+            report[f"p{q * 100:g}"] = self.quantile(q)
+        return report
+
+    def to_dict(self):
+        """Returns the summary as a JSON serializable dictionary."""
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max, "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Builds a summary back from a dictionary made by to_dict()."""
+        summary = cls.__new__(cls)
+        summary.count = state["count"]
+        summary.total = state["total"]
+        summary.min = state["min"]
+        summary.max = state["max"]
+        summary.sketch = QuantileSketch.from_dict(state["sketch"])
+        return summary
+
+    def __repr__(self):
+        return f"MetricSummary(count={self.count}, total={self.total}, min={self.min}, max={self.max})"
+
+
+class Aggregator:
+    """
+    Aggregator folds the results of many parses into a MetricSummary per vertex type metric and per counter.
+
+    Attributes:
+        vertices (dict): MetricSummary by (vertex type, metric), e.g. ("Map", "DURATION").
+        counters (dict): MetricSummary by (counter group, counter), e.g. ("org.apache.tez.common.counters.DAGCounter", "NUM_SUCCEEDED_TASKS").
+        results (int): Number of parse results folded in.
+        vertex_metrics (tuple): The metrics of the Task Execution Summary that are aggregated.
+        groups (tuple): The counter groups that are aggregated, None for all of them.
+        relative_accuracy (float), max_buckets (int): Settings of the QuantileSketch of every summary.
+
+    Methods:
+        __init__(self, vertex_metrics, groups, relative_accuracy, max_buckets): Constructor that initializes an empty aggregator.
+        add(self, results): Folds in one parse result.
+        update(self, results): Folds in every parse result of an iterable.
+        merge(self, other): Folds in everything another aggregator (e.g. of a worker) has seen.
+        report(self, quantiles): Returns the count, total, mean, min, max and quantiles of everything as nested dictionaries.
+        to_dict(self), from_dict(cls, state): Conversion to and from a JSON serializable dictionary.
+
+    Usage:
+        aggregator = Aggregator()
+        for path in paths:
+            parser = LogFileParser(path)
+            parser.parse()
+            aggregator.add(parser)                  # or a QueryRecord, or the dictionary of QueryRecord.to_dict()
+        aggregator.report()["vertices"]["Map"]["DURATION"]["p99"]
+
+        # Workers aggregate locally and the parent merges
+        with ProcessPoolExecutor() as executor:
+            total = Aggregator()
+            for partial in executor.map(aggregate_paths, chunks_of_paths):
+                total.merge(partial)
+
+    Notes:
+        The vertex type is the vertex name without its number ("Map 1" and "Map 12" are both "Map"). Every summary holds
+        at most `max_buckets` buckets, so the memory only grows with the number of distinct vertex types and counters,
+        never with the number of logs folded in.
+    """
+    def __init__(self, vertex_metrics=VERTEX_METRICS, groups=None, relative_accuracy=0.01, max_buckets=2048):
+        """Constructor that initializes an empty aggregator."""
+        self.vertex_metrics = tuple(vertex_metrics)
+        self.groups = tuple(groups) if groups is not None else None
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.vertices = {}
+        self.counters = {}
+        self.results = 0
+
+    def _summary(self, summaries, key):
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = MetricSummary(self.relative_accuracy, self.max_buckets)
+        return summary
+
+    def add(self, results):
+        """Folds in one parse result: a LogFileParser, a QueryRecord or a dictionary with `task_summary` and `detailed_summary`."""
+        if isinstance(results, Mapping):
+            task_summary, detailed_summary = results.get("task_summary"), results.get("detailed_summary")
+        else:
+            task_summary, detailed_summary = results.task_summary, results.detailed_summary
+
+        for vertice, metrics in (task_summary or {}).items():
+            vertex_type = vertice.split()[0]
+            for metric in self.vertex_metrics:
+                if metric in metrics:
+                    self._summary(self.vertices, (vertex_type, metric)).add(metrics[metric])
+
+        for group, counters in (detailed_summary or {}).items():
+            if self.groups is not None and group not in self.groups:
+                continue
+            for counter, value in counters.items():
+                self._summary(self.counters, (group, counter)).add(value)
+        self.results += 1
+
+    def update(self, results):
+        """Folds in every parse result of an iterable."""
+        for result in results:
+            self.add(result)
+
+    def merge(self, other):
+        """Folds in everything another aggregator (e.g. of a worker) has seen."""
+        for summaries, other_summaries in ((self.vertices, other.vertices), (self.counters, other.counters)):
+            for key, summary in other_summaries.items():
+                self._summary(summaries, key).merge(summary)
+        self.results += other.results
+
+    def report(self, quantiles=QUANTILES):
+        """Returns {"results": ..., "vertices": {type: {metric: ...}}, "counters": {group: {counter: ...}}} with the MetricSummary reports."""
+        report = {"results": self.results, "vertices": {}, "counters": {}}
+        for section, summaries in (("vertices", self.vertices), ("counters", self.counters)):
+            for (outer, inner), summary in summaries.items():
+                report[section].setdefault(outer, {})[inner] = summary.report(quantiles)
+        return report
+
+    def to_dict(self):
+        """Returns the aggregator as a JSON serializable dictionary."""
+        return {
+            "vertex_metrics": list(self.vertex_metrics),
+            "groups": list(self.groups) if self.groups is not None else None,
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "results": self.results,
+            "vertices": [[*key, summary.to_dict()] for key, summary in self.vertices.items()],
+            "counters": [[*key, summary.to_dict()] for key, summary in self.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Builds an aggregator back from a dictionary made by to_dict()."""
+        aggregator = cls(state["vertex_metrics"], state["groups"], state["relative_accuracy"], state["max_buckets"])
+        aggregator.results = state["results"]
+        aggregator.vertices = {(outer, inner): MetricSummary.from_dict(summary) for outer, inner, summary in state["vertices"]}
+        aggregator.counters = {(outer, inner): MetricSummary.from_dict(summary) for outer, inner, summary in state["counters"]}
+        return aggregator
+
+    def __repr__(self):
+        return f"Aggregator(results={self.results}, vertices={len(self.vertices)}, counters={len(self.counters)})"
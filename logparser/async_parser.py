@@ -0,0 +1,111 @@
+"""
+async_parser.py
+
+Asynchronous, query by query parsing of logs arriving over sockets, pipes or any other async byte stream.
+
+Collectors that fetch logs over the network run inside an asyncio service, where a blocking parse would stall every
+other connection. `aiter_queries()` reads an async stream chunk by chunk, splits it into lines and query blocks with the
+same `QueryStream` that `LogFileParser.iter_queries()` uses, and yields a `QueryRecord` for every query as soon as it
+completes. Only the cheap line splitting and section collection run on the event loop, the regex heavy section parsers
+run in an executor.
+
+Functions:
+- `aiter_queries(stream, ...)`: Asynchronously yields a `QueryRecord` for every query of an async byte stream.
+"""
+import asyncio
+import io
+from collections import deque
+from .query_stream import QueryStream, parse_query_block
+from .section_stream import iter_log_lines
+
+CHUNK_SIZE = 1 << 16
+
+
+async def _iter_chunks(stream, chunk_size):
+    """Yields the chunks of bytes of a stream with an async read() (e.g. asyncio.StreamReader) or of an async iterable."""
+    if hasattr(stream, "read"):
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in stream:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+async def _iter_raw_lines(stream, chunk_size):
+    """Yields the raw lines of a stream, split at b"\\n" exactly like iterating over a binary file."""
+    pending = bytearray()
+    async for chunk in _iter_chunks(stream, chunk_size):
+        pending += chunk
+        # Only the new chunk can hold the end of the pending line
+        end = chunk.rfind(b"\n")
+        if end == -1:
+            continue
+        end += len(pending) - len(chunk) + 1
+        for raw_line in io.BytesIO(pending[:end]):
+            yield raw_line
+        del pending[:end]
+    if pending:
+        yield bytes(pending)
+
+
+async def aiter_queries(stream, executor=None, max_pending=4, chunk_size=CHUNK_SIZE):
+    """
+    Asynchronously yields a QueryRecord for every query of an async byte stream, in the order of the stream.
+
+    Parameters:
+        stream: An object with an async read(n) such as `asyncio.StreamReader`, or an async iterable of bytes (or str)
+            chunks. Chunks may be cut anywhere, lines are split at "\\n".
+        executor (concurrent.futures.Executor): Runs the section parsers, the default executor of the loop if None. A
+            ProcessPoolExecutor also spreads the parsing of many streams over several cores.
+        max_pending (int): Maximum number of completed queries being parsed at once, reading the stream pauses until
+            the oldest one is done.
+        chunk_size (int): Bytes read at a time from a stream with read().
+
+    Usage:
+        reader, writer = await asyncio.open_connection(host, port)
+        async for record in aiter_queries(reader):
+            print(record.query_id, record.query_summary)
+
+    Notes:
+        The records (line indexes, byte offsets, summaries and errors) are the same ones `LogFileParser.iter_queries()`
+        gives for a file holding the same bytes, including the trailing unfinished query at the end of the stream.
+
+        Nothing is read ahead of the consumer: the stream is only read while the consumer asks for the next record and
+        fewer than `max_pending` queries are waiting to be parsed, so a slow consumer slows the producer down through
+        the flow control of the transport instead of filling memory.
+    """
+    if max_pending < 1:
+        raise ValueError(f"max_pending must be at least 1, got {max_pending}")
+    loop = asyncio.get_running_loop()
+    queries = QueryStream(parse=False)
+    pending = deque()
+    line_idx, offset = 1, 0
+
+    def submit(block):
+        pending.append(loop.run_in_executor(executor, parse_query_block, *block))
+
+    try:
+        async for raw_line in _iter_raw_lines(stream, chunk_size):
+            for idx, line_offset, line in iter_log_lines((raw_line,), line_idx, offset):
+                block = queries.feed(idx, line_offset, line)
+                if block is not None:
+                    submit(block)
+                line_idx = idx + 1
+            offset += len(raw_line)
+
+            # Hand out what is already parsed, and wait for the oldest query while too many are pending
+            while pending and (len(pending) >= max_pending or pending[0].done()):
+                yield await pending.popleft()
+
+        block = queries.flush()
+        if block is not None:
+            submit(block)
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # The consumer stopped early (or the stream failed), drop the queries nobody is going to ask for
+        for future in pending:
+            future.cancel()
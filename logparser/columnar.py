@@ -0,0 +1,376 @@
+"""
+columnar.py
+
+Compact, append-only binary columnar store of parse results.
+
+The `.txt` summaries written by `LogFileParser.save()` are Python literals, reading thousands of them back needs
+`ast.literal_eval` on every file. The classes in this module keep the numbers of many parsed logs (or queries) in a
+single binary file instead, organized in three tables:
+
+- `queries`: One row per log/query, the duration (in seconds) of every operation of the Query Execution Summary.
+- `vertices`: One row per vertex of the Task Execution Summary, with its five metrics.
+- `counters`: One row per counter of the detailed metrics, with its group, name and value.
+
+Every table also has a `source` column (the log file path or the query id the row comes from). A column of a table can
+be read on its own: only the small block headers are parsed and the column data is sliced out of a memory map, the
+other columns are never deserialized.
+
+File layout:
+    The file starts with the 8 byte magic `LPCOL\\x00\\x00\\x01` and is followed by blocks, every `append()`/`extend()`
+    writes one block per non empty table:
+
+        b"LPCB" | header length (uint32 LE) | data length (uint64 LE) | JSON header | padding | column data
+
+    The JSON header holds the table name, the number of rows and for every column its name, its type ('d' for float64,
+    's' for strings) and the offset and length of its data relative to the start of the column data. Float columns are
+    little-endian float64 arrays. String columns are `rows + 1` little-endian int64 end offsets followed by the utf-8
+    bytes of all strings. Every column starts at a multiple of 8 bytes.
+
+Classes:
+- `ColumnarWriter`: Appends the results of parsed logs to a columnar file.
+- `ColumnarReader`: Reads single columns or whole tables back from a columnar file.
+
+Notes:
+    Values that can not be converted to a float (and columns a block does not have, e.g. an operation that is missing
+    from a query summary) are read back as NaN. An operation named like a column every row has (`source`) is written
+    as `operation:source` instead, with a warning, so it never overwrites the source of its rows.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import warnings
+from array import array
+from .records import VertexMetrics
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, concurrent appends are then up to the caller
+    fcntl = None
+
+MAGIC = b"LPCOL\x00\x00\x01"
+BLOCK_MAGIC = b"LPCB"
+BLOCK_HEADER = struct.Struct("<4sIQ")
+
+QUERIES = "queries"
+VERTICES = "vertices"
+COUNTERS = "counters"
+TABLES = (QUERIES, VERTICES, COUNTERS)
+
+# Columns of the queries table that are not operations, and the prefix of an operation column that would clash with one
+QUERY_KEY_COLUMNS = ("source",)
+OPERATION_PREFIX = "operation:"
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _pad(length):
+    return -length % 8
+
+
+def _float_column(values):
+    column = array('d', values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _string_column(values):
+    encoded = [value.encode("utf-8") for value in values]
+    ends = array('q', [0])
+    for value in encoded:
+        ends.append(ends[-1] + len(value))
+    if sys.byteorder != "little":
+        ends.byteswap()
+    return ends.tobytes() + b"".join(encoded)
+
+
+def encode_block(table, columns):
+    """Encodes a table block, `columns` is a list of (name, type, values) with type 'd' (float64) or 's' (str)."""
+    rows = len(columns[0][2]) if columns else 0
+    header = {"table": table, "rows": rows, "columns": []}
+    chunks = []
+    offset = 0
+    for name, kind, values in columns:
+        if len(values) != rows:
+            raise ValueError(f"Column '{name}' has {len(values)} values, expected {rows}.")
+        data = _float_column(values) if kind == 'd' else _string_column(values)
+        header["columns"].append({"name": name, "type": kind, "offset": offset, "length": len(data)})
+        chunks.append(data + b"\x00" * _pad(len(data)))
+        offset += len(chunks[-1])
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * _pad(BLOCK_HEADER.size + len(header_bytes))
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, len(header_bytes), offset) + header_bytes + b"".join(chunks)
+
+
+def _operation_column(operation, operations):
+    """Returns the column name of an operation, prefixed if the name is taken by a key column (or another operation)."""
+    if operation not in QUERY_KEY_COLUMNS:
+        return operation
+    column = f"{OPERATION_PREFIX}{operation}"
+    while column in operations:
+        column = f"{OPERATION_PREFIX}{column}"
+    warnings.warn(f"Query Summary operation '{operation}' clashes with the '{operation}' column, written as '{column}'.", stacklevel=4)
+    return column
+
+
+def result_blocks(entries):
+    """Encodes the summaries of parsed logs (or queries), a list of (source, query_summary, task_summary, detailed_summary), into one block per table."""
+    blocks = []
+
+    # Operations missing from some query summaries are NaN in those rows
+    query_entries = [(source, query_summary) for source, query_summary, _, _ in entries if query_summary]
+    if query_entries:
+        operations = {}
+        for _, query_summary in query_entries:
+            operations.update(dict.fromkeys(query_summary))
+        columns = [("source", 's', [source for source, _ in query_entries])]
+        columns.extend((_operation_column(operation, operations), 'd',
+                        [_to_float(query_summary.get(operation)) for _, query_summary in query_entries])
+                       for operation in operations)
+        blocks.append(encode_block(QUERIES, columns))
+
+    sources, vertices, metrics = [], [], []
+    for source, _, task_summary, _ in entries:
+        for vertex, vertex_metrics in (task_summary or {}).items():
+            sources.append(source)
+            vertices.append(vertex)
+            metrics.append(vertex_metrics)
+    if vertices:
+        columns = [("source", 's', sources), ("vertex", 's', vertices)]
+        # Same metric names as the VertexMetrics records
+        columns.extend((name, 'd', [_to_float(vertex_metrics.get(name)) for vertex_metrics in metrics]) for name in VertexMetrics.KEYS)
+        blocks.append(encode_block(VERTICES, columns))
+
+    sources, groups, names, values = [], [], [], []
+    for source, _, _, detailed_summary in entries:
+        for group, counters in (detailed_summary or {}).items():
+            for name, value in counters.items():
+                sources.append(source)
+                groups.append(group)
+                names.append(name)
+                values.append(_to_float(value))
+    if values:
+        blocks.append(encode_block(COUNTERS, [
+            ("source", 's', sources),
+            ("group", 's', groups),
+            ("counter", 's', names),
+            ("value", 'd', values),
+        ]))
+    return blocks
+
+
+class ColumnarWriter:
+    """
+    ColumnarWriter appends the results of parsed logs to a columnar file.
+
+    Attributes:
+        path (str): Path of the columnar file, created if it does not exist yet.
+
+    Methods:
+        __init__(self, path): Constructor that creates the file (with its magic) if needed.
+        append(self, results, source): Appends the summaries of a LogFileParser or a QueryRecord.
+        extend(self, results, sources): Appends the summaries of many LogFileParsers or QueryRecords at once.
+        close(self): Closes the file.
+
+    Description:
+        All blocks of one append() are written with a single write on a file opened in append mode, under an exclusive
+        lock where `fcntl` is available, so several processes can append to the same file.
+
+    Usage:
+        with ColumnarWriter("results.lpc") as writer:
+            for log_file_path in log_file_paths:
+                parser = LogFileParser(log_file_path)
+                parser.parse()
+                writer.append(parser, source=log_file_path)
+    """
+    def __init__(self, path):
+        """Constructor that creates the file (with its magic) if needed."""
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._write(b"")
+
+    def _write(self, data):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # Whoever gets the lock first on an empty file writes the magic
+            if os.fstat(self._fd).st_size == 0:
+                data = MAGIC + data
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def append(self, results, source=None):
+        """Appends the summaries of a LogFileParser or a QueryRecord (anything with the *_summary attributes)."""
+        self.extend([results], [source])
+
+    def extend(self, results, sources=None):
+        """Appends the summaries of many LogFileParsers or QueryRecords at once, in a single block per table."""
+        results = list(results)
+        sources = sources or [None] * len(results)
+        entries = []
+        for result, source in zip(results, sources):
+            # QueryRecords are identified by their query id unless a source is given
+            if source is None:
+                source = getattr(result, "query_id", None) or ""
+            entries.append((source, result.query_summary, result.task_summary, result.detailed_summary))
+        blocks = result_blocks(entries)
+        if blocks:
+            self._write(b"".join(blocks))
+
+    def close(self):
+        """Closes the file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ColumnarReader:
+    """
+    ColumnarReader reads single columns or whole tables back from a columnar file.
+
+    Attributes:
+        path (str): Path of the columnar file.
+        _blocks (list): The decoded block headers, with the absolute offset of their column data.
+
+    Methods:
+        __init__(self, path): Constructor that memory maps the file and reads the block headers.
+        tables(self): Returns the names of the tables that have rows.
+        columns(self, table): Returns the names of the columns of a table.
+        num_rows(self, table): Returns the number of rows of a table.
+        column(self, table, name): Returns one column, an array('d') for numbers or a list of str.
+        table(self, table): Returns all columns of a table as a dictionary.
+        close(self): Closes the memory map.
+
+    Usage:
+        with ColumnarReader("results.lpc") as reader:
+            run_dag = reader.column("queries", "Run DAG")          # array('d', [80.54, ...])
+            durations = reader.column("vertices", "DURATION")
+
+    Notes:
+        A block that was only partially written (e.g. after a crash) ends the file, it is skipped with a warning.
+    """
+    def __init__(self, path):
+        """Constructor that memory maps the file and reads the block headers."""
+        self.path = path
+        self._blocks = []
+        self._mmap = None
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar results file.")
+        self._read_headers(size)
+
+    def _read_headers(self, size):
+        position = len(MAGIC)
+        while position < size:
+            if position + BLOCK_HEADER.size > size:
+                warnings.warn(f"Truncated block at byte {position} of {self.path}, skipped.", stacklevel=3)
+                break
+            magic, header_length, data_length = BLOCK_HEADER.unpack_from(self._mmap, position)
+            data_start = position + BLOCK_HEADER.size + header_length
+            if magic != BLOCK_MAGIC or data_start + data_length > size:
+                warnings.warn(f"Truncated block at byte {position} of {self.path}, skipped.", stacklevel=3)
+                break
+            header = json.loads(self._mmap[position + BLOCK_HEADER.size:data_start])
+            header["data_start"] = data_start
+            header["columns"] = {column["name"]: column for column in header["columns"]}
+            self._blocks.append(header)
+            position = data_start + data_length
+
+    def _table_blocks(self, table):
+        return [block for block in self._blocks if block["table"] == table]
+
+    def tables(self):
+        """Returns the names of the tables that have rows."""
+        return [table for table in TABLES if self._table_blocks(table)]
+
+    def columns(self, table):
+        """Returns the names of the columns of a table, in the order they first appear."""
+        names = {}
+        for block in self._table_blocks(table):
+            names.update(dict.fromkeys(block["columns"]))
+        return list(names)
+
+    def num_rows(self, table):
+        """Returns the number of rows of a table."""
+        return sum(block["rows"] for block in self._table_blocks(table))
+
+    def _float_values(self, block, column):
+        start = block["data_start"] + column["offset"]
+        values = array('d')
+        values.frombytes(self._mmap[start:start + column["length"]])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def _string_values(self, block, column):
+        start = block["data_start"] + column["offset"]
+        ends_length = 8 * (block["rows"] + 1)
+        ends = array('q')
+        ends.frombytes(self._mmap[start:start + ends_length])
+        if sys.byteorder != "little":
+            ends.byteswap()
+        data = self._mmap[start + ends_length:start + column["length"]]
+        return [data[ends[i]:ends[i + 1]].decode("utf-8") for i in range(block["rows"])]
+
+    def column(self, table, name):
+        """Returns one column of a table, an array('d') for a numeric column or a list of str for a string column."""
+        blocks = self._table_blocks(table)
+        kinds = {block["columns"][name]["type"] for block in blocks if name in block["columns"]}
+        if not kinds:
+            raise KeyError(f"No column '{name}' in table '{table}'.")
+        if kinds == {'s'}:
+            values = []
+            for block in blocks:
+                column = block["columns"].get(name)
+                values.extend(self._string_values(block, column) if column else [""] * block["rows"])
+            return values
+
+        values = array('d')
+        for block in blocks:
+            column = block["columns"].get(name)
+            if column is not None and column["type"] == 'd':
+                values.extend(self._float_values(block, column))
+            else:
+                values.extend([math.nan] * block["rows"])
+        return values
+
+    def table(self, table):
+        """Returns all columns of a table as a dictionary of column name to column."""
+        return {name: self.column(table, name) for name in self.columns(table)}
+
+    def close(self):
+        """Closes the memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
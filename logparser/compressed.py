@@ -0,0 +1,51 @@
+"""
+compressed.py
+
+Transparent, streaming decompression of archived log files.
+
+Archived HiveServer2 logs are usually kept as `.gz`, `.bz2` or `.xz` files. Instead of decompressing them to disk
+first (which doubles the I/O and the disk usage), the parser opens them through the decompressing file objects of the
+standard library and reads the decompressed lines one at a time, so the decompressed file never exists as a whole, on
+disk or in memory.
+
+The compression is detected from the magic bytes at the start of the file, the file name does not matter.
+
+Constants:
+- `MAGIC_BYTES`: The (magic bytes, compression) pairs that are recognized.
+
+Functions:
+- `detect_compression(path)`: Returns "gzip", "bz2" or "xz" for a compressed file, None for a plain one.
+- `open_log(path)`: Opens a log file for binary reading, decompressing it on the fly if needed.
+"""
+
+MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+
+
+def detect_compression(path):
+    """Returns "gzip", "bz2" or "xz" for a compressed file, None for a plain one."""
+    with open(path, 'rb') as file:
+        head = file.read(max(len(magic) for magic, _ in MAGIC_BYTES))
+    for magic, compression in MAGIC_BYTES:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_log(path, compression=None):
+    """Opens a log file for binary reading, decompressing it on the fly if it is (or `compression` says it is) compressed."""
+    compression = compression or detect_compression(path)
+    # The modules are only imported when needed, bz2 and lzma are optional parts of some Python builds
+    if compression == "gzip":
+        import gzip
+        return gzip.open(path, 'rb')
+    if compression == "bz2":
+        import bz2
+        return bz2.open(path, 'rb')
+    if compression == "xz":
+        import lzma
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
@@ -0,0 +1,491 @@
+"""
+daemon.py
+
+Resident parser service answering parse jobs over a Unix socket or localhost HTTP.
+
+Every `run-logparser` invocation pays for a fresh interpreter and for importing and compiling the parser before the
+first line is read, which dwarfs the parse of a small log file. The `ParserService` in this module keeps a bounded pool
+of warm worker processes (modules imported, patterns compiled, on-disk result caches open) and an in-memory cache of
+recent results, and the servers below hand it jobs received over a Unix socket (one JSON object per line, any number
+of jobs per connection) or over HTTP on a loopback address. A job names a log file and gets its summaries and errors
+back as JSON, in a few milliseconds instead of a few hundred.
+
+Protocol:
+    A job is a JSON object: {"path": "/logs/hive.log", "sections": ["query_summary"], "stream": false,
+    "save": "/results/hive", "use_cache": true}, only `path` is required. `sections` limits the sections that are parsed
+    and returned, `save` also saves the result files into that directory (like `LogFileParser.save()`, only under the
+    `save_root` of the service, relative to it) and with `use_cache` false the log file is parsed again even if its
+    results are cached.
+
+    The response is a JSON object with the `path`, the `status` ("ok", "failed", "busy" or "invalid"), the `error`
+    message (null when ok), the `warnings` of the parse, whether it came from the in-memory cache (`cached`), the
+    milliseconds the service spent on it, queueing included (`milliseconds`), and the `results`: the summary and errors
+    fields (`query_summary`, `query_errors`, ...) of the parsed sections.
+
+    Over HTTP jobs are POSTed to /parse as `Content-Type: application/json` (status code 200, 422 for a failed parse,
+    503 when the queue is full, 400 for an invalid job, 413 for a job over `MAX_JOB_BYTES`), GET /metrics returns the
+    metrics and GET /health answers {"status": "ok"}. Over the Unix socket every line is a job, or {"op": "metrics"},
+    and is answered with one line.
+
+Classes:
+- `ParserService`: Bounded pool of warm worker processes with an in-memory result cache and queue/latency metrics.
+- `ParserHTTPServer`: Threaded HTTP server passing the jobs to a ParserService, on a loopback address only.
+- `ParserUnixServer`: Threaded Unix socket server passing JSON lines to a ParserService.
+
+Functions:
+- `parse_job(job, cache_dir)`: Parses the log file of a job, runs in the worker processes.
+- `request(job, socket_path, url, timeout)`: Sends a job (or {"op": "metrics"}) to a running service, returns its response.
+
+Notes:
+    A job reads any file the service can read, which is why the Unix socket is only accessible by its owner and the
+    HTTP server only listens on a loopback address. A loopback address alone does not keep out the web pages opened in
+    a browser on the same host: they can POST to it, and through DNS rebinding read the answers. So the HTTP server
+    refuses requests with an `Origin` header (browsers add it to cross-origin requests, curl and scripts do not), with
+    a `Host` header other than its own address and jobs that are not `application/json`, which a page can only send
+    after a CORS preflight the server never answers. `save` writes result trees, it is refused unless the service was
+    given a `save_root` and the directory is under it.
+"""
+import http.client
+import http.server
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+import urllib.parse
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .aggregation import MetricSummary
+from .log_file_parser import LogFileParser
+from .query_stream import SECTION_NAMES
+from .result_cache import RESULT_FIELDS, ResultCache
+
+OK = "ok"
+FAILED = "failed"
+BUSY = "busy"
+INVALID = "invalid"
+
+HTTP_STATUS = {OK: 200, FAILED: 422, BUSY: 503, INVALID: 400}
+
+# Largest job (HTTP body or Unix socket line) the servers read, a job is a path and a few options
+MAX_JOB_BYTES = 64 * 1024
+
+# The summary and errors fields of every built-in section, e.g. "task_summary": ("task_summary", "task_errors")
+SECTION_FIELDS = {name: RESULT_FIELDS[2 * i:2 * i + 2] for i, name in enumerate(SECTION_NAMES)}
+
+JOB_OPTIONS = ("sections", "stream", "save", "use_cache")
+
+# One on-disk cache per cache directory and worker process, opened by the first job using it
+_caches = {}
+
+
+def _plain(value):
+    """Turns records (VertexMetrics, CounterGroup) and ErrorCollectors into JSON serializable dictionaries and lists."""
+    if isinstance(value, dict):
+        return {key: dict(item) if hasattr(item, "keys") else item for key, item in value.items()}
+    return None if value is None else list(value)
+
+
+def _warm_up():
+    """Runs in every worker process once it is started, so the first job does not pay for starting it."""
+    return os.getpid()
+
+
+def parse_job(job, cache_dir=None):
+    """Parses the log file of a job (see the module docstring) and returns the status, error, warnings and results."""
+    sections = job.get("sections") or SECTION_NAMES
+    caught = []
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            cache = None
+            if cache_dir:
+                cache = _caches.get(cache_dir)
+                if cache is None:
+                    cache = _caches[cache_dir] = ResultCache(cache_dir)
+            parser = LogFileParser(job["path"], stream=bool(job.get("stream")), cache=cache, sections=sections)
+            parser.parse(use_cache=job.get("use_cache", True))
+            results = {}
+            for name in sections:
+                summary_field, errors_field = SECTION_FIELDS[name]
+                summary, errors = parser.section_data(name)
+                results[summary_field], results[errors_field] = _plain(summary), _plain(errors)
+            if job.get("save"):
+                parser.save(job["save"])
+    except Exception as e:
+        # Whatever goes wrong is answered, a server thread must never lose a client without a response
+        error = str(e) if isinstance(e, (OSError, ValueError)) else f"{type(e).__name__}: {e}"
+        return {"status": FAILED, "error": error, "warnings": [str(warning.message) for warning in caught], "results": None}
+    return {"status": OK, "error": None, "warnings": [str(warning.message) for warning in caught], "results": results}
+
+
+def _check_job(job, save_root=None):
+    """Returns the error message of an invalid job, None for a valid one (`save` only under `save_root`)."""
+    if not isinstance(job, dict) or not isinstance(job.get("path"), str):
+        return "A job is a JSON object with at least a 'path' string."
+    sections = job.get("sections")
+    if sections is not None:
+        if not isinstance(sections, list) or not sections or any(name not in SECTION_FIELDS for name in sections):
+            return f"'sections' must be a list of some of: {', '.join(SECTION_NAMES)}."
+    save = job.get("save")
+    if save is not None:
+        if not isinstance(save, str):
+            return "'save' must be the path of a directory."
+        if save_root is None:
+            return "'save' is turned off, the service was started without a save root."
+        root = os.path.realpath(save_root)
+        if os.path.commonpath([root, os.path.realpath(os.path.join(root, save))]) != root:
+            return f"'save' must be a directory under the save root {save_root}."
+    return None
+
+
+class ParserService:
+    """
+    ParserService runs parse jobs on a bounded pool of warm worker processes, with an in-memory result cache.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        max_queue (int): Number of jobs that may wait for a worker, further jobs are answered "busy" right away.
+        cache_dir (str): Directory of the on-disk ResultCache of the workers (None for no on-disk cache).
+        max_cached (int): Number of responses kept in the in-memory cache.
+        save_root (str): Directory the `save` of a job must be under, relative ones are taken from it (None turns `save` off).
+        latency (MetricSummary): Milliseconds from the arrival of every job to its response, queueing included.
+        counters (dict): Number of jobs submitted, completed, failed, rejected (busy or invalid), answered from the cache
+                         and of pool restarts.
+        _executor (ProcessPoolExecutor): The worker processes.
+        _pending (int): Number of jobs submitted to the workers and not done yet.
+        _cache (OrderedDict): The in-memory cache, least recently used first.
+        _lock (threading.Lock): Guards the counters, the metrics and the cache, the servers call in from many threads.
+
+    Methods:
+        __init__(self, workers, max_queue, cache_dir, max_cached, save_root): Constructor that starts the worker processes.
+        parse(self, job): Runs a job and returns its response (see the module docstring).
+        metrics(self): Returns the queue depth, the counters and the latency percentiles.
+        close(self): Stops the worker processes.
+
+    Usage:
+        with ParserService(workers=4, cache_dir="/var/cache/logparser") as service:
+            response = service.parse({"path": "/logs/hive.log"})
+            print(response["results"]["query_summary"], service.metrics()["latency_ms"]["p99"])
+
+    Notes:
+        The in-memory cache is keyed by the real path, size and modification time of the log file and the options of
+        the job, a log file that changes is parsed again. Jobs that save their results are never answered from it.
+
+        A worker process that dies (killed, out of memory) breaks the whole pool. The jobs it had are answered "failed"
+        and the pool is started again, so the jobs after them run as usual.
+    """
+    def __init__(self, workers=2, max_queue=64, cache_dir=None, max_cached=1024, save_root=None):
+        """Constructor that starts the worker processes."""
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}.")
+        if max_queue < 0:
+            raise ValueError(f"max_queue must not be negative, got {max_queue}.")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cache_dir = cache_dir
+        self.max_cached = max_cached
+        self.save_root = save_root
+        self.latency = MetricSummary()
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "cache_hits": 0, "restarts": 0}
+        self._pending = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = self._start_pool()
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Start every worker now, before the servers start their threads, so no job waits for a process to start
+        for future in [executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def _restart_pool(self, broken):
+        """Replaces a broken pool, once, however many of its jobs saw it break."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._start_pool()
+            self.counters["restarts"] += 1
+        broken.shutdown(wait=False)
+
+    def _cache_key(self, job):
+        try:
+            path = os.path.realpath(job["path"])
+            info = os.stat(path)
+        except OSError:
+            return None
+        return (path, info.st_size, info.st_mtime_ns) + tuple(json.dumps(job.get(option), sort_keys=True) for option in JOB_OPTIONS)
+
+    def parse(self, job):
+        """Runs a job and returns its response, "busy" right away if `max_queue` jobs are already waiting."""
+        started = time.perf_counter()
+        error = _check_job(job, self.save_root)
+        if error is not None:
+            with self._lock:
+                self.counters["rejected"] += 1
+            return self._response(job, {"status": INVALID, "error": error, "warnings": [], "results": None}, started)
+
+        cacheable = not job.get("save") and job.get("use_cache", True)
+        key = self._cache_key(job) if cacheable else None
+        with self._lock:
+            if key is not None and key in self._cache:
+                self._cache.move_to_end(key)
+                self.counters["cache_hits"] += 1
+                return self._finish(job, self._cache[key], started, cached=True)
+            if self._pending >= self.workers + self.max_queue:
+                self.counters["rejected"] += 1
+                busy = {"status": BUSY, "error": f"All {self.workers} workers are busy and {self.max_queue} jobs are waiting, try again later.",
+                        "warnings": [], "results": None}
+                return self._response(job, busy, started)
+            self._pending += 1
+            self.counters["submitted"] += 1
+
+        if job.get("save"):
+            job = dict(job, save=os.path.realpath(os.path.join(self.save_root, job["save"])))
+        executor = self._executor
+        try:
+            outcome = executor.submit(parse_job, job, self.cache_dir).result()
+        except BrokenProcessPool as e:
+            self._restart_pool(executor)
+            outcome = {"status": FAILED, "error": f"A worker process died: {e}", "warnings": [], "results": None}
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        with self._lock:
+            self.counters["completed" if outcome["status"] == OK else "failed"] += 1
+            if key is not None and outcome["status"] == OK:
+                self._cache[key] = outcome
+                if len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+            return self._finish(job, outcome, started, cached=False)
+
+    def _finish(self, job, outcome, started, cached):
+        """Builds the response of a job that went through (or around) the workers and adds its latency, under the lock."""
+        response = self._response(job, outcome, started, cached)
+        self.latency.add(response["milliseconds"])
+        return response
+
+    def _response(self, job, outcome, started, cached=False):
+        path = job.get("path") if isinstance(job, dict) else None
+        return {"path": path, **outcome, "cached": cached, "milliseconds": (time.perf_counter() - started) * 1000}
+
+    def metrics(self):
+        """Returns the queue depth (jobs waiting for a worker), the running jobs, the counters and the latency percentiles in ms."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": min(self._pending, self.workers),
+                "queue_depth": max(self._pending - self.workers, 0),
+                **self.counters,
+                "cached_results": len(self._cache),
+                "latency_ms": self.latency.report(),
+            }
+
+    def close(self):
+        """Stops the worker processes, after the running jobs."""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _HTTPHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so a client can send many jobs over one connection
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, code, error):
+        # The rest of the request is not read, the connection can not be used for another one
+        self.close_connection = True
+        self._send(code, {"status": INVALID, "error": error})
+
+    def _check_headers(self):
+        """Refuses requests a web page could have sent, returns False once they are answered."""
+        if self.headers.get("Origin") is not None:
+            self._reject(403, "Requests from web pages (with an Origin header) are refused.")
+            return False
+        if self.headers.get("Host") not in self.server.allowed_hosts:
+            self._reject(403, f"Unknown Host header: {self.headers.get('Host')}.")
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._check_headers():
+            return
+        if self.path == "/metrics":
+            self._send(200, self.server.service.metrics())
+        elif self.path == "/health":
+            self._send(200, {"status": OK})
+        else:
+            self._send(404, {"status": INVALID, "error": f"Unknown path: {self.path}."})
+
+    def do_POST(self):
+        if not self._check_headers():
+            return
+        if self.path != "/parse":
+            self._reject(404, f"Unknown path: {self.path}.")
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._reject(415, "A job must be sent as Content-Type: application/json.")
+            return
+        try:
+            length = int(self.headers.get("Content-Length"))
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            self._reject(411, "A job needs a valid Content-Length.")
+            return
+        if length > MAX_JOB_BYTES:
+            self._reject(413, f"A job is at most {MAX_JOB_BYTES} bytes, got {length}.")
+            return
+        try:
+            job = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send(400, {"status": INVALID, "error": f"The job is not valid JSON: {e}"})
+            return
+        response = self.server.service.parse(job)
+        self._send(HTTP_STATUS[response["status"]], response)
+
+    def log_message(self, format, *args):
+        # Thousands of jobs, the metrics say more than an access log
+        pass
+
+
+class ParserHTTPServer(http.server.ThreadingHTTPServer):
+    """
+    ParserHTTPServer passes the jobs POSTed to /parse to a ParserService, one thread per connection.
+
+    Attributes:
+        service (ParserService): The service running the jobs.
+        allowed_hosts (set): The `Host` headers accepted, the bound address and `localhost` with the bound port.
+
+    Methods:
+        __init__(self, service, host, port): Constructor that binds the server to a loopback address (port 0 picks a free port).
+
+    Usage:
+        server = ParserHTTPServer(service, "127.0.0.1", 8765)
+        server.serve_forever()
+        # curl -s localhost:8765/parse -H 'Content-Type: application/json' -d '{"path": "/logs/hive.log"}'
+    """
+    daemon_threads = True
+
+    def __init__(self, service, host="127.0.0.1", port=8765):
+        """Constructor that binds the server to a loopback address (port 0 picks a free port)."""
+        try:
+            loopback = ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+        except (OSError, ValueError):
+            loopback = False
+        if not loopback:
+            raise ValueError(f"The service only listens on a loopback address, a job reads any file the service can read (got {host}).")
+        self.service = service
+        super().__init__((host, port), _HTTPHandler)
+        # A rebound DNS name points at the server too, but the browser sends that name as the Host header
+        address, port = self.server_address[:2]
+        self.allowed_hosts = {f"{name}:{port}" for name in (host, address, "localhost")}
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_JOB_BYTES + 1)
+            if not line:
+                return
+            if len(line) > MAX_JOB_BYTES:
+                # The rest of the line is not read, the connection can not be used for another job
+                response = {"status": INVALID, "error": f"A job is at most {MAX_JOB_BYTES} bytes."}
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                return
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                response = {"status": INVALID, "error": f"The job is not valid JSON: {e}"}
+            else:
+                if isinstance(job, dict) and job.get("op") == "metrics":
+                    response = self.server.service.metrics()
+                else:
+                    response = self.server.service.parse(job)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class ParserUnixServer(socketserver.ThreadingUnixStreamServer):
+    """
+    ParserUnixServer passes the JSON lines received over a Unix socket to a ParserService, one thread per connection.
+
+    Attributes:
+        service (ParserService): The service running the jobs.
+        socket_path (str): Path of the socket file, only accessible by its owner.
+
+    Methods:
+        __init__(self, service, socket_path): Constructor that binds the socket, replacing a stale socket file.
+        server_close(self): Closes the socket and removes the socket file.
+
+    Usage:
+        server = ParserUnixServer(service, "/run/logparser.sock")
+        server.serve_forever()
+        # echo '{"path": "/logs/hive.log"}' | nc -U /run/logparser.sock
+    """
+    daemon_threads = True
+
+    def __init__(self, service, socket_path):
+        """Constructor that binds the socket, replacing a stale socket file (any other file is left alone)."""
+        try:
+            if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        self.service = service
+        self.socket_path = socket_path
+        super().__init__(socket_path, _UnixHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        """Closes the socket and removes the socket file."""
+        super().server_close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def request(job, socket_path=None, url=None, timeout=None):
+    """Sends a job (or {"op": "metrics"}) to a service listening on a Unix socket or at an HTTP url, returns its response."""
+    if socket_path is not None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(socket_path)
+            connection.sendall(json.dumps(job).encode() + b"\n")
+            with connection.makefile("rb") as reader:
+                return json.loads(reader.readline())
+    if url is None:
+        raise ValueError("Give the socket_path or the url of the service.")
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        if job.get("op") == "metrics":
+            connection.request("GET", "/metrics")
+        else:
+            connection.request("POST", "/parse", json.dumps(job), {"Content-Type": "application/json"})
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
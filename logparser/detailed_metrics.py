@@ -1,14 +1,19 @@
-import re
+from .error_collector import DETAILED_CORRUPT_LINE, DETAILED_UNEXPECTED_HEADER, MAX_SAMPLES, ErrorCollector
+from .line_classifier import DETAILED_CLASSIFIER, HEADER, METRIC
+from .records import CounterGroup
 
 class DetailedMetrics:
     """
     DetailedMetrics class is purposed to parse and extract detailed metrics from the given log data.
 
     Attributes:
-        _data (tuple): A tuple containing parsed detailed metrics and errors encountered during parsing.
+        lines_matched (int): Number of lines that matched a pattern.
+        lines_failed (int): Number of lines that matched no pattern and were reported as errors.
+        max_errors (int): Number of errors kept per error code (the others are only counted), None keeps all.
+        _data (tuple): A tuple containing parsed detailed metrics and errors (an ErrorCollector) encountered during parsing.
 
     Methods:
-        __init__(self, lines): Constructor that initializes the DetailedMetrics object and initiates the parsing process.
+        __init__(self, lines, max_errors): Constructor that initializes the DetailedMetrics object and initiates the parsing process.
         data: A property that returns the parsed detailed metrics.
         _parse(self, lines): A private method that performs the actual parsing of provided log lines.
 
@@ -17,8 +22,9 @@ class DetailedMetrics:
         Each header designates a category or context for the metrics that follow it, and the metrics themselves comprise 
         of a name and a value.
 
-        The class employs regular expressions to discern between headers and metric lines. Once a header line is identified, 
-        subsequent metric lines are grouped under it until a new header is encountered.
+        The class uses the shared `DETAILED_CLASSIFIER` to discern between headers and metric lines, with a single match
+        per line. Once a header line is identified, subsequent metric lines are grouped under it until a new header is encountered. Each group ends up in a
+        `CounterGroup` record, a compact, read-only mapping of the metric names to their values.
 
     Usage:
         Instantiate the class with a list of log lines intended for parsing:
@@ -30,8 +36,11 @@ class DetailedMetrics:
         Headers are lines that specify a category for the subsequent metrics. If a line fails to match the pattern of 
         either a header or a metric, it is flagged as an error.
     """
-    def __init__(self, lines):
+    def __init__(self, lines, max_errors=MAX_SAMPLES):
         """Constructor that initializes the DetailedMetrics object and initiates the parsing process."""
+        self.max_errors = max_errors
+        self.lines_matched = 0
+        self.lines_failed = 0
         self._data = self._parse(lines)
     
     @property
@@ -41,30 +50,47 @@ class DetailedMetrics:
 
     def _parse(self, lines):
         """Parses the provided log lines to extract and categorize detailed metrics."""
-        # Regexes to identify if a line is a header or a metric
-        header_pattern = re.compile(r"^INFO\s{2}:\s([\w\s\.]+):$")
-        metric_pattern = re.compile(r"^INFO\s{2}:\s{4}([\w_]+):\s(\d+.\d*|\d*)$")
-
+        # Every line is matched once against the metric and the header pattern together
+        match = DETAILED_CLASSIFIER.pattern.match
+        name_group, value_group = DETAILED_CLASSIFIER.value_groups[METRIC]
+        header_group, = DETAILED_CLASSIFIER.value_groups[HEADER]
 
         data = {}
         current_header = None
-        errors = []
-        
+        current_metrics = None
+        errors = ErrorCollector(self.max_errors)
+        matched = failed = 0
+
         for idx, line in lines:
-            if header_pattern.search(line):
-                split_line = line.split("INFO  : ")
-                if len(split_line) < 2:
-                    errors.append(f"Unexpected header format at idx: {idx}, line: '{line}'.")
+            token = match(line)
+            if token is not None:
+                name = token[name_group]
+                if name is not None:
+                    # A metric, only valid below a header
+                    if current_header:
+                        # The value pattern also lets through e.g. "" or "1x", those lines are corrupt too
+                        try:
+                            current_metrics[name] = float(token[value_group])
+                        except ValueError:
+                            pass
+                        else:
+                            matched += 1
+                            continue
+                # The header name can only be cut out of lines starting with the exact "INFO  : " prefix
+                elif line.startswith("INFO  : "):
+                    current_header = token[header_group].strip()
+                    current_metrics = data[current_header] = {}
+                    matched += 1
+                    continue
+                else:
+                    errors.add(DETAILED_UNEXPECTED_HEADER, idx, line)
+                    failed += 1
                     continue
-                current_header = split_line[1].split(":")[0].strip()
-                data[current_header] = {}
-            elif metric_pattern.search(line) and current_header:
-                match = metric_pattern.search(line)
-                metric_name = match.group(1)
-                metric_value = float(match.group(2))
-                data[current_header][metric_name] = metric_value
-            else:
-                errors.append(f"Err parsing idx: {idx}, line: '{line}'. Corrupt line, failed to match either header or metric pattern... skipped")
-                continue
-            
-        return data, errors
\ No newline at end of file
+            errors.add(DETAILED_CORRUPT_LINE, idx, line)
+            failed += 1
+
+        self.lines_matched, self.lines_failed = matched, failed
+
+        # Freeze every group into a compact CounterGroup once all its metrics are known
+        data = {header: CounterGroup.from_dict(metrics) for header, metrics in data.items()}
+        return data, errors
@@ -0,0 +1,166 @@
+"""
+error_collector.py
+
+Bounded, deduplicated collection of the errors found by the section parsers.
+
+The section parsers used to append a full f-string message (with the whole line) for every corrupt line, so on badly
+corrupted logs the error lists grew larger than the results and formatting them took most of the run time. The
+`ErrorCollector` class in this module stores a compact (code, line index, text) record instead, counts the errors per
+error code and keeps only the first `max_samples` records of every code. The messages are only formatted when the
+errors are read (save() writing them, for example), the memory used for errors stays bounded however corrupt the log is.
+
+Constants:
+- `MESSAGES`: The message template of every error code.
+- `MAX_SAMPLES`: Default number of records kept per error code.
+
+Classes:
+- `ErrorCollector`: Counts errors per code and keeps the first records of each, reads like the list of messages it replaces.
+"""
+from collections.abc import Sequence
+from itertools import islice
+
+QUERY_CORRUPT_LINE = "query_corrupt_line"
+QUERY_MISSING_OPERATION = "query_missing_operation"
+TASK_CORRUPT_LINE = "task_corrupt_line"
+DETAILED_UNEXPECTED_HEADER = "detailed_unexpected_header"
+DETAILED_CORRUPT_LINE = "detailed_corrupt_line"
+
+MESSAGES = {
+    QUERY_CORRUPT_LINE: "Err parsing idx: {idx}, line: '{text}'. Line has corrupt structure... skipped",
+    QUERY_MISSING_OPERATION: "Critical operation: '{text}' missing in the log data.",
+    TASK_CORRUPT_LINE: "Err parsing idx: {idx}, line: '{text}'. Line has corrupt structure... skipped",
+    DETAILED_UNEXPECTED_HEADER: "Unexpected header format at idx: {idx}, line: '{text}'.",
+    DETAILED_CORRUPT_LINE: "Err parsing idx: {idx}, line: '{text}'. Corrupt line, failed to match either header or metric pattern... skipped",
+}
+
+MAX_SAMPLES = 100
+
+
+class ErrorCollector(Sequence):
+    """
+    ErrorCollector counts the errors of a section parser per error code and keeps the first records of each.
+
+    Attributes:
+        max_samples (int): Number of records kept per error code, None keeps all of them.
+        counts (dict): Number of errors per error code, including the ones whose record was dropped.
+        samples (list): The kept (code, idx, text) records, in the order they were added.
+
+    Methods:
+        __init__(self, max_samples): Constructor that initializes an empty collector.
+        add(self, code, idx, text): Counts one error, keeping its record if its code has less than max_samples records.
+        total: A property returning the number of errors, including the ones whose record was dropped.
+        dropped: A property returning the number of errors whose record was dropped.
+        messages(self): Yields the formatted messages.
+        to_dict(self), from_dict(cls, data): Plain (JSON) representation of the collector and back.
+
+    Description:
+        Reading the collector like a list (iterating, indexing, len(), comparing with a list) gives the formatted
+        messages of the kept records, in the order they were added, followed by one line per error code that had
+        records dropped. As long as nothing was dropped this is exactly the list of messages the parsers used to build.
+
+    Usage:
+        errors = ErrorCollector(max_samples=10)
+        errors.add(TASK_CORRUPT_LINE, 12, line)
+        errors.counts                    # {'task_corrupt_line': 1}
+        list(errors)                     # ["Err parsing idx: 12, line: '...'. Line has corrupt structure... skipped"]
+
+    Notes:
+        The records keep a reference to the text they were given (the corrupt line), no copy and no message is made
+        until the errors are read.
+    """
+    __slots__ = ("max_samples", "counts", "samples")
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        """Constructor that initializes an empty collector."""
+        self.max_samples = max_samples
+        self.counts = {}
+        self.samples = []
+
+    def add(self, code, idx, text):
+        """Counts one error, keeping its (code, idx, text) record if its code has less than max_samples records."""
+        count = self.counts.get(code, 0)
+        self.counts[code] = count + 1
+        if self.max_samples is None or count < self.max_samples:
+            self.samples.append((code, idx, text))
+
+    @property
+    def total(self):
+        """Returns the number of errors, including the ones whose record was dropped."""
+        return sum(self.counts.values())
+
+    @property
+    def dropped(self):
+        """Returns the number of errors whose record was dropped."""
+        return self.total - len(self.samples)
+
+    def messages(self):
+        """Yields the formatted messages of the kept records, then one line per error code that had records dropped."""
+        for sample in self.samples:
+            yield _format(sample)
+        yield from self._dropped_messages()
+
+    def _dropped_messages(self):
+        if self.max_samples is not None:
+            for code, count in self.counts.items():
+                if count > self.max_samples:
+                    yield f"... {count - self.max_samples} more '{code}' errors (only the first {self.max_samples} are kept)."
+
+    def _dropped_codes(self):
+        if self.max_samples is None:
+            return 0
+        return sum(1 for count in self.counts.values() if count > self.max_samples)
+
+    def __iter__(self):
+        return self.messages()
+
+    def __len__(self):
+        return len(self.samples) + self._dropped_codes()
+
+    def __getitem__(self, index):
+        # Only the messages asked for are formatted, so reading the errors by index stays linear
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        kept = len(self.samples)
+        position = range(len(self))[index]  # raises the IndexError of a list
+        if position < kept:
+            return _format(self.samples[position])
+        return next(islice(self._dropped_messages(), position - kept, None))
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def __eq__(self, other):
+        if isinstance(other, ErrorCollector):
+            return self.counts == other.counts and self.samples == other.samples
+        if isinstance(other, list):
+            return list(self.messages()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ErrorCollector(total={self.total}, kept={len(self.samples)}, counts={self.counts!r})"
+
+    def __reduce__(self):
+        return _restore, (self.max_samples, self.counts, self.samples)
+
+    def to_dict(self):
+        """Returns the collector as a plain dictionary (for JSON)."""
+        return {"max_samples": self.max_samples, "counts": dict(self.counts), "samples": [list(sample) for sample in self.samples]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Makes an ErrorCollector from the dictionary to_dict() returned."""
+        return _restore(data["max_samples"], data["counts"], [tuple(sample) for sample in data["samples"]])
+
+
+def _format(sample):
+    code, idx, text = sample
+    return MESSAGES[code].format(idx=idx, text=text)
+
+
+def _restore(max_samples, counts, samples):
+    errors = ErrorCollector(max_samples)
+    errors.counts = dict(counts)
+    errors.samples = list(samples)
+    return errors
@@ -0,0 +1,133 @@
+"""
+instrumentation.py
+
+Opt-in, per-stage timing instrumentation of the parser.
+
+When a log file takes minutes to process, the `ParserStats` object of a `LogFileParser` (enabled with
+`LogFileParser(log_file_path, stats=True)`) tells which stage is responsible: for every stage it records the number of
+calls, the wall time, the lines processed, the bytes read or written and, for the section parsers, how many lines matched
+their patterns and how many fell through to an error.
+
+The stages are:
+- `cache`: Looking the log file up in (and storing it into) the result cache.
+- `extract_headers`: Finding the headers in the memory mapped log file (reads the whole file).
+- `extract_lines`: Reading and decoding the lines from every header to the end of its section.
+- `stream_lines`: Reading the whole log file line by line (stream mode and compressed log files, instead of the two stages
+  above), `bytes` counts decompressed bytes.
+- `query_summary`, `task_summary`, `detailed_metrics`: The three section parsers.
+- `save`: Writing the summaries and parser logs.
+
+Classes:
+- `StageStats`: The counters of a single stage.
+- `ParserStats`: The counters of all stages, as a structured object, a dictionary or a printable report.
+"""
+import time
+from contextlib import contextmanager
+
+
+class StageStats:
+    """
+    StageStats holds the counters of a single stage of the parser.
+
+    Attributes:
+        name (str): Name of the stage.
+        calls (int): Number of times the stage ran.
+        seconds (float): Total wall time spent in the stage.
+        lines (int): Lines processed.
+        bytes (int): Bytes read (or written, for `save`).
+        matched (int): Lines that matched a pattern (section parsers only).
+        errors (int): Lines that fell through to an error (section parsers only).
+
+    Methods:
+        to_dict(self): Returns the counters as a dictionary.
+    """
+    FIELDS = ("calls", "seconds", "lines", "bytes", "matched", "errors")
+
+    def __init__(self, name):
+        """Constructor that initializes all counters to zero."""
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.lines = 0
+        self.bytes = 0
+        self.matched = 0
+        self.errors = 0
+
+    def to_dict(self):
+        """Returns the counters as a dictionary."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"StageStats({self.name!r}, calls={self.calls}, seconds={self.seconds:.6f}, lines={self.lines}, bytes={self.bytes})"
+
+
+class ParserStats:
+    """
+    ParserStats collects the counters of every stage of one or more parses.
+
+    Attributes:
+        stages (dict): StageStats by stage name, in the order the stages first ran.
+
+    Methods:
+        stage(self, name): Context manager timing one run of a stage, yields its StageStats to add counters to.
+        merge(self, other): Adds the counters of another ParserStats (e.g. from a worker process).
+        total_seconds: A property that returns the wall time of all stages together.
+        to_dict(self): Returns the counters of all stages as a dictionary.
+        report(self): Returns a printable table of the stages, slowest first.
+
+    Usage:
+        parser = LogFileParser(log_file_path, stats=True)
+        parser.parse()
+        print(parser.stats.report())
+        parser.stats.stages["detailed_metrics"].errors
+
+    Notes:
+        One ParserStats can be shared by many parsers (`LogFileParser(path, stats=shared_stats)`) to get the totals of a batch.
+    """
+    def __init__(self):
+        """Constructor that initializes an empty set of stages."""
+        self.stages = {}
+
+    def _get(self, name):
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager timing one run of a stage, yields its StageStats to add counters to."""
+        stage = self._get(name)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+
+    def merge(self, other):
+        """Adds the counters of another ParserStats."""
+        for name, other_stage in other.stages.items():
+            stage = self._get(name)
+            for field in StageStats.FIELDS:
+                setattr(stage, field, getattr(stage, field) + getattr(other_stage, field))
+
+    @property
+    def total_seconds(self):
+        """Returns the wall time of all stages together."""
+        return sum(stage.seconds for stage in self.stages.values())
+
+    def to_dict(self):
+        """Returns the counters of all stages as a dictionary."""
+        return {name: stage.to_dict() for name, stage in self.stages.items()}
+
+    def report(self):
+        """Returns a printable table of the stages, slowest first."""
+        total = self.total_seconds or 1e-9
+        rows = [f"{'stage':<18}{'calls':>7}{'seconds':>11}{'share':>8}{'lines':>12}{'MB':>10}{'matched':>10}{'errors':>9}"]
+        for stage in sorted(self.stages.values(), key=lambda stage: stage.seconds, reverse=True):
+            rows.append(f"{stage.name:<18}{stage.calls:>7}{stage.seconds:>11.4f}{stage.seconds / total:>8.1%}{stage.lines:>12}"
+                        f"{stage.bytes / 2**20:>10.2f}{stage.matched:>10}{stage.errors:>9}")
+        return "\n".join(rows)
+
+    def __repr__(self):
+        return f"ParserStats({', '.join(self.stages)})"
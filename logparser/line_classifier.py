@@ -0,0 +1,148 @@
+"""
+line_classifier.py
+
+Shared, precompiled classification of summary lines into typed tokens.
+
+Every section parser used to compile its own regular expressions on every call and to run several of them on each line
+(DetailedMetrics ran the header pattern, then the metric pattern twice, then split the line again to get the header
+name). A `LineClassifier` instead combines all line kinds of a section into a single precompiled alternation, so every
+line is matched exactly once and comes back as a `(kind, values)` token.
+
+Classes:
+- `LineClassifier`: Classifies lines with one combined, precompiled pattern.
+
+Functions:
+- `scan_operation(line)`: Linear time tokenizer giving the same (name, duration) values as `QUERY_CLASSIFIER`.
+
+Constants:
+- `QUERY_CLASSIFIER`: `operation` lines of the Query Execution Summary, values (name, duration).
+- `TASK_CLASSIFIER`: `vertex` lines of the Task Execution Summary, values (type, number, five metrics).
+- `DETAILED_CLASSIFIER`: `metric` lines (values: name, value) and `header` lines (value: group name) of the detailed metrics.
+- `MAX_MATCH_LENGTH`: Lines longer than this are not given to the operation pattern but to `scan_operation`.
+
+Notes:
+    The kinds of a classifier must never match the same line, so the order of the alternation only matters for speed:
+    the most frequent kind goes first. The patterns are the ones the section parsers always used, except that the
+    metric pattern refuses a line ending with ":\\n" (its `\\s` would match the trailing newline), the one kind of line
+    that is also a header, which always took precedence, and that its value pattern `\\d*(?:(?<=\\d)[^\\d\\n]\\d*)?` accepts
+    the same values as the former `\\d+.\\d*|\\d*` in linear time (the former took quadratic time on long digit runs).
+"""
+import re
+
+# Every summary line starts like this, the kinds only describe what follows
+LINE_PREFIX = r"INFO\s{2}:"
+
+# Real summary lines are well below 200 characters, longer ones are corrupt (stack traces glued to a line, ...)
+MAX_MATCH_LENGTH = 1024
+
+OPERATION = "operation"
+VERTEX = "vertex"
+HEADER = "header"
+METRIC = "metric"
+
+
+class LineClassifier:
+    """
+    LineClassifier classifies lines with a single precompiled alternation of named patterns.
+
+    Attributes:
+        pattern (re.Pattern): The combined pattern, the shared prefix followed by one alternative per kind.
+        value_groups (dict): The group numbers of the values of every kind, for hot loops using `pattern.match` directly.
+
+    Methods:
+        __init__(self, kinds, prefix): Constructor that compiles the kinds into one pattern.
+        classify(self, line): Returns the (kind, values) token of a line, or (None, None) if no kind matches.
+
+    Usage:
+        kind, values = DETAILED_CLASSIFIER.classify("INFO  :    HDFS_READ_OPS: 44090")    # ("metric", ("HDFS_READ_OPS", "44090"))
+
+        # Hot loops skip the token and read the groups of the match
+        match = DETAILED_CLASSIFIER.pattern.match
+        name_group, value_group = DETAILED_CLASSIFIER.value_groups["metric"]
+
+    Notes:
+        Every kind is a named group holding the capturing groups of its pattern, a match of a kind has the values of
+        that kind set and the values of every other kind None.
+    """
+    def __init__(self, kinds, prefix=LINE_PREFIX):
+        """Constructor that compiles the kinds, a sequence of (name, pattern after the prefix), into one pattern."""
+        alternatives = []
+        self.value_groups = {}
+        group = 0
+        for kind, kind_pattern in kinds:
+            values = re.compile(kind_pattern).groups
+            alternatives.append(f"(?P<{kind}>{kind_pattern})")
+            # Group `group + 1` is the kind itself, its values follow it
+            self.value_groups[kind] = tuple(range(group + 2, group + 2 + values))
+            group += 1 + values
+        # match() anchors at the start of the line like the `^` of the former patterns
+        self.pattern = re.compile(f"{prefix}(?:{'|'.join(alternatives)})")
+
+    def classify(self, line):
+        """Returns the (kind, values) token of a line, or (None, None) if no kind matches."""
+        match = self.pattern.match(line)
+        if match is None:
+            return None, None
+        # The group of the kind closes after its values, so it is the last group of the match
+        kind = match.lastgroup
+        return kind, tuple(match[group] for group in self.value_groups[kind])
+
+
+QUERY_CLASSIFIER = LineClassifier([
+    (OPERATION, r"\s([a-zA-Z()]+(?:\s[a-zA-Z()]+)*?)\s+([\d.]+)s"),
+])
+
+TASK_CLASSIFIER = LineClassifier([
+    (VERTEX, r"\s+([a-zA-Z]+)\s(\d+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)"),
+])
+
+# Metrics first, they are by far the most frequent lines of the section
+DETAILED_CLASSIFIER = LineClassifier([
+    # The value of the former pattern was `(\d+.\d*|\d*)$`, which retries every split of a long digit run before giving up
+    (METRIC, r"\s{4}([\w_]+):(?!\n\Z)\s(\d*(?:(?<=\d)[^\d\n]\d*)?)$"),
+    (HEADER, r"\s([\w\s\.]+):$"),
+])
+
+
+NAME_CHARACTERS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ()")
+
+
+def scan_operation(line):
+    """
+    Returns the (name, duration) values `QUERY_CLASSIFIER` gives a line, or None if it does not match, in a single pass.
+
+    The operation pattern `\\s([a-zA-Z()]+(?:\\s[a-zA-Z()]+)*?)\\s+([\\d.]+)s` nests quantifiers and leaves it to the regex
+    engine to give up every split of a long line, this scan reads every character at most twice whatever the line. The
+    name can only end where its words end: wherever another word follows, a single whitespace character and a letter
+    follow, never whitespace and the duration. So the name is the longest run of words separated by single whitespace
+    characters, and whitespace, the duration and its "s" have to come right after it. `\\s` and `\\d` of the pattern
+    are str.isspace() and str.isdecimal().
+    """
+    if len(line) < 8 or not line.startswith("INFO") or not (line[4].isspace() and line[5].isspace()) \
+            or line[6] != ":" or not line[7].isspace():
+        return None
+    end = len(line)
+    start = pos = 8
+
+    # The words of the name
+    while True:
+        word_start = pos
+        while pos < end and line[pos] in NAME_CHARACTERS:
+            pos += 1
+        if pos == word_start:
+            return None
+        if pos + 1 < end and line[pos].isspace() and line[pos + 1] in NAME_CHARACTERS:
+            pos += 1
+            continue
+        break
+    name_end = pos
+
+    # At least one whitespace character, the duration and the "s", anything may follow
+    while pos < end and line[pos].isspace():
+        pos += 1
+    duration_start = pos
+    while pos < end and (line[pos].isdecimal() or line[pos] == "."):
+        pos += 1
+    if duration_start == name_end or pos == duration_start or pos == end or line[pos] != "s":
+        return None
+    return line[start:name_end], line[duration_start:pos]
@@ -1,8 +1,31 @@
+import cProfile
+import mmap
 import warnings
 import os 
-from .detailed_metrics import DetailedMetrics
-from .query_summary import QuerySummary 
-from .task_execution_summary import TaskExecutionSummary
+from contextlib import contextmanager, nullcontext
+from .section_registry import DEFAULT_REGISTRY
+from .section_stream import SectionStream, compile_headers, count_log_lines, is_line_end, is_line_start, iter_log_lines
+from .query_stream import SECTION_NAMES, QueryStream, iter_queries
+from .result_cache import RESULT_FIELDS
+from .columnar import ColumnarWriter
+from .result_writer import ResultWriter
+from .compressed import detect_compression, open_log
+from .instrumentation import ParserStats, StageStats
+
+
+def _result_property(section, position):
+    """The summary (position 0) or errors (position 1) attribute of a section, parsed on first access if parse() left it for later."""
+    def get(self):
+        return self._section_data(section)[position]
+
+    def set(self, value):
+        results = list(self._results.get(section, (None, None)))
+        results[position] = value
+        self._results[section] = tuple(results)
+        self._pending.discard(section)
+
+    return property(get, set)
+
 
 class LogFileParser:
     """
@@ -10,21 +33,43 @@ class LogFileParser:
 
     Attributes:
         query_summary (dict): Parsed summary data of the query execution.
-        query_errors (list): List of errors encountered while parsing the query execution.
+        query_errors (ErrorCollector): The errors encountered while parsing the query execution (reads like a list of messages).
         task_summary (dict): Parsed summary data of task execution.
-        task_errors (list): List of errors encountered while parsing the task execution.
+        task_errors (ErrorCollector): The errors encountered while parsing the task execution (reads like a list of messages).
         detailed_summary (dict): Parsed detailed metrics.
-        detailed_errors (list): List of errors encountered while parsing detailed metrics.
+        detailed_errors (ErrorCollector): The errors encountered while parsing detailed metrics (reads like a list of messages).
         _header_idxs (dict): Dictionary containing key headers and their corresponding line indexes within the log file.
-        _lines (list): List of all lines in the log file, each entry is a tuple of the line's index and content.
+        _header_offsets (dict): Dictionary containing key headers and their corresponding byte offsets within the log file.
+        _log_file_path (str): Path of the log file, the file is only read during parse().
+        _specs (dict): The SectionSpec of every section to parse, by name, taken from the registry when the parser is made.
+        _selected (set): Names of the sections parse() parses right away.
+        _pending (set): Names of the sections that are parsed on first access of their summary or errors.
+        _section_lines (dict): Lines of pending sections that were already read (stream mode), by section name.
+        _results (dict): The (summary, errors) of every section, by name.
+        _compression (str): "gzip", "bz2" or "xz" if the log file is compressed, None otherwise.
+        _cache (ResultCache): Optional on-disk cache of parse results.
+        stats (ParserStats): Per-stage timings and counters of parse() and save(), None unless enabled.
+        _profiler (cProfile.Profile): Profiler of parse() and save(), None unless a profile path is given.
 
     Methods:
-        __init__(self, log_file_path): Constructor that initializes the LogFileParser object and reads the log file.
+        __init__(self, log_file_path, stream, cache, stats, profile_path, sections, registry): Constructor that initializes the LogFileParser object and checks that the log file exists.
         _extract_headers(self): Identifies and saves the line indexes of key headers within the log file.
-        _extract_lines(self): Extracts the lines of interest between the identified headers.
-        parse(self): Calls helper methods to extract and parse the log data into structured summaries.
-        save(self): Saves the parsed summaries and parser logs (errors) to specified directory paths.
-        delete(self): Deletes the previously saved summaries and parser logs.
+        _find_headers(self, buffer): Finds the byte offsets and line indexes of the headers in the memory mapped log file.
+        _check_headers(self): Warns about missing headers and raises an error if none were found at all.
+        _extract_lines(self, sections): Extracts the lines of interest between the identified headers.
+        _stream_lines(self, queries): Reads the log file once, line by line, and collects the lines of interest on the fly.
+        _feed_queries(self, stream, file, queries): Feeds every line to the section stream and splits the queries in the same read.
+        _parse_sections(self, section_lines): Parses the extracted lines of each selected section into structured summaries.
+        _parse_pending(self, name): Extracts (if needed) and parses a section that was left for later.
+        section_data(self, name): Returns (summary, errors) of any registered section.
+        parse(self, use_cache, queries): Calls helper methods to extract and parse the log data into structured summaries.
+        _parse(self, queries): Extracts and parses the log data, without looking at the cache.
+        iter_queries(self): Yields a QueryRecord for every query (Completed executing command block) of the log file.
+        save(self, output_dir): Saves the parsed summaries and parser logs (errors) under the output directory (./RunResults by default).
+        _extra_sections(self): Returns the names of the registered sections besides the three built-in ones.
+        _extra_specs(self): Returns the SectionSpecs of the registered sections besides the three built-in ones.
+        delete(self, output_dir): Deletes the previously saved summaries and parser logs.
+        save_columnar(self, path, source): Appends the parsed summaries to a binary columnar results file.
 
     Description:
         This class serves as a comprehensive utility to parse a log file. It identifies sections of the log file based on headers, 
@@ -36,35 +81,130 @@ class LogFileParser:
         The parsing process relies heavily on the structure of the log file, making use of specific headers to delineate 
         sections of interest. Any structural inconsistencies or deviations from the expected format may lead to parsing 
         errors, which are saved and can be reviewed.
+
+        The log file is never loaded in memory as a whole. By default parse() memory maps it, looks the headers up directly
+        in the file buffer and only reads and decodes the lines from each header to the end of its section, so the INFO
+        noise around the summaries costs next to nothing. With `stream=True` the log file is instead read once, line by
+        line, and only the lines of the three sections are kept, which also works for files that can not be memory mapped.
+        Both modes give exactly the same results and warnings.
+
+        Compressed log files (gzip, bz2 or xz, recognized by their magic bytes) are decompressed on the fly and always
+        parsed in stream mode, see `logparser.compressed`. The byte offsets of iter_queries() then count decompressed bytes.
+
+        parse() only keeps the first instance of every header, which for a log file holding many queries means only the
+        first query gets summarized. iter_queries() instead splits the log file at every `Completed executing command`
+        line and yields the summaries of each query as soon as its block has been read. Both at once, e.g. to save the
+        summaries and index every query, come from a single read of the log file with `parse(queries=records)`: the
+        file is then streamed and the QueryRecord of every query is appended to the `records` list.
+
+        When a `ResultCache` is given, parse() first looks the log file up in it and, on a hit, returns the stored results
+        (and gives the stored warnings again) without reading the log file. `parse(use_cache=False)` bypasses the cache.
+
+        Besides the `.txt` summaries of save(), save_columnar() appends the numbers of the summaries to a single binary
+        file shared by many parsed logs, see `logparser.columnar`.
+
+        With `sections` (some of "query_summary", "task_summary", "detailed_summary") parse() only extracts and parses
+        those sections, e.g. for a dashboard that only reads `query_summary`. The headers of all sections are still
+        searched (the warnings stay the same), the other sections are extracted and parsed the first time their summary
+        or errors are read, then kept. With a result cache all sections are parsed, so the cache holds complete results.
+
+        The sections themselves (header, offset, end marker and parser) come from a `SectionRegistry`, the default one
+        holds the three sections above. With `registry` (or sections registered in the default one with
+        `register_section`) more sections are collected in the same single search and pass over the file, their results
+        are read with section_data(name) and saved next to the others. A cached parse only holds the three built-in
+        sections, the others are then read from the log file when they are first accessed.
+
+        With `stats=True` (or a shared `ParserStats`) every stage of parse() and save() is timed and counted, see
+        `logparser.instrumentation`, and with `profile_path` both run under cProfile and the profile is dumped to that path
+        (readable with `pstats`) after each call.
     """
-    def __init__(self, log_file_path):
-        """Constructor that initializes the LogFileParser object and reads the log file."""
-        self.query_summary = None
-        self.query_errors = None
-        self.task_summary = None
-        self.task_errors = None
-        self.detailed_summary = None
-        self.detailed_errors = None
-        self._header_idxs = {
-            "INFO  : Query Execution Summary": None,
-            "INFO  : Task Execution Summary": None,
-            "INFO  : org.apache.tez.common.counters.DAGCounter:": None,
-            }
-        
-        with open(log_file_path, 'r') as file:
-            self._lines = [[index+1, line] for index, line in enumerate(file.read().splitlines())]
-        
+    query_summary = _result_property("query_summary", 0)
+    query_errors = _result_property("query_summary", 1)
+    task_summary = _result_property("task_summary", 0)
+    task_errors = _result_property("task_summary", 1)
+    detailed_summary = _result_property("detailed_summary", 0)
+    detailed_errors = _result_property("detailed_summary", 1)
+
+    def __init__(self, log_file_path, stream=False, cache=None, stats=None, profile_path=None, sections=None, registry=None):
+        """Constructor that initializes the LogFileParser object and checks that the log file exists."""
+        # Sections registered later do not change a parser that was already made
+        self._specs = {spec.name: spec for spec in (DEFAULT_REGISTRY if registry is None else registry)}
+        self._results = {name: (None, None) for name in self._specs}
+        self._pending = set()
+        self._section_lines = {}
+        if sections is None:
+            sections = self._specs
+        elif isinstance(sections, str):
+            sections = [sections]
+        unknown = [name for name in sections if name not in self._specs]
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(unknown)}. Expected some of: {', '.join(self._specs)}.")
+        self._selected = set(sections)
+        self._header_idxs = {spec.header: None for spec in self._specs.values()}
+
+        self._header_offsets = dict.fromkeys(self._header_idxs)
+        self._log_file_path = log_file_path
+        self._stream = stream
+        self._cache = cache
+        self.stats = ParserStats() if stats is True else (stats or None)
+        self._profile_path = profile_path
+        self._profiler = cProfile.Profile() if profile_path else None
+
+        # Fail early on a missing file, the file itself is only read during parse()
+        os.stat(log_file_path)
+        self._compression = detect_compression(log_file_path)
+
+    def _stage(self, name):
+        """Times a stage into the stats if they are enabled, otherwise the counters of the stage are thrown away."""
+        return self.stats.stage(name) if self.stats is not None else nullcontext(StageStats(name))
+
+    @contextmanager
+    def _profiled(self):
+        """Runs the body under the profiler (if enabled) and dumps the profile collected so far."""
+        if self._profiler is None:
+            yield
+            return
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            self._profiler.dump_stats(self._profile_path)
+
     def _extract_headers(self):
         """Identifies and saves the line indexes of key headers within the log file."""
-        for indx, line in self._lines:
-            if line not in list(self._header_idxs.keys()):
-                continue
+        with self._stage("extract_headers") as stage, open(self._log_file_path, 'rb') as file:
+            # mmap can not map an empty file, which has no headers anyway
+            size = os.fstat(file.fileno()).st_size
+            if size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    self._find_headers(buffer)
+            stage.bytes += size
+
+        self._check_headers()
+        # This is a command method, return none 
+
+    def _find_headers(self, buffer):
+        """Finds the byte offsets of the headers in the memory mapped log file and the line indexes of their first encounter."""
+        # Look the headers up directly in the file buffer, a match only counts if it spans a whole line
+        # All the headers are searched at once, in a single pass over the file, however many sections are registered
+        found = [(match.start(), match[0].decode()) for match in compile_headers(self._header_idxs).finditer(buffer)
+                 if is_line_start(buffer, match.start()) and is_line_end(buffer, match.end())]
+
+        idx, previous_pos = 1, 0
+        for pos, header in found:
             # We only keep the indexes of the first encounter with each header in the logfile, if multiple same headers are found, give warning and ignore appearences after the first
-            if self._header_idxs[line] is None:
-                self._header_idxs[line] = indx
-            else:
-                warnings.warn(f"Header: {line} | found multiple times in the log file... ignoring all but the first instance ...", stacklevel=2)
+            if self._header_idxs[header] is not None:
+                warnings.warn(f"Header: {header} | found multiple times in the log file... ignoring all but the first instance ...", stacklevel=3)
+                continue
+            # Only the lines in front of the first encounters have to be counted to know their line index
+            idx += count_log_lines(buffer, previous_pos, pos)
+            previous_pos = pos
+            self._header_idxs[header] = idx
+            self._header_offsets[header] = pos
 
+    def _check_headers(self):
+        """Warns about missing headers and raises an error if none were found at all."""
         # Throw warning and ignore missing headers, if no headers are found at all, throw error
         not_found_headers = [header for header, idx in self._header_idxs.items() if idx is None]
 
@@ -72,102 +212,218 @@ class LogFileParser:
             raise ValueError("No headers found in the log file.")
         elif not_found_headers:
             found_headers = [header for header, idx in self._header_idxs.items() if idx is not None]
-            warnings.warn(f"Headers not found: {', '.join(not_found_headers)}. Headers found: {', '.join(found_headers)}.", stacklevel=2)
-        # This is a command method, return none 
+            warnings.warn(f"Headers not found: {', '.join(not_found_headers)}. Headers found: {', '.join(found_headers)}.", stacklevel=3)
 
-    def _extract_lines(self):
-        """Extracts the lines of interest between the identified headers."""
+    def _extract_lines(self, sections=None):
+        """Extracts the lines of interest between the identified headers, of the given section names (all by default)."""
         # Ensure the headers have been extracted
         if not any(self._header_idxs.values()):
             self._extract_headers()
 
-        query_execution_start, query_execution_identifier = self._header_idxs["INFO  : Query Execution Summary"], "INFO  : -------"
-        task_execution_start, task_execution_identifier = self._header_idxs["INFO  : Task Execution Summary"], "INFO  : -------"
-        detailed_metrics_start, detailed_metrics_identifier = self._header_idxs["INFO  : org.apache.tez.common.counters.DAGCounter:"], "INFO  : Completed executing command(queryId="
-        
-        def extract_lines_until_identifier(start_idx, finish_identifier):
-            # Case where header was not found in the first place
-            if start_idx is None:
-                return None
-            
-            idx = start_idx
-            while idx < len(self._lines) and finish_identifier not in self._lines[idx][1]:
-                idx += 1
-            return self._lines[start_idx:idx]
-        
-        # Some index adjustments are needed for the starting index because the actual lines that we are interested in dont start from header while also they differ between Query/Task and Detailed
+        # Only the regions starting at the headers are read and decoded, the sections are cut out with the exact same rules
+        # as the streaming mode uses: Query/Task lines start 3 lines after their header (table header lines are skipped) and
+        # end at the next dashed line while Detailed lines start at the header itself and end at the completed command line.
         # If any structural errors further exist in the logfile, the other classes which are more specific to each metric type will throw it
-        query_execution_lines = extract_lines_until_identifier(query_execution_start+3, query_execution_identifier) if query_execution_start is not None else None
-        task_execution_lines = extract_lines_until_identifier(task_execution_start+3, task_execution_identifier) if task_execution_start is not None else None
-        detailed_metrics_lines = extract_lines_until_identifier(detailed_metrics_start-1, detailed_metrics_identifier) if detailed_metrics_start is not None else None
-        
-        return query_execution_lines, task_execution_lines, detailed_metrics_lines 
-    
-    def parse(self):
-        """Calls helper methods to extract and parse the log data into structured summaries."""
-        self._extract_headers()
-        query_execution_lines, task_execution_lines, detailed_metrics_lines = self._extract_lines()
-
-        self.query_summary, self.query_errors = QuerySummary(query_execution_lines).data if query_execution_lines else (None, None)
-        self.task_summary, self.task_errors = TaskExecutionSummary(task_execution_lines).data if task_execution_lines else (None, None)
-        self.detailed_summary, self.detailed_errors = DetailedMetrics(detailed_metrics_lines).data if detailed_metrics_lines else (None, None)        
-
-    def save(self):
+        extracted_lines = {}
+        with self._stage("extract_lines") as stage, open(self._log_file_path, 'rb') as file:
+            for name, spec in self._specs.items():
+                header = spec.header
+                if self._header_idxs[header] is None or (sections is not None and name not in sections):
+                    # Case where header was not found in the first place (or the section is not needed now)
+                    extracted_lines[name] = None
+                    continue
+
+                file.seek(self._header_offsets[header])
+                stream = SectionStream(sections=(spec.definition,), warn_duplicates=False)
+                for idx, _, line in iter_log_lines(file, self._header_idxs[header], self._header_offsets[header]):
+                    stream.feed(idx, line)
+                    stage.lines += 1
+                    if not stream.active():
+                        break
+                stage.bytes += file.tell() - self._header_offsets[header]
+                extracted_lines[name] = stream.section_lines[header] or None
+
+        return extracted_lines
+
+
+    def _stream_lines(self, queries=None):
+        """Reads the log file once, line by line, and collects the lines of interest on the fly (and the queries, if `queries` is a list)."""
+        # The lines of every registered section are routed in this single pass
+        stream = SectionStream(sections=tuple(spec.definition for spec in self._specs.values()))
+        with self._stage("stream_lines") as stage, open_log(self._log_file_path, self._compression) as file:
+            if queries is None:
+                stage.lines += stream.feed_file(file)
+            else:
+                stage.lines += self._feed_queries(stream, file, queries)
+            stage.bytes += file.tell()
+
+        self._header_idxs = dict(stream.header_idxs)
+        self._check_headers()
+
+        return {name: stream.section_lines[spec.header] or None for name, spec in self._specs.items()}
+
+    def _feed_queries(self, stream, file, queries):
+        """Feeds every line of the file to the section stream and appends the QueryRecord of every query to `queries`, returns the number of lines."""
+        query_stream = QueryStream(extra=self._extra_specs())
+        headers = stream.header_idxs
+        lines = 0
+        for lines, offset, line in iter_log_lines(file):
+            # Outside of its sections the stream only changes on header lines, the other lines can skip the call
+            if line in headers or stream.active():
+                stream.feed(lines, line)
+            record = query_stream.feed(lines, offset, line)
+            if record is not None:
+                queries.append(record)
+        record = query_stream.flush()
+        if record is not None:
+            queries.append(record)
+        return lines
+
+    def parse(self, use_cache=True, queries=None):
+        """Calls helper methods to extract and parse the log data into structured summaries, and splits the queries into the `queries` list if one is given."""
+        with self._profiled():
+            if self._cache is None or not use_cache:
+                self._parse(queries)
+                return
+
+            with self._stage("cache"):
+                cached = self._cache.get(self._log_file_path)
+            if cached is not None:
+                # The cache only holds the built-in sections, the others are read from the log file on first access
+                self._pending = set(self._specs) - set(SECTION_NAMES)
+                self._section_lines.clear()
+                for field in RESULT_FIELDS:
+                    setattr(self, field, cached[field])
+                # The warnings of the original parse are given again, the results would not make sense without them
+                for message in cached["warnings"]:
+                    warnings.warn(message, stacklevel=2)
+                # The summaries did not need the log file, the queries still do
+                if queries is not None:
+                    queries.extend(self.iter_queries())
+                return
+
+            caught = []
+            try:
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter("always")
+                    self._parse(queries)
+                results = {field: getattr(self, field) for field in RESULT_FIELDS}
+                results["warnings"] = [str(warning.message) for warning in caught]
+                with self._stage("cache"):
+                    self._cache.put(self._log_file_path, results)
+            finally:
+                for warning in caught:
+                    warnings.warn_explicit(warning.message, warning.category, warning.filename, warning.lineno)
+
+    def _parse(self, queries=None):
+        """Extracts and parses the log data, without looking at the cache."""
+        self._pending.clear()
+        self._section_lines.clear()
+        # A compressed file can not be memory mapped, it is decompressed while it is streamed
+        # The queries need every line anyway, then the summaries are collected in the same read
+        if self._stream or self._compression or queries is not None:
+            section_lines = self._stream_lines(queries)
+            # The lines of every section were read anyway, the ones that are not needed now are kept for later
+            self._section_lines = {name: lines for name, lines in section_lines.items() if name not in self._selected}
+        else:
+            self._extract_headers()
+            section_lines = self._extract_lines(self._selected)
+
+        self._parse_sections(section_lines)
+
+    def _parse_sections(self, section_lines):
+        """Parses the extracted lines of each selected section into structured summaries, the others are left for later."""
+        for name, spec in self._specs.items():
+            if name in self._selected:
+                self._results[name] = spec.parse(section_lines[name], self.stats)
+            else:
+                self._pending.add(name)
+
+    def _parse_pending(self, name):
+        """Extracts (if needed) and parses a section that was left for later."""
+        if name not in self._section_lines:
+            # The warnings about the headers were given by parse() already
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                if self._stream or self._compression:
+                    section_lines = self._stream_lines()
+                    self._section_lines = {pending: section_lines[pending] for pending in self._pending}
+                else:
+                    self._section_lines[name] = self._extract_lines({name})[name]
+        self._results[name] = self._specs[name].parse(self._section_lines.pop(name), self.stats)
+        self._pending.discard(name)
+
+    def _section_data(self, name):
+        if name in self._pending:
+            self._parse_pending(name)
+        return self._results.get(name, (None, None))
+
+    def section_data(self, name):
+        """Returns (summary, errors) of any registered section, parsing it first if parse() left it for later."""
+        if name not in self._specs:
+            raise ValueError(f"Unknown section: {name}. Expected one of: {', '.join(self._specs)}.")
+        return self._section_data(name)
+
+    def iter_queries(self):
+        """Yields a QueryRecord for every query (Completed executing command block) of the log file, with its registered extra sections."""
+        extra = self._extra_specs()
+        # Always read lazily, so the first query is available before the rest of the file has been read
+        with open_log(self._log_file_path, self._compression) as file:
+            yield from iter_queries(file, extra=extra)
+
+    def save(self, output_dir='./RunResults'):
         """Saves the parsed summaries and parser logs (errors) to specified directory paths."""
-        # Ensure directories exist
-        if not os.path.exists('./RunResults/Summaries/'):
-            os.makedirs('./RunResults/Summaries/')
-        if not os.path.exists('./RunResults/ParserLogs/'):
-            os.makedirs('./RunResults/ParserLogs/')
-        
-        # Remove existing summaries
-        summaries = ['query_summary.txt', 'task_summary.txt', 'detailed_summary.txt']
-        for summary_file in summaries:
-            summary_path = os.path.join('./RunResults/Summaries/', summary_file)
-            if os.path.exists(summary_path):
-                os.remove(summary_path)
-        
-        # Remove existing parser_error_logs.txt
-        if os.path.exists('./RunResults/ParserLogs/parser_error_logs.txt'):
-            os.remove('./RunResults/ParserLogs/parser_error_logs.txt')
-        
-        # Write the summaries
-        with open('./RunResults/Summaries/query_summary.txt', 'w') as f:
-            f.write(str(self.query_summary))
-        with open('./RunResults/Summaries/task_summary.txt', 'w') as f:
-            f.write(str(self.task_summary))
-        with open('./RunResults/Summaries/detailed_summary.txt', 'w') as f:
-            f.write(str(self.detailed_summary))
-        
-        # Write the errors
-        with open('./RunResults/ParserLogs/parser_error_logs.txt', 'w') as f:
-            f.write("===============================\n")
-            f.write("Query Summary Errors:\n")
-            f.write("===============================\n")
-            for error in self.query_errors or []:
-                f.write(error + "\n")
-            f.write("\n===============================\n")
-            f.write("Task Execution Errors:\n")
-            f.write("===============================\n")
-            for error in self.task_errors or []:
-                f.write(error + "\n")
-            f.write("\n===============================\n")
-            f.write("Detailed Metrics Errors:\n")
-            f.write("===============================\n")
-            for error in self.detailed_errors or []:
-                f.write(error + "\n")
-
-    def delete(self):
+        with self._profiled(), self._stage("save") as stage:
+            writer = ResultWriter(output_dir)
+            extra_sections = self._extra_sections()
+
+            # Every file is built in memory and replaced in one go, a reader never sees a missing or half written file
+            summaries = {
+                'query_summary.txt': self.query_summary,
+                'task_summary.txt': self.task_summary,
+                'detailed_summary.txt': self.detailed_summary,
+            }
+            for name in extra_sections:
+                summaries[f'{name}.txt'] = self.section_data(name)[0]
+            for summary_file, summary in summaries.items():
+                writer.write(os.path.join('Summaries', summary_file), str(summary))
+
+            # Write the errors
+            errors = [("Query Summary Errors:", self.query_errors),
+                      ("Task Execution Errors:", self.task_errors),
+                      ("Detailed Metrics Errors:", self.detailed_errors)]
+            errors += [(f"{name} Errors:", self.section_data(name)[1]) for name in extra_sections]
+            parts = []
+            for title, section_errors in errors:
+                # A blank line between the blocks
+                if parts:
+                    parts.append("\n")
+                parts.append(f"===============================\n{title}\n===============================\n")
+                parts.extend(error + "\n" for error in section_errors or [])
+            writer.write(os.path.join('ParserLogs', 'parser_error_logs.txt'), "".join(parts))
+
+            stage.bytes += writer.bytes_written
+
+    def _extra_sections(self):
+        """Returns the names of the registered sections besides the three built-in ones."""
+        return [name for name in self._specs if name not in SECTION_NAMES]
+
+    def _extra_specs(self):
+        """Returns the SectionSpecs of the registered sections besides the three built-in ones."""
+        return tuple(self._specs[name] for name in self._extra_sections())
+
+    def delete(self, output_dir='./RunResults'):
         """Deletes the previously saved summaries and parser logs."""
-        # List of summary files to delete
-        summaries = ['query_summary.txt', 'task_summary.txt', 'detailed_summary.txt']
-        
+        writer = ResultWriter(output_dir)
         # Remove summary files
+        summaries = ['query_summary.txt', 'task_summary.txt', 'detailed_summary.txt'] + [f'{name}.txt' for name in self._extra_sections()]
         for summary_file in summaries:
-            summary_path = os.path.join('./RunResults/Summaries/', summary_file)
-            if os.path.exists(summary_path):
-                os.remove(summary_path)
-        
+            writer.remove(os.path.join('Summaries', summary_file))
+
         # Remove parser_error_logs.txt
-        if os.path.exists('./RunResults/ParserLogs/parser_error_logs.txt'):
-            os.remove('./RunResults/ParserLogs/parser_error_logs.txt')
+        writer.remove(os.path.join('ParserLogs', 'parser_error_logs.txt'))
+
+    def save_columnar(self, path, source=None):
+        """Appends the parsed summaries to a binary columnar results file (the rows are tagged with the log file path by default)."""
+        with ColumnarWriter(path) as writer:
+            writer.append(self, self._log_file_path if source is None else source)
@@ -0,0 +1,154 @@
+"""
+log_follower.py
+
+Incremental parsing of a live, growing log file.
+
+Re-parsing a HiveServer2 log from byte 0 every few minutes wastes most of the work on lines that were already parsed.
+The `LogFollower` class in this module remembers how far it got (the byte offset of the next unread line, the index of
+that line and the partially collected sections of the query in progress) in a small JSON checkpoint file, only reads
+what was appended since and returns a `QueryRecord` as soon as the `Completed executing command` line of a query shows up.
+After a restart it continues from the checkpoint. The checkpoint is only written once the caller is done with the
+queries of a poll, so a crash never loses a query (it may return the queries of the last poll again).
+
+Constants:
+- `CHECK_BYTES`: Number of bytes before the checkpointed offset whose hash tells whether the file was rewritten.
+
+Classes:
+- `LogFollower`: Follows a log file and parses each query as soon as it completes.
+"""
+import hashlib
+import json
+import os
+import time
+from .query_stream import QueryStream
+from .section_stream import iter_log_lines
+
+CHECK_BYTES = 4096
+
+
+class LogFollower:
+    """
+    LogFollower follows a growing log file and parses each query as soon as it completes.
+
+    Attributes:
+        log_file_path (str): Path of the followed log file.
+        checkpoint_path (str): Path of the JSON checkpoint file (None to keep the progress in memory only).
+        offset (int): Byte offset of the next unread line.
+        line_idx (int): Line index of the next unread line.
+        _stream (QueryStream): The query splitter holding the partially collected query in progress.
+        _file_id (list): Device and inode of the followed file, used to notice a rotated log file.
+        _check_hash (str): Hash of the CHECK_BYTES bytes before `offset`, used to notice a file truncated and regrown.
+        _saved_offset (int): The offset of the last written checkpoint, None before the first one.
+
+    Methods:
+        __init__(self, log_file_path, checkpoint_path): Constructor that loads the checkpoint if there is one.
+        poll(self): Parses whatever was appended since the last poll and returns the completed queries.
+        follow(self, interval, stop): Yields completed queries forever (or until stop() returns True), polling every `interval` seconds.
+        save_checkpoint(self): Writes the progress to the checkpoint file, if any was made since the last one.
+
+    Description:
+        Only complete lines are consumed, a line that is still being written (no line break yet) is left for the next
+        poll. If the file got truncated or replaced by a new one (log rotation) following starts over from its beginning.
+        A file truncated and written again past the old offset has the same inode and is not shorter, so the hash of
+        the bytes just before the offset is kept too and compared before reading on.
+
+    Notes:
+        poll() does not write the checkpoint, call save_checkpoint() once the returned queries are handled. follow()
+        does so after the caller consumed every query of a poll, so after a crash the queries of the interrupted poll
+        are returned again (at least once delivery) instead of being lost. Polls that read nothing write nothing.
+    """
+    def __init__(self, log_file_path, checkpoint_path=None):
+        """Constructor that loads the checkpoint if there is one."""
+        self.log_file_path = log_file_path
+        self.checkpoint_path = checkpoint_path
+        self._reset()
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint["log_file_path"] == os.path.abspath(log_file_path):
+                self.offset = checkpoint["offset"]
+                self.line_idx = checkpoint["line_idx"]
+                self._file_id = checkpoint["file_id"]
+                # Older checkpoints have no hash, their file is not checked
+                self._check_hash = checkpoint.get("check_hash")
+                self._stream.set_state(checkpoint["stream"])
+                self._saved_offset = self.offset
+
+    def _reset(self):
+        self.offset = 0
+        self.line_idx = 1
+        self._file_id = None
+        self._check_hash = None
+        self._saved_offset = None
+        self._stream = QueryStream()
+
+    def _hash_before(self, file, offset):
+        """Returns the hash of the CHECK_BYTES bytes before `offset` (fewer at the start of the file)."""
+        start = max(0, offset - CHECK_BYTES)
+        file.seek(start)
+        return hashlib.blake2b(file.read(offset - start), digest_size=16).hexdigest()
+
+    def _complete_lines(self, file):
+        """Yields the raw lines of the file from the current offset on, stopping at a line that is still being written."""
+        for raw_line in file:
+            if not raw_line.endswith(b"\n"):
+                return
+            yield raw_line
+
+    def poll(self):
+        """Parses whatever was appended since the last poll and returns the completed queries."""
+        records = []
+        with open(self.log_file_path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            file_id = [stat.st_dev, stat.st_ino]
+            # A truncated or rotated log file is followed from its beginning again
+            if (self._file_id is not None and file_id != self._file_id) or stat.st_size < self.offset:
+                self._reset()
+            elif self._check_hash is not None and self._hash_before(file, self.offset) != self._check_hash:
+                # Same inode, not shorter, but other bytes before the offset: truncated and written again
+                self._reset()
+            self._file_id = file_id
+
+            start = self.offset
+            file.seek(self.offset)
+            for raw_line in self._complete_lines(file):
+                for idx, offset, line in iter_log_lines((raw_line,), self.line_idx, self.offset):
+                    record = self._stream.feed(idx, offset, line)
+                    if record is not None:
+                        records.append(record)
+                    self.line_idx = idx + 1
+                self.offset += len(raw_line)
+            if self.offset != start or self._check_hash is None:
+                self._check_hash = self._hash_before(file, self.offset)
+
+        return records
+
+    def follow(self, interval=1.0, stop=None):
+        """Yields completed queries forever (or until stop() returns True), polling every `interval` seconds."""
+        while stop is None or not stop():
+            records = self.poll()
+            yield from records
+            # Only here the caller is done with every query of the poll
+            self.save_checkpoint()
+            if not records:
+                time.sleep(interval)
+
+    def save_checkpoint(self):
+        """Writes the progress to the checkpoint file, if any was made since the last one."""
+        if not self.checkpoint_path or self.offset == self._saved_offset:
+            return
+        checkpoint = {
+            "log_file_path": os.path.abspath(self.log_file_path),
+            "file_id": self._file_id,
+            "offset": self.offset,
+            "check_hash": self._check_hash,
+            "line_idx": self.line_idx,
+            "stream": self._stream.get_state(),
+        }
+        # Write a temporary file next to the checkpoint and swap it in, so a crash never leaves a half written checkpoint
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+        self._saved_offset = self.offset
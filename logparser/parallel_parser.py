@@ -0,0 +1,105 @@
+"""
+parallel_parser.py
+
+Process-pool parsing of large multi-query log files.
+
+Every query of a log file ends with an `INFO  : Completed executing command(queryId=...)` line and the queries do not
+depend on each other, so a big log file can be cut into byte ranges right after such lines and each range can be
+parsed on its own. This module finds these boundaries, parses every range in a `ProcessPoolExecutor` worker with the
+same `QueryStream` logic `LogFileParser.iter_queries` uses and merges the resulting `QueryRecord`s back in file order.
+
+Functions:
+- `find_query_boundaries(log_file_path, ranges)`: Returns byte offsets splitting the file in about `ranges` pieces at query boundaries.
+- `parse_parallel(log_file_path, workers, ranges)`: Parses the log file in parallel and returns its QueryRecords in order.
+
+Notes:
+    The line indexes reported in the records and in the error messages are the same as with a sequential parse. To
+    achieve this the lines of every range are counted first (also in parallel, with a fast newline count whenever the
+    range holds no exotic line separators) so every worker knows the index of the first line of its range.
+
+    Compressed log files can not be cut in byte ranges, they are parsed sequentially.
+"""
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .compressed import detect_compression, open_log
+from .query_stream import iter_queries
+from .section_stream import QUERY_COMPLETED, count_log_lines, iter_raw_lines
+
+QUERY_COMPLETED_BYTES = QUERY_COMPLETED.encode()
+
+
+def find_query_boundaries(log_file_path, ranges):
+    """Returns byte offsets splitting the file in about `ranges` pieces, every piece starting right after a query."""
+    size = os.path.getsize(log_file_path)
+    if size == 0:
+        return [0, 0]
+
+    boundaries = [0]
+    with open(log_file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for i in range(1, ranges):
+            target = max(size * i // ranges, boundaries[-1])
+            marker = buffer.find(QUERY_COMPLETED_BYTES, target)
+            if marker == -1:
+                break
+            line_end = buffer.find(b"\n", marker)
+            boundary = size if line_end == -1 else line_end + 1
+            if boundary > boundaries[-1] and boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return boundaries
+
+
+def _count_lines(log_file_path, start, end):
+    """Counts the lines of a byte range exactly like iter_log_lines() numbers them."""
+    with open(log_file_path, 'rb') as file:
+        return count_log_lines(file, start, end)
+
+
+def _parse_range(log_file_path, start, end, first_idx):
+    """Parses the queries of a byte range, this is the work done by every worker process."""
+    with open(log_file_path, 'rb') as file:
+        file.seek(start)
+        return list(iter_queries(iter_raw_lines(file, end), first_idx, start))
+
+
+def parse_parallel(log_file_path, workers=None, ranges=None):
+    """
+    Parses a multi-query log file in parallel and returns its QueryRecords in file order.
+
+    Args:
+        log_file_path (str): Path of the log file.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+        ranges (int): Number of byte ranges to cut the file in, defaults to 4 per worker for a better load balance.
+    """
+    # A compressed file can only be read from its beginning, so it can not be cut in ranges
+    if detect_compression(log_file_path):
+        with open_log(log_file_path) as file:
+            return list(iter_queries(file))
+
+    workers = workers or os.cpu_count() or 1
+    boundaries = find_query_boundaries(log_file_path, ranges or workers * 4)
+    starts, ends = boundaries[:-1], boundaries[1:]
+
+    # Nothing to gain from a process pool when the file could not be split
+    if workers == 1 or len(starts) == 1:
+        counts = [_count_lines(log_file_path, start, end) for start, end in zip(starts, ends)]
+        first_idxs = _first_idxs(counts)
+        return [record for start, end, first_idx in zip(starts, ends, first_idxs) for record in _parse_range(log_file_path, start, end, first_idx)]
+
+    paths = [log_file_path] * len(starts)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = list(executor.map(_count_lines, paths, starts, ends))
+        first_idxs = _first_idxs(counts)
+        results = executor.map(_parse_range, paths, starts, ends, first_idxs)
+        return [record for records in results for record in records]
+
+
+def _first_idxs(counts):
+    """Turns the line counts of the ranges into the index of the first line of each range."""
+    first_idxs = []
+    idx = 1
+    for count in counts:
+        first_idxs.append(idx)
+        idx += count
+    return first_idxs
@@ -0,0 +1,219 @@
+"""
+query_stream.py
+
+Splitting of multi-query log files into per-query records.
+
+A HiveServer2/beeline log usually contains many queries, each one closed by an
+`INFO  : Completed executing command(queryId=...)` line. The classes in this module cut the log file into these query
+blocks while reading it line by line, collect the summary sections of every block with a `SectionStream` and parse
+them into a `QueryRecord` as soon as the block is complete. Sections registered on top of the built-in ones (see
+`logparser.section_registry`) can be collected per query too, they end up in `QueryRecord.sections`.
+
+Classes:
+- `QueryRecord`: The parsed summaries and errors of a single query.
+- `QueryStream`: Splits a stream of log lines into query blocks and parses each completed block.
+
+Functions:
+- `parse_section(section, lines, stats)`: Runs the parser of one section (an index into `SECTIONS`) on its extracted lines.
+- `parse_sections(...)`: Runs the three section parsers on the extracted lines of each section.
+- `parse_query_block(...)`: Parses the collected section lines of one query block into a `QueryRecord`.
+- `iter_queries(file, first_idx, first_offset, extra)`: Yields a `QueryRecord` for every query found in a binary file object.
+"""
+import re
+from .section_registry import BUILTIN_SECTIONS
+from .section_stream import SECTIONS, SectionStream, iter_log_lines, QUERY_COMPLETED
+
+QUERY_ID_PATTERN = re.compile(r"queryId=([^)]*)\)")
+
+# The summary attribute of every built-in section, in the order of `section_stream.SECTIONS`
+SECTION_NAMES = tuple(spec.name for spec in BUILTIN_SECTIONS)
+
+
+def parse_section(section, lines, stats=None):
+    """Runs the parser of one built-in section (an index into SECTIONS) on its lines, returns (summary, errors) or (None, None) for a missing section."""
+    return BUILTIN_SECTIONS[section].parse(lines, stats)
+
+
+def parse_sections(query_execution_lines, task_execution_lines, detailed_metrics_lines, stats=None):
+    """Runs the three section parsers (timed into `stats`, a ParserStats, if given), missing sections give (None, None)."""
+    query_summary, query_errors = parse_section(0, query_execution_lines, stats)
+    task_summary, task_errors = parse_section(1, task_execution_lines, stats)
+    detailed_summary, detailed_errors = parse_section(2, detailed_metrics_lines, stats)
+    return query_summary, query_errors, task_summary, task_errors, detailed_summary, detailed_errors
+
+
+def parse_query_block(query_id, line_idx, offset, section_lines, extra=()):
+    """Parses the section lines of one query block (one list or None per built-in section, then per `extra` SectionSpec) into a QueryRecord."""
+    record = QueryRecord(query_id, line_idx, offset)
+    builtin = len(BUILTIN_SECTIONS)
+    (record.query_summary, record.query_errors,
+     record.task_summary, record.task_errors,
+     record.detailed_summary, record.detailed_errors) = parse_sections(*section_lines[:builtin])
+    for spec, lines in zip(extra, section_lines[builtin:]):
+        record.sections[spec.name] = spec.parse(lines)
+    return record
+
+
+def _error_list(errors):
+    return None if errors is None else list(errors)
+
+
+class QueryRecord:
+    """
+    QueryRecord holds the parsed summaries and errors of a single query of a log file.
+
+    Attributes:
+        query_id (str): The queryId of the `Completed executing command` line closing the query (None for a trailing, unfinished block).
+        line_idx (int): Line index of the first line of the query block.
+        offset (int): Byte offset of the first line of the query block.
+        query_summary, query_errors: Same as `LogFileParser.query_summary` and `LogFileParser.query_errors`.
+        task_summary, task_errors: Same as `LogFileParser.task_summary` and `LogFileParser.task_errors`.
+        detailed_summary, detailed_errors: Same as `LogFileParser.detailed_summary` and `LogFileParser.detailed_errors`.
+        sections (dict): (summary, errors) of every extra registered section that was collected, by section name.
+
+    Methods:
+        section_data(self, name): Returns (summary, errors) of a built-in or collected extra section.
+        to_dict(self): Returns the record as a plain dictionary.
+    """
+    def __init__(self, query_id, line_idx, offset, query_summary=None, query_errors=None, task_summary=None,
+                 task_errors=None, detailed_summary=None, detailed_errors=None):
+        """Constructor that initializes the QueryRecord object."""
+        self.query_id = query_id
+        self.line_idx = line_idx
+        self.offset = offset
+        self.query_summary = query_summary
+        self.query_errors = query_errors
+        self.task_summary = task_summary
+        self.task_errors = task_errors
+        self.detailed_summary = detailed_summary
+        self.detailed_errors = detailed_errors
+        self.sections = {}
+
+    def section_data(self, name):
+        """Returns (summary, errors) of a built-in or collected extra section, (None, None) for a section it does not have."""
+        if name in SECTION_NAMES:
+            prefix = name.split("_")[0]
+            return getattr(self, name), getattr(self, f"{prefix}_errors")
+        return self.sections.get(name, (None, None))
+
+    def to_dict(self):
+        """Returns the record as a plain dictionary, with the error messages as lists (and `<name>`, `<name>_errors` of every extra section)."""
+        record = {
+            "query_id": self.query_id,
+            "line_idx": self.line_idx,
+            "offset": self.offset,
+            "query_summary": self.query_summary,
+            "query_errors": _error_list(self.query_errors),
+            "task_summary": self.task_summary,
+            "task_errors": _error_list(self.task_errors),
+            "detailed_summary": self.detailed_summary,
+            "detailed_errors": _error_list(self.detailed_errors),
+        }
+        for name, (summary, errors) in self.sections.items():
+            record[name] = summary
+            record[f"{name}_errors"] = _error_list(errors)
+        return record
+
+    def __repr__(self):
+        return f"QueryRecord(query_id={self.query_id!r}, line_idx={self.line_idx}, offset={self.offset})"
+
+
+class QueryStream:
+    """
+    QueryStream splits a stream of log lines into query blocks and parses every block as soon as it is complete.
+
+    Attributes:
+        _sections (SectionStream): Collector of the summary sections of the current query block.
+        _line_idx (int): Line index of the first line of the current query block.
+        _offset (int): Byte offset of the first line of the current query block.
+        _parse (bool): Whether completed blocks are parsed right away or handed out unparsed.
+        _extra (tuple): SectionSpecs of the sections collected per query on top of the built-in ones.
+
+    Methods:
+        __init__(self, parse, extra): Constructor that initializes an empty stream.
+        feed(self, idx, offset, line): Processes the next line, returns a QueryRecord when the line completes a query.
+        flush(self): Returns a QueryRecord for the trailing unfinished block if it contains any header.
+        get_state(self): Returns the progress of the unfinished block as a JSON serializable dictionary.
+        set_state(self, state): Restores the progress of the unfinished block from a dictionary made by get_state().
+
+    Description:
+        Each query block runs from the line after the previous `Completed executing command(queryId=...)` line (or the
+        start of the file) up to and including its own completion line. Inside a block the sections are extracted with
+        the exact same rules `LogFileParser` applies to the whole file, except that no section can run past the end of its
+        block. Headers found more than once inside the same block keep their first instance silently.
+
+        Log lines split by separators such as a form feed share the byte offset of their physical line. Whatever follows a
+        completion line on the same physical line still belongs to the completed query and is ignored, so that a query block
+        always starts on a new physical line, which is what lets `parallel_parser` cut the file at query boundaries.
+
+        With `parse=False` feed() and flush() return the unparsed block instead of a QueryRecord, as the
+        `(query_id, line_idx, offset, section_lines, extra)` arguments of parse_query_block(), so the section parsers can
+        run somewhere else (e.g. in an executor, see `async_parser`).
+    """
+    def __init__(self, parse=True, extra=()):
+        """Constructor that initializes an empty stream, `extra` are the SectionSpecs collected on top of the built-in sections."""
+        self._parse = parse
+        self._extra = tuple(extra)
+        self._sections_definition = SECTIONS + tuple(spec.definition for spec in self._extra)
+        self._completed_offset = None
+        self._start_block(None, None)
+
+    def _start_block(self, line_idx, offset):
+        self._sections = SectionStream(self._sections_definition, warn_duplicates=False)
+        self._line_idx = line_idx
+        self._offset = offset
+
+    def _record(self, query_id):
+        block = (query_id, self._line_idx, self._offset, [lines or None for lines in self._sections.section_lines.values()], self._extra)
+        return parse_query_block(*block) if self._parse else block
+
+    def feed(self, idx, offset, line):
+        """Processes the next line, returns a QueryRecord when the line completes a query."""
+        if offset == self._completed_offset:
+            return None
+        if self._line_idx is None:
+            self._line_idx, self._offset = idx, offset
+        self._sections.feed(idx, line)
+
+        if QUERY_COMPLETED not in line:
+            return None
+        match = QUERY_ID_PATTERN.search(line)
+        record = self._record(match.group(1) if match else None)
+        self._completed_offset = offset
+        self._start_block(None, None)
+        return record
+
+    def get_state(self):
+        """Returns the progress of the unfinished block as a JSON serializable dictionary."""
+        return {
+            "completed_offset": self._completed_offset,
+            "line_idx": self._line_idx,
+            "offset": self._offset,
+            "sections": self._sections.get_state(),
+        }
+
+    def set_state(self, state):
+        """Restores the progress of the unfinished block from a dictionary made by get_state()."""
+        self._start_block(state["line_idx"], state["offset"])
+        self._completed_offset = state["completed_offset"]
+        self._sections.set_state(state["sections"])
+
+    def flush(self):
+        """Returns a QueryRecord for the trailing unfinished block if it contains any header."""
+        if not self._sections.found_headers():
+            return None
+        record = self._record(None)
+        self._start_block(None, None)
+        return record
+
+
+def iter_queries(file, first_idx=1, first_offset=0, extra=()):
+    """Yields a QueryRecord for every query found in a binary file object, with the `extra` SectionSpecs collected per query."""
+    stream = QueryStream(extra=extra)
+    for idx, offset, line in iter_log_lines(file, first_idx, first_offset):
+        record = stream.feed(idx, offset, line)
+        if record is not None:
+            yield record
+    record = stream.flush()
+    if record is not None:
+        yield record
@@ -1,21 +1,27 @@
-import re
+from .error_collector import MAX_SAMPLES, QUERY_CORRUPT_LINE, QUERY_MISSING_OPERATION, ErrorCollector
+from .line_classifier import MAX_MATCH_LENGTH, OPERATION, QUERY_CLASSIFIER, scan_operation
 
 class QuerySummary:
     """
     QuerySummary class is responsible for parsing specific lines of log data to extract the summaries of query operations.
 
     Attributes:
-        _data (tuple): A tuple containing parsed summary data and errors encountered during parsing.
+        lines_matched (int): Number of lines that matched a pattern.
+        lines_failed (int): Number of lines that matched no pattern and were reported as errors.
+        lines_scanned (int): Number of lines longer than `max_line_length`, read by the tokenizer instead of the pattern.
+        max_errors (int): Number of errors kept per error code (the others are only counted), None keeps all.
+        max_line_length (int): Lines longer than this are read by the linear time tokenizer `scan_operation`.
+        _data (tuple): A tuple containing parsed summary data and errors (an ErrorCollector) encountered during parsing.
 
     Methods:
-        __init__(self, lines): Constructor that initializes the QuerySummary object and triggers the parsing process.
+        __init__(self, lines, max_errors, max_line_length): Constructor that initializes the QuerySummary object and triggers the parsing process.
         data: A property that returns the parsed data.
         _parse(self, lines): A private method that performs the actual parsing of provided log lines.
 
     Description:
         The class is designed to identify and extract information about critical query operations and their respective
         execution durations from the provided log lines. The critical operations are predefined and consist of operations
-        such as "Compile Query", "Prepare Plan", etc. The class uses regular expressions to identify valid log lines, extract 
+        such as "Compile Query", "Prepare Plan", etc. The class uses the shared, precompiled `QUERY_CLASSIFIER` to identify valid log lines, extract 
         the operation names and their durations, and finally returns the parsed data and any errors encountered during the 
         parsing process.
 
@@ -28,10 +34,18 @@ class QuerySummary:
     Notes:
         If a log line doesn't match the expected structure, it's considered as an error and is reported while it is also skipped from the summary.
         If any of the critical operations are missing from the log lines, an error is reported for each missing operation.
+        The pattern nests quantifiers, a long corrupt line (a stack trace glued to a summary line, ...) is therefore not
+        given to it but read by `scan_operation`, which gives the same values in a single pass, so the time spent on a
+        line is bounded by its length.
     """
 
-    def __init__(self, lines):
+    def __init__(self, lines, max_errors=MAX_SAMPLES, max_line_length=MAX_MATCH_LENGTH):
         """Constructor that initializes the QuerySummary object and triggers the parsing process."""
+        self.max_errors = max_errors
+        self.max_line_length = max_line_length
+        self.lines_scanned = 0
+        self.lines_matched = 0
+        self.lines_failed = 0
         self._data = self._parse(lines)
     
     @property
@@ -50,28 +64,46 @@ class QuerySummary:
             "Run DAG"
         ]
         summary = {}
-        errors = []
+        errors = ErrorCollector(self.max_errors)
 
         encountered_operations = set()
 
-        # Make a regex of what a correct line pattern will look like for Query Summary lines
-        pattern = re.compile(r"^INFO\s{2}:\s([a-zA-Z()]+(?:\s[a-zA-Z()]+)*?)\s+([\d.]+)s")
+        # The shared, precompiled classifier knows what a correct Query Summary line looks like
+        match = QUERY_CLASSIFIER.pattern.match
+        name_group, duration_group = QUERY_CLASSIFIER.value_groups[OPERATION]
+        max_line_length = self.max_line_length
+        matched = failed = scanned = 0
 
         for idx, line in lines:
-            match = pattern.search(line)
-            if match:
-                operation = match.group(1).rstrip()
-                duration = float(match.group(2))
+            if len(line) <= max_line_length:
+                token = match(line)
+                values = token.group(name_group, duration_group) if token is not None else None
+            else:
+                # Too long for the pattern, the tokenizer gives the same values in linear time
+                values = scan_operation(line)
+                scanned += 1
+            if values is not None:
+                # [\d.]+ also matches e.g. "." or "1.2.3", those lines are corrupt too
+                try:
+                    duration = float(values[1])
+                except ValueError:
+                    values = None
+            if values is not None:
+                operation = values[0].rstrip()
                 summary[operation] = f'{duration:.2f}'
+                matched += 1
                 encountered_operations.add(operation)
             else:
-                errors.append(f"Err parsing idx: {idx}, line: '{line.rstrip()}'. Line has corrupt structure... skipped")
+                errors.add(QUERY_CORRUPT_LINE, idx, line.rstrip())
+                failed += 1
                 continue
 
+        self.lines_matched, self.lines_failed, self.lines_scanned = matched, failed, scanned
+
         # If any critical operation is missing, append to the err
         for op in critical_operations:
             if op not in encountered_operations:
-                errors.append(f"Critical operation: '{op}' missing in the log data.")
+                errors.add(QUERY_MISSING_OPERATION, None, op)
 
         return summary, errors
 
@@ -0,0 +1,153 @@
+"""
+records.py
+
+Compact, read-only record types for the parsed metrics.
+
+Keeping the results of many queries in memory (for aggregations over a whole archive, for example) used to cost a dict
+per vertex of every Task Execution Summary and a dict of float objects per counter group of every DAG counter section.
+The classes in this module store the same numbers in `array('d')` buffers instead, behind `__slots__`, so no per value
+float objects and no per record hash tables are kept around. Both classes are `Mapping`s with the same keys, values,
+equality and repr as the dictionaries they replace, so existing code reading `summary["Map 1"]["DURATION"]` keeps working.
+
+Classes:
+- `VertexMetrics`: The five metrics of one vertex of a Task Execution Summary.
+- `CounterGroup`: The counters of one counter group of the detailed metrics.
+
+Notes:
+    The records are read-only, `dict(record)` gives a regular (mutable) dictionary.
+"""
+from array import array
+from collections.abc import Mapping
+
+# The counter names of every group seen so far, shared by all CounterGroups with the same counters (in the same order)
+_COUNTER_KEYS = {}
+
+
+class VertexMetrics(Mapping):
+    """
+    VertexMetrics holds the metrics of one vertex of a Task Execution Summary.
+
+    Attributes:
+        KEYS (tuple): The metric names, in the order of the columns of the summary.
+        _values (array): The metric values.
+
+    Methods:
+        __init__(self, duration, cpu_time, gc_time, input_records, output_records): Constructor that stores the metrics.
+        from_dict(cls, metrics): Makes a VertexMetrics from a dictionary with the KEYS.
+        duration, cpu_time, gc_time, input_records, output_records: Properties returning a single metric.
+
+    Usage:
+        metrics = task_summary["Map 1"]
+        metrics["DURATION"] == metrics.duration     # True
+        dict(metrics)                               # {'DURATION': 65013.0, 'CPU_TIME': 516890.0, ...}
+    """
+    __slots__ = ("_values",)
+
+    KEYS = ("DURATION", "CPU_TIME", "GC_TIME", "INPUT_RECORDS", "OUTPUT_RECORDS")
+    _INDEXES = {key: i for i, key in enumerate(KEYS)}
+
+    def __init__(self, duration, cpu_time, gc_time, input_records, output_records):
+        """Constructor that stores the metrics."""
+        self._values = array('d', (duration, cpu_time, gc_time, input_records, output_records))
+
+    @classmethod
+    def from_dict(cls, metrics):
+        """Makes a VertexMetrics from a dictionary with the KEYS."""
+        return cls(*(metrics[key] for key in cls.KEYS))
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._INDEXES[key]]
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return self.__class__, tuple(self._values)
+
+    @property
+    def duration(self):
+        return self._values[0]
+
+    @property
+    def cpu_time(self):
+        return self._values[1]
+
+    @property
+    def gc_time(self):
+        return self._values[2]
+
+    @property
+    def input_records(self):
+        return self._values[3]
+
+    @property
+    def output_records(self):
+        return self._values[4]
+
+
+class CounterGroup(Mapping):
+    """
+    CounterGroup holds the counters of one counter group (e.g. `org.apache.tez.common.counters.DAGCounter`).
+
+    Attributes:
+        _keys (tuple): The counter names, shared with every other group holding the same counters.
+        _indexes (dict): Position of every counter name in `_values`, shared like `_keys`.
+        _values (array): The counter values.
+
+    Methods:
+        __init__(self, names, values): Constructor that stores the counters.
+        from_dict(cls, counters): Makes a CounterGroup from a dictionary of counter names and values.
+
+    Description:
+        The same counter groups, with the same counters, show up in every query of a log file. The names and their
+        positions are therefore kept once per distinct list of names and each group only owns its array of values.
+
+    Usage:
+        group = detailed_summary["org.apache.tez.common.counters.DAGCounter"]
+        group["NUM_SUCCEEDED_TASKS"]
+        dict(group)
+    """
+    __slots__ = ("_keys", "_indexes", "_values")
+
+    def __init__(self, names, values):
+        """Constructor that stores the counters."""
+        names = tuple(names)
+        shared = _COUNTER_KEYS.get(names)
+        if shared is None:
+            shared = _COUNTER_KEYS[names] = (names, {name: i for i, name in enumerate(names)})
+        self._keys, self._indexes = shared
+        self._values = array('d', values)
+        if len(self._values) != len(self._keys):
+            raise ValueError(f"{len(self._keys)} counter names but {len(self._values)} values.")
+
+    @classmethod
+    def from_dict(cls, counters):
+        """Makes a CounterGroup from a dictionary of counter names and values."""
+        return cls(counters.keys(), counters.values())
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._indexes[key]]
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return self.__class__, (self._keys, tuple(self._values))
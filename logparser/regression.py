@@ -0,0 +1,372 @@
+"""
+regression.py
+
+Detection of slow queries against a stored baseline.
+
+The phase durations of the Query Execution Summary (`Compile Query`, `Run DAG`, ...) and the vertex durations of the
+Task Execution Summary only tell whether a query is slow when they are compared with earlier runs of the same query.
+The classes in this module give every query a fingerprint, built from its normalized query text when it is known or,
+if the caller opts in, from the shape of its DAG, keep a `Baseline` of the durations seen per fingerprint (a
+`MetricSummary` per phase and per vertex) and flag the runs whose durations are beyond configurable thresholds of the
+baseline.
+
+A log file does not hold the query text, so without `query_texts` the only thing telling queries apart is the shape of
+their DAG: the vertex names, the edges between them when the plan is logged (see `logparser.vertex_analysis`), the
+order of magnitude of the input records of every vertex and the set of phases. Unrelated queries of a common shape
+(`Map 1` -> `Reducer 2` over similar data volumes) still share such a fingerprint, and one baseline then mixes their
+durations, which makes its thresholds meaningless. This is why topology fingerprints are only used by a baseline made
+with `Baseline(topology=True)`, by default runs without a query text are skipped.
+
+The reference value of every (fingerprint, duration) pair is computed once and kept in a dictionary indexed by the
+fingerprint, so checking a run costs a handful of dictionary lookups and a day of 100k queries is checked in seconds.
+
+Functions:
+- `normalize_query(text)`: Normalizes a query text: literals replaced by `?`, comments dropped, lowercase tokens.
+- `query_fingerprint(text)`: Fingerprint of a query text, the same for every run of a query with other literals.
+- `topology_fingerprint(task_summary, edges, query_summary)`: Fingerprint of the shape of a DAG (vertices, edges, record magnitudes, phases).
+- `fingerprint(results, query_text, edges, topology)`: Fingerprint of a parse result, from the query text if given, else (opt-in) from the shape.
+- `durations(results)`: Yields the ((kind, name), seconds) pairs of the phases and vertices of a parse result.
+
+Classes:
+- `Baseline`: Per fingerprint MetricSummaries of the phase and vertex durations, with indexed reference values.
+- `Regression`: One duration of a run that is beyond the thresholds.
+- `RegressionDetector`: Compares runs with a Baseline and returns their Regressions.
+"""
+import hashlib
+import json
+import math
+import re
+from collections.abc import Mapping
+from .aggregation import MetricSummary
+from .result_writer import atomic_write
+
+PHASE = "phase"
+VERTEX = "vertex"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"(?<![\w.])[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?(?![\w.])")
+_TOKENS = re.compile(r"\w+|[^\w\s]")
+_VALUE_LISTS = re.compile(r"\( \?(?: , \?)+ \)")
+
+
+def normalize_query(text):
+    """Normalizes a query text: literals replaced by `?`, value lists by `( ? )`, comments dropped, lowercase tokens separated by single spaces."""
+    text = _COMMENTS.sub(" ", text)
+    text = _STRINGS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    # Every word and every punctuation character is a token, so `id=?` and `id = ?` are the same
+    text = " ".join(_TOKENS.findall(text.lower()))
+    return _VALUE_LISTS.sub("( ? )", text)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def query_fingerprint(text):
+    """Returns the fingerprint of a query text ("sql:" and a hash), the same for every run of a query with other literals."""
+    return f"sql:{_digest(normalize_query(text))}"
+
+
+def _magnitude(records):
+    try:
+        return int(math.log10(records)) if records >= 1 else 0
+    except (TypeError, ValueError):
+        return None
+
+
+def topology_fingerprint(task_summary, edges=None, query_summary=None):
+    """
+    Returns the fingerprint of the shape of a DAG ("dag:" and a hash), None without vertices.
+
+    The shape is made of the vertex names with the order of magnitude of their input records, the edges ({target:
+    [(source, edge type)]}, see `vertex_analysis.parse_edges`) if the plan is known and the phases of the Query
+    Execution Summary. Different queries of the same shape still collide, see the module docstring.
+    """
+    if not task_summary:
+        return None
+    parts = [f"{vertex}~{_magnitude(metrics.get('INPUT_RECORDS'))}" for vertex, metrics in sorted(task_summary.items())]
+    if edges:
+        parts.append("edges:" + ",".join(f"{source}>{target}:{edge_type}" for target in sorted(edges)
+                                          for source, edge_type in sorted(edges[target])))
+    if query_summary:
+        parts.append("phases:" + ",".join(sorted(query_summary)))
+    return f"dag:{_digest('|'.join(parts))}"
+
+
+def _summaries(results):
+    if isinstance(results, Mapping):
+        return results.get("query_summary"), results.get("task_summary")
+    return results.query_summary, results.task_summary
+
+
+def fingerprint(results, query_text=None, edges=None, topology=False):
+    """
+    Returns the fingerprint of a parse result from its query text if given, None without one.
+
+    With `topology` a parse result without query text gets the fingerprint of the shape of its DAG instead (see
+    topology_fingerprint(), with the `edges` of its plan if known). Unrelated queries of the same shape share such a
+    fingerprint, which is why it is opt-in.
+    """
+    if query_text:
+        return query_fingerprint(query_text)
+    if not topology:
+        return None
+    query_summary, task_summary = _summaries(results)
+    return topology_fingerprint(task_summary, edges, query_summary)
+
+
+def durations(results):
+    """Yields ((kind, name), seconds) for every phase of the Query Execution Summary and the DURATION of every vertex."""
+    query_summary, task_summary = _summaries(results)
+    for operation, seconds in (query_summary or {}).items():
+        try:
+            yield (PHASE, operation), float(seconds)
+        except (TypeError, ValueError):
+            continue
+    for vertice, metrics in (task_summary or {}).items():
+        duration = metrics.get("DURATION")
+        if duration is not None:
+            # The Task Execution Summary counts milliseconds
+            yield (VERTEX, vertice), duration / 1000
+
+
+class Baseline:
+    """
+    Baseline holds the phase and vertex durations seen per query fingerprint, with indexed reference values.
+
+    Attributes:
+        quantile (float): The quantile of the durations a run is compared with (the median by default).
+        relative_accuracy (float), max_buckets (int): Settings of the QuantileSketch of every MetricSummary.
+        topology (bool): Whether runs without a query text are fingerprinted by the shape of their DAG (or skipped).
+        summaries (dict): {fingerprint: {(kind, name): MetricSummary}}.
+        _references (dict): {fingerprint: {(kind, name): (reference seconds, count)}}, computed on first use.
+
+    Methods:
+        __init__(self, quantile, relative_accuracy, max_buckets, topology): Constructor that initializes an empty baseline.
+        fingerprint(self, results, query_text, edges): Returns the fingerprint of a parse result, as this baseline makes them.
+        add(self, results, query_text, edges): Adds the durations of a parse result, returns its fingerprint.
+        update(self, results, query_texts, plans): Adds every parse result of an iterable.
+        merge(self, other): Adds everything another baseline has seen.
+        references(self, fingerprint): Returns the {(kind, name): (reference seconds, count)} of a fingerprint.
+        to_dict(self), from_dict(cls, state): Conversion to and from a JSON serializable dictionary.
+        save(self, path), load(cls, path): Stores the baseline in a JSON file (atomically) and reads it back.
+
+    Usage:
+        baseline = Baseline()
+        baseline.update(LogFileParser(path).iter_queries(), query_texts={query_id: text})
+        baseline.save("baseline.json")
+
+        # Without the query texts, accepting that queries of the same shape share a baseline
+        baseline = Baseline(topology=True)
+        baseline.update(LogFileParser(path).iter_queries(), plans={query_id: edges})
+
+    Notes:
+        A parse result whose fingerprint can not be made (no query text and, unless `topology`, no Task Execution
+        Summary) is skipped.
+    """
+    def __init__(self, quantile=0.5, relative_accuracy=0.01, max_buckets=256, topology=False):
+        """Constructor that initializes an empty baseline."""
+        self.quantile = quantile
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.topology = topology
+        self.summaries = {}
+        self._references = {}
+
+    def fingerprint(self, results, query_text=None, edges=None):
+        """Returns the fingerprint of a parse result, by its shape only if this is a topology baseline."""
+        return fingerprint(results, query_text, edges, self.topology)
+
+    def add(self, results, query_text=None, edges=None):
+        """Adds the durations of a parse result (LogFileParser, QueryRecord or dictionary), returns its fingerprint."""
+        key = self.fingerprint(results, query_text, edges)
+        if key is None:
+            return None
+        summaries = self.summaries.setdefault(key, {})
+        for metric, seconds in durations(results):
+            summary = summaries.get(metric)
+            if summary is None:
+                summary = summaries[metric] = MetricSummary(self.relative_accuracy, self.max_buckets)
+            summary.add(seconds)
+        # The reference values of this fingerprint are computed again on their next use
+        self._references.pop(key, None)
+        return key
+
+    def update(self, results, query_texts=None, plans=None):
+        """Adds every parse result of an iterable, `query_texts` maps query ids to their query text and `plans` to their edges."""
+        for result in results:
+            self.add(result, _by_query_id(result, query_texts), _by_query_id(result, plans))
+
+    def merge(self, other):
+        """Adds everything another baseline has seen (with the same kind of fingerprints)."""
+        if other.topology != self.topology:
+            raise ValueError("A topology baseline can only be merged with another topology baseline.")
+        for key, other_summaries in other.summaries.items():
+            summaries = self.summaries.setdefault(key, {})
+            for metric, other_summary in other_summaries.items():
+                summary = summaries.get(metric)
+                if summary is None:
+                    summary = summaries[metric] = MetricSummary(self.relative_accuracy, self.max_buckets)
+                summary.merge(other_summary)
+            self._references.pop(key, None)
+
+    def references(self, key):
+        """Returns the {(kind, name): (reference seconds, count)} of a fingerprint, an empty dictionary for an unknown one."""
+        references = self._references.get(key)
+        if references is None:
+            summaries = self.summaries.get(key)
+            if summaries is None:
+                return {}
+            references = self._references[key] = {metric: (summary.quantile(self.quantile), summary.count)
+                                                  for metric, summary in summaries.items()}
+        return references
+
+    def __len__(self):
+        return len(self.summaries)
+
+    def to_dict(self):
+        """Returns the baseline as a JSON serializable dictionary."""
+        return {
+            "quantile": self.quantile,
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "topology": self.topology,
+            "summaries": {key: [[kind, name, summary.to_dict()] for (kind, name), summary in summaries.items()]
+                          for key, summaries in self.summaries.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Builds a baseline back from a dictionary made by to_dict()."""
+        baseline = cls(state["quantile"], state["relative_accuracy"], state["max_buckets"], state.get("topology", False))
+        baseline.summaries = {key: {(kind, name): MetricSummary.from_dict(summary) for kind, name, summary in summaries}
+                              for key, summaries in state["summaries"].items()}
+        return baseline
+
+    def save(self, path):
+        """Stores the baseline in a JSON file, replacing it atomically."""
+        atomic_write(path, json.dumps(self.to_dict(), separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path):
+        """Reads a baseline back from a JSON file made by save()."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self):
+        return f"Baseline(fingerprints={len(self.summaries)}, quantile={self.quantile}, topology={self.topology})"
+
+
+def _by_query_id(results, values):
+    if not values:
+        return None
+    query_id = results.get("query_id") if isinstance(results, Mapping) else getattr(results, "query_id", None)
+    return values.get(query_id)
+
+
+class Regression:
+    """
+    Regression is one phase or vertex duration of a run that is beyond the thresholds of the baseline.
+
+    Attributes:
+        query_id (str): The queryId of the run (None if unknown).
+        fingerprint (str): The fingerprint of the query.
+        kind (str): "phase" or "vertex".
+        name (str): The phase (e.g. "Run DAG") or vertex (e.g. "Map 1").
+        seconds (float): The duration of the run.
+        reference (float): The reference duration of the baseline.
+        samples (int): Number of runs the reference is made of.
+
+    Methods:
+        ratio: A property returning seconds / reference.
+        to_dict(self): Returns the regression as a dictionary.
+    """
+    __slots__ = ("query_id", "fingerprint", "kind", "name", "seconds", "reference", "samples")
+
+    def __init__(self, query_id, fingerprint, kind, name, seconds, reference, samples):
+        """Constructor that stores the regression."""
+        self.query_id = query_id
+        self.fingerprint = fingerprint
+        self.kind = kind
+        self.name = name
+        self.seconds = seconds
+        self.reference = reference
+        self.samples = samples
+
+    @property
+    def ratio(self):
+        """Returns seconds / reference (inf for a reference of 0)."""
+        return self.seconds / self.reference if self.reference else float("inf")
+
+    def to_dict(self):
+        """Returns the regression as a dictionary."""
+        regression = {field: getattr(self, field) for field in self.__slots__}
+        regression["ratio"] = self.ratio
+        return regression
+
+    def __repr__(self):
+        return (f"Regression(query_id={self.query_id!r}, {self.kind}={self.name!r}, seconds={self.seconds:.2f}, "
+                f"reference={self.reference:.2f}, ratio={self.ratio:.2f})")
+
+
+class RegressionDetector:
+    """
+    RegressionDetector compares runs with a Baseline and returns the durations that are beyond the thresholds.
+
+    Attributes:
+        baseline (Baseline): The baseline the runs are compared with.
+        ratio (float): A duration is flagged when it is more than `ratio` times its reference...
+        min_delta (float): ...and at least `min_delta` seconds longer than it (short phases jitter a lot)...
+        min_samples (int): ...and the reference is made of at least `min_samples` runs.
+        kinds (tuple): The kinds of durations that are checked ("phase", "vertex").
+
+    Methods:
+        __init__(self, baseline, ratio, min_delta, min_samples, kinds): Constructor that stores the thresholds.
+        check(self, results, query_text, edges): Returns the Regressions of one parse result.
+        scan(self, results, query_texts, plans): Yields the Regressions of every parse result of an iterable.
+
+    Usage:
+        detector = RegressionDetector(Baseline.load("baseline.json"), ratio=2.0, min_delta=5.0)
+        for regression in detector.scan(LogFileParser(todays_log).iter_queries()):
+            print(regression.query_id, regression.name, regression.ratio)
+
+    Notes:
+        The runs that are checked are not added to the baseline, add them with `Baseline.update` once they have been
+        checked (or not at all, to keep a fixed reference period).
+
+        Runs are fingerprinted the way the baseline fingerprints them, a run without query text is only checked against
+        a `Baseline(topology=True)`.
+    """
+    def __init__(self, baseline, ratio=1.5, min_delta=1.0, min_samples=3, kinds=(PHASE, VERTEX)):
+        """Constructor that stores the thresholds."""
+        if ratio < 1:
+            raise ValueError(f"ratio must be at least 1, got {ratio}.")
+        self.baseline = baseline
+        self.ratio = ratio
+        self.min_delta = min_delta
+        self.min_samples = min_samples
+        self.kinds = tuple(kinds)
+
+    def check(self, results, query_text=None, edges=None):
+        """Returns the Regressions of one parse result (LogFileParser, QueryRecord or dictionary)."""
+        key = self.baseline.fingerprint(results, query_text, edges)
+        references = self.baseline.references(key) if key is not None else None
+        if not references:
+            return []
+        query_id = results.get("query_id") if isinstance(results, Mapping) else getattr(results, "query_id", None)
+        regressions = []
+        for metric, seconds in durations(results):
+            reference = references.get(metric)
+            if reference is None or metric[0] not in self.kinds:
+                continue
+            value, samples = reference
+            if samples >= self.min_samples and seconds > value * self.ratio and seconds - value >= self.min_delta:
+                regressions.append(Regression(query_id, key, metric[0], metric[1], seconds, value, samples))
+        return regressions
+
+    def scan(self, results, query_texts=None, plans=None):
+        """Yields the Regressions of every parse result of an iterable, `query_texts` maps query ids to their query text and `plans` to their edges."""
+        for result in results:
+            yield from self.check(result, _by_query_id(result, query_texts), _by_query_id(result, plans))
@@ -0,0 +1,154 @@
+"""
+result_cache.py
+
+On-disk cache of parse results.
+
+Pipelines often parse the very same (rotated) log file several times, for backfills, retries or because several
+consumers need it. The `ResultCache` class in this module stores the summaries, the error lists and the warnings of a
+parse in a directory, keyed by the identity of the log file, so that `LogFileParser.parse()` can return them without
+reading the log file again.
+
+Classes:
+- `ResultCache`: Size bounded, least recently used on-disk cache of parse results.
+
+Notes:
+    The identity of a log file is its size, its modification time and a hash of a few blocks sampled from its start,
+    middle and end. Sampling keeps the key cheap to compute for huge files, the modification time catches edits of the
+    bytes in between.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from .error_collector import ErrorCollector
+from .records import CounterGroup, VertexMetrics
+
+# Part of every key, bump it whenever the parse results change so old entries are never used again
+CACHE_VERSION = 2
+
+SAMPLE_SIZE = 64 * 1024
+
+RESULT_FIELDS = ("query_summary", "query_errors", "task_summary", "task_errors", "detailed_summary", "detailed_errors")
+
+
+def _to_json(value):
+    if isinstance(value, ErrorCollector):
+        return value.to_dict()
+    return dict(value)
+
+
+class ResultCache:
+    """
+    ResultCache is a size bounded, least recently used on-disk cache of parse results.
+
+    Attributes:
+        cache_dir (str): Directory holding one JSON file per cached parse.
+        max_bytes (int): Maximum total size of the cached entries, the least recently used ones are evicted beyond it.
+
+    Methods:
+        __init__(self, cache_dir, max_bytes): Constructor that creates the cache directory if needed.
+        key_for(self, log_file_path): Returns the cache key of a log file.
+        get(self, log_file_path): Returns the cached results of a log file or None.
+        put(self, log_file_path, results): Stores the results of a log file and evicts old entries if needed.
+        invalidate(self, log_file_path): Removes the cached results of a log file.
+        clear(self): Removes all cached results.
+
+    Usage:
+        cache = ResultCache("/var/cache/logparser")
+        parser = LogFileParser(log_file_path, cache=cache)
+        parser.parse()                   # Parses the log file and stores the results
+        parser.parse()                   # Returns the stored results
+        parser.parse(use_cache=False)    # Bypasses the cache
+    """
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        """Constructor that creates the cache directory if needed."""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, log_file_path):
+        """Returns the cache key of a log file."""
+        with open(log_file_path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            digest = hashlib.blake2b(f"{CACHE_VERSION}:{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=20)
+            for position in sorted({0, max(stat.st_size // 2 - SAMPLE_SIZE // 2, 0), max(stat.st_size - SAMPLE_SIZE, 0)}):
+                file.seek(position)
+                digest.update(file.read(SAMPLE_SIZE))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, log_file_path):
+        """Returns the cached results of a log file (a dict of RESULT_FIELDS plus the warnings) or None."""
+        entry_path = self._entry_path(self.key_for(log_file_path))
+        try:
+            with open(entry_path) as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # JSON gives back plain dictionaries, turn them into the same records a parse makes
+        if results["task_summary"] is not None:
+            results["task_summary"] = {vertice: VertexMetrics.from_dict(metrics) for vertice, metrics in results["task_summary"].items()}
+        if results["detailed_summary"] is not None:
+            results["detailed_summary"] = {header: CounterGroup.from_dict(metrics) for header, metrics in results["detailed_summary"].items()}
+        for field in ("query_errors", "task_errors", "detailed_errors"):
+            if results[field] is not None:
+                results[field] = ErrorCollector.from_dict(results[field])
+        # Touching the entry marks it as recently used for the eviction
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return results
+
+    def put(self, log_file_path, results):
+        """Stores the results of a log file and evicts the least recently used entries beyond max_bytes."""
+        entry_path = self._entry_path(self.key_for(log_file_path))
+        # Concurrent parsers may store the same entry, write to a temporary file and swap it in
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            # Records (VertexMetrics, CounterGroup) and ErrorCollectors are stored as plain dictionaries
+            json.dump(results, f, default=_to_json)
+        os.replace(temp_path, entry_path)
+        self._evict()
+
+    def invalidate(self, log_file_path):
+        """Removes the cached results of a log file."""
+        try:
+            os.remove(self._entry_path(self.key_for(log_file_path)))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Removes all cached results."""
+        for entry_path, _, _ in self._entries():
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((entry_path, stat.st_mtime_ns, stat.st_size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for entry_path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
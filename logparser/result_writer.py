@@ -0,0 +1,93 @@
+"""
+result_writer.py
+
+Atomic writing of the result files.
+
+`LogFileParser.save()` used to remove its result files and write them again with many small writes, so a reader (or a
+second parser process saving into the same directory) could see missing or half written files, and two processes
+saving results of log files with the same name overwrote each other. The `ResultWriter` class in this module writes
+every file in one go from a buffer built in memory, into a temporary file next to its target that is then swapped in
+with `os.replace`, so each file is always either the old or the new version. `shard_dir` gives every log file its own
+directory in a sharded layout, so parallel workers (or separate runs) never write to the same files.
+
+Classes:
+- `ResultWriter`: Writes (and removes) the result files under one output directory, each file atomically.
+
+Functions:
+- `atomic_write(path, text)`: Replaces a file with the given text atomically.
+- `shard_dir(output_dir, log_file_path)`: Returns the output directory of a log file in the sharded layout.
+"""
+import hashlib
+import os
+import tempfile
+
+# The temporary files of mkstemp are only readable by their owner, the results get the usual permissions instead
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path, text):
+    """Replaces a file with the given text atomically (through a temporary file and os.replace), returns the bytes written."""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        size = os.path.getsize(temp_path)
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+def shard_dir(output_dir, log_file_path):
+    """Returns the output directory of a log file in the sharded layout: <output_dir>/<2 hex digits>/<file name>-<8 hex digits>."""
+    # The digest of the absolute path tells log files with the same name apart and spreads them over 256 shards
+    digest = hashlib.sha1(os.path.abspath(log_file_path).encode()).hexdigest()
+    return os.path.join(output_dir, digest[:2], f"{os.path.basename(log_file_path)}-{digest[2:10]}")
+
+
+class ResultWriter:
+    """
+    ResultWriter writes the result files under one output directory, each file atomically.
+
+    Attributes:
+        output_dir (str): The directory the files are written under.
+        bytes_written (int): Number of bytes written so far.
+
+    Methods:
+        __init__(self, output_dir): Constructor that remembers the output directory, nothing is created yet.
+        write(self, relative_path, text): Replaces the file at the path (relative to the output directory) with the text.
+        remove(self, relative_path): Removes the file at the path (relative to the output directory) if it exists.
+
+    Usage:
+        writer = ResultWriter("./RunResults")
+        writer.write(os.path.join("Summaries", "query_summary.txt"), str(summary))
+
+    Notes:
+        Every file is replaced on its own: two processes saving into the same output directory never produce a half
+        written file, but the files may then come from different processes. Give every process (or every log file) its
+        own output directory, e.g. with `shard_dir`, to keep the files of a parse together.
+    """
+    def __init__(self, output_dir):
+        """Constructor that remembers the output directory, nothing is created yet."""
+        self.output_dir = output_dir
+        self.bytes_written = 0
+
+    def write(self, relative_path, text):
+        """Replaces the file at the path (relative to the output directory) with the text, creating its directory if needed."""
+        path = os.path.join(self.output_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.bytes_written += atomic_write(path, text)
+
+    def remove(self, relative_path):
+        """Removes the file at the path (relative to the output directory) if it exists."""
+        try:
+            os.remove(os.path.join(self.output_dir, relative_path))
+        except FileNotFoundError:
+            pass
@@ -2,45 +2,272 @@
 run_parser.py
 
 This script is an entry point to the log parsing application. Its primary function is to
-facilitate the extraction, parsing, and saving of structured metrics and errors from a specified
-log file using the LogFileParser class.
+facilitate the extraction, parsing, and saving of structured metrics and errors from one or many
+log files using the LogFileParser class.
 
 Usage:
-    To run this script, ensure that 'logfile.txt' is present in the same directory as the script 
-    (or adjust the path as required). Simply execute the script, and it will process the log file, 
-    parse the relevant sections, and save the parsed results to disk.
+    Without any arguments the script processes the bundled 'logfile.txt' (located in the same directory as the script),
+    parses the relevant sections, and saves the parsed results under the './RunResults/' directory:
+        $ run-logparser
 
-    The results, including structured summaries and parsing errors, are saved under the './RunResults/' directory.
+    Any number of files, directories (searched recursively) or glob patterns can be given instead. Every input gets its
+    own output directory under the output directory, so nothing gets overwritten, and the inputs are spread over a pool
+    of worker processes:
+        $ run-logparser /archive/2020-05-01/ "/archive/**/*.log" -o ./RunResults -j 16
+
+    A throughput report (files/s, MB/s) is printed once all inputs have been processed.
+
+    With `--columnar results.lpc` the numbers of all summaries are also appended to a single binary columnar file,
+    which can be read back column by column with `logparser.columnar.ColumnarReader`.
+
+    With `--sqlite queries.db` every query of every log file is also written into a SQLite database (see
+    `logparser.sqlite_index`), which can then be searched with SQL instead of parsing the log files again.
+
+    With `--shard` every input gets a directory named after the hash of its absolute path instead
+    (<output dir>/<2 hex digits>/<file name>-<8 hex digits>), so separate runs over overlapping inputs can save into the
+    same output directory at the same time without any two of them writing the same files:
+        $ run-logparser /archive/2020-05-01/ -o /shared/RunResults --shard
+
+    With `--cache-dir` the results are cached on disk and a log file that was already parsed is not read again.
+
+    With `--serve` the parser stays resident instead: a pool of warm worker processes answers parse jobs (JSON in,
+    summaries and errors as JSON out) over a Unix socket or HTTP on a loopback address, without paying for a fresh
+    interpreter per log file (see `logparser.daemon`):
+        $ run-logparser --serve --socket /run/logparser.sock -j 4 --cache-dir /var/cache/logparser --save-root /srv/results
+        $ run-logparser --serve --port 8765
+
+    A live log file can be followed instead. Every query is printed as a JSON line as soon as its
+    `Completed executing command` line appears and the progress is kept in a checkpoint file (by default under the
+    output directory), so after a restart following continues where it stopped:
+        $ run-logparser --follow /var/log/hive/hiveserver2.log --checkpoint ./hs2.checkpoint.json
 
 Steps:
-1. The script identifies the path to 'logfile.txt' using the resource_filename method.
-2. An instance of LogFileParser is created with the log file path.
-3. The log file is parsed using the parse() method of LogFileParser.
-4. The parsed results and errors are saved to the disk using the save() method of LogFileParser.
+1. The inputs are expanded to a list of log files, if no inputs are given the bundled 'logfile.txt' is used.
+2. An instance of LogFileParser is created with each log file path, in a worker process when more than one worker is used.
+3. Each log file is parsed using the parse() method of LogFileParser.
+4. The parsed results and errors are saved to the disk using the save() method of LogFileParser, every file is replaced
+   atomically (see `logparser.result_writer`).
 
 Note:
-    This script is designed to be a standalone utility. To adapt to different log file structures or 
-    requirements, adjustments may need to be made to the LogFileParser class or the log file path specified in this script in case
-    the user wants different behaviours (e.g. be able to explicitly specify the path and name of the log file etc.)
-
+    A log file without any of the expected headers can not be parsed, it is reported as failed and the other
+    inputs are still processed. The exit code is 1 if any input failed.
 """
 
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing.util
 import os
-from pkg_resources import resource_filename
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from logparser.log_file_parser import LogFileParser
+from logparser.log_follower import LogFollower
+from logparser.result_cache import ResultCache
+from logparser.result_writer import shard_dir
+from logparser.sqlite_index import SQLiteIndex
+
+
+def expand_inputs(inputs):
+    """Expands files, directories and glob patterns to a sorted list of unique log file paths."""
+    paths = []
+    for pattern in inputs:
+        candidates = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for candidate in candidates:
+            if os.path.isdir(candidate):
+                for root, _, files in os.walk(candidate):
+                    paths.extend(os.path.join(root, name) for name in files)
+            else:
+                paths.append(candidate)
+    return sorted(set(paths))
+
+
+def output_dirs_for(paths, output_dir, shard=False):
+    """Gives every input its own output directory, named after the file and disambiguated when names collide (or sharded)."""
+    if shard:
+        return [shard_dir(output_dir, path) for path in paths]
+    names = [os.path.basename(path) for path in paths]
+    name_counts = Counter(names)
+    output_dirs = []
+    for path, name in zip(paths, names):
+        if name_counts[name] > 1:
+            name = f"{name}-{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]}"
+        output_dirs.append(os.path.join(output_dir, name))
+    return output_dirs
+
+
+# The result cache and SQLite index of every path, opened once per process by the first file using them
+_caches = {}
+_indexes = {}
+
+
+def _open_once(opened, opener, path):
+    if path not in opened:
+        opened[path] = opener(path)
+    return opened[path]
+
+
+def close_indexes():
+    """Closes the SQLite indexes opened by parse_file() in this process."""
+    while _indexes:
+        _indexes.popitem()[1].close()
+
+
+def _close_at_exit():
+    # Worker processes leave through os._exit(), only the finalizers of multiprocessing run
+    multiprocessing.util.Finalize(None, close_indexes, exitpriority=10)
+
+
+def parse_file(log_file_path, output_dir, stream=False, cache_dir=None, columnar_path=None, sqlite_path=None):
+    """Parses a single log file and saves its results, returns (path, size in bytes, error message or None)."""
+    try:
+        size = os.path.getsize(log_file_path)
+        cache = _open_once(_caches, ResultCache, cache_dir) if cache_dir else None
+        index = _open_once(_indexes, SQLiteIndex, sqlite_path) if sqlite_path else None
+        parser = LogFileParser(log_file_path, stream=stream, cache=cache)
+        # The index needs every query, not only the first one parse() summarizes, they come from the same read of the
+        # file (a file indexed as it is now is skipped)
+        records = [] if index is not None and not index.is_current(log_file_path) else None
+        parser.parse(queries=records)
+        parser.save(output_dir)
+        if columnar_path:
+            parser.save_columnar(columnar_path)
+        if records is not None:
+            index.add_file(log_file_path, records)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        return log_file_path, 0, str(e)
+    return log_file_path, size, None
+
+
+def run_batch(paths, output_dir, workers=1, stream=False, cache_dir=None, columnar_path=None, sqlite_path=None, shard=False):
+    """Parses all log files, each one into its own output directory, and returns the per-file results."""
+    output_dirs = output_dirs_for(paths, output_dir, shard)
+    streams = [stream] * len(paths)
+    cache_dirs = [cache_dir] * len(paths)
+    columnar_paths = [columnar_path] * len(paths)
+    sqlite_paths = [sqlite_path] * len(paths)
+
+    if workers == 1 or len(paths) == 1:
+        try:
+            return list(map(parse_file, paths, output_dirs, streams, cache_dirs, columnar_paths, sqlite_paths))
+        finally:
+            close_indexes()
+    # Every worker keeps its index open for all its files, close_indexes() runs in each one as the pool shuts down
+    with ProcessPoolExecutor(max_workers=workers, initializer=_close_at_exit) as executor:
+        return list(executor.map(parse_file, paths, output_dirs, streams, cache_dirs, columnar_paths, sqlite_paths, chunksize=max(1, len(paths) // (workers * 8))))
+
+
+def report(results, elapsed, file=None):
+    """Prints a throughput report of a batch run."""
+    file = file or sys.stdout
+    failed = [(path, error) for path, _, error in results if error is not None]
+    total_mb = sum(size for _, size, _ in results) / (1024 * 1024)
+    elapsed = max(elapsed, 1e-9)
+
+    for path, error in failed:
+        print(f"FAILED {path}: {error}", file=file)
+    print(f"Parsed {len(results) - len(failed)}/{len(results)} files ({total_mb:.2f} MB) in {elapsed:.2f}s: "
+          f"{len(results) / elapsed:.2f} files/s, {total_mb / elapsed:.2f} MB/s", file=file)
+
+
+def follow(log_file_path, checkpoint_path, interval, file=None):
+    """Prints every query of a live log file as a JSON line as soon as it completes, until interrupted."""
+    file = file or sys.stdout
+    follower = LogFollower(log_file_path, checkpoint_path)
+    try:
+        for record in follower.follow(interval):
+            print(json.dumps(record.to_dict(), default=dict), file=file, flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(socket_path, host, port, workers, max_queue, cache_dir, save_root=None, file=None):
+    """Runs a ParserService behind a Unix socket (or HTTP on a loopback address) until interrupted."""
+    # Only the service needs the servers, the other modes do not pay for importing them
+    from logparser.daemon import ParserHTTPServer, ParserService, ParserUnixServer
+
+    file = file or sys.stdout
+    with ParserService(workers, max_queue, cache_dir, save_root=save_root) as service:
+        try:
+            if socket_path:
+                server = ParserUnixServer(service, socket_path)
+                address = socket_path
+            else:
+                server = ParserHTTPServer(service, host, port)
+                address = "http://%s:%d" % server.server_address[:2]
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Serving {workers} workers on {address}", file=file, flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog="run-logparser", description="Parse HiveServer2/beeline log files into summaries and parser error logs.")
+    arg_parser.add_argument("inputs", nargs="*", help="Log files, directories or glob patterns (default: the bundled logfile.txt).")
+    arg_parser.add_argument("-o", "--output-dir", default="./RunResults", help="Directory the results are saved under (default: ./RunResults).")
+    arg_parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: number of CPUs).")
+    arg_parser.add_argument("--shard", action="store_true", help="Save every input under <output dir>/<hash prefix>/<file name>-<hash>, unique across runs.")
+    arg_parser.add_argument("--stream", action="store_true", help="Read every log file line by line instead of memory mapping it.")
+    arg_parser.add_argument("--cache-dir", help="Cache parse results in this directory, log files parsed before are not read again.")
+    arg_parser.add_argument("--columnar", help="Also append the results of every log file to this binary columnar file.")
+    arg_parser.add_argument("--sqlite", help="Also write every query of every log file into this SQLite database.")
+    arg_parser.add_argument("--follow", action="store_true", help="Follow a single live log file and print every query as a JSON line as soon as it completes.")
+    arg_parser.add_argument("--checkpoint", help="Checkpoint file of --follow (default: <output dir>/<log file name>.checkpoint.json).")
+    arg_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls of --follow (default: 1).")
+    arg_parser.add_argument("--serve", action="store_true", help="Run as a resident service answering parse jobs over --socket or HTTP on --host:--port.")
+    arg_parser.add_argument("--socket", help="Unix socket path --serve listens on, instead of HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Loopback address --serve listens on over HTTP (default: 127.0.0.1).")
+    arg_parser.add_argument("--port", type=int, default=8765, help="Port --serve listens on over HTTP (default: 8765).")
+    arg_parser.add_argument("--save-root", help="Directory the jobs of --serve may save their results under (default: saving is turned off).")
+    arg_parser.add_argument("--max-queue", type=int, default=64, help="Jobs --serve lets wait for a worker, further ones are answered busy (default: 64).")
+    args = arg_parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args.socket, args.host, args.port, max(1, args.workers), args.max_queue, args.cache_dir, args.save_root)
+
+    if args.follow:
+        if len(args.inputs) != 1:
+            arg_parser.error("--follow needs exactly one log file")
+        log_file_path = args.inputs[0]
+        checkpoint_path = args.checkpoint
+        if checkpoint_path is None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            checkpoint_path = os.path.join(args.output_dir, f"{os.path.basename(log_file_path)}.checkpoint.json")
+        follow(log_file_path, checkpoint_path, args.interval)
+        return 0
+
+    if not args.inputs:
+        # The logfile.txt should be located in the same directory as run_parser.py
+        log_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logfile.txt')
+
+        parser = LogFileParser(log_file_path, stream=args.stream)
 
-def main():
-    # The logfile.txt should be located in the same directory as run_parser.py
-    log_file_path = resource_filename('logparser', 'logfile.txt')
+        # Using the parse() method
+        parser.parse()
 
-    parser = LogFileParser(log_file_path)
+        # Using the save() method to save results
+        # Automatically saves summaries and errors under ./RunResults/
+        parser.save(args.output_dir)
+        return 0
 
-    # Using the parse() method
-    parsed_data = parser.parse()
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        arg_parser.error("no log files found for the given inputs")
 
-    # Using the save() method to save results 
-    # Automatically saves summaries and errors under ./RunResults/ 
-    parser.save()
+    start = time.perf_counter()
+    results = run_batch(paths, args.output_dir, max(1, args.workers), args.stream, args.cache_dir, args.columnar, args.sqlite, args.shard)
+    report(results, time.perf_counter() - start)
+    return 1 if any(error is not None for _, _, error in results) else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
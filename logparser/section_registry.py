@@ -0,0 +1,180 @@
+"""
+section_registry.py
+
+Registry of the sections the parser collects from a log file.
+
+Every section of a log file is described by its header line, the offset of its first line from the header, the end
+marker closing it and the parser (handler) turning its lines into a summary and errors. `LogFileParser` takes all of
+these from a `SectionRegistry` instead of hardcoding them, finds the headers of every registered section in a single
+search of the file and routes the lines of all sections through one `SectionStream`, so enabling another section (the
+`LLAP IO Summary` or the `HIVE` counters, for example) does not add another pass over the log file.
+
+Classes:
+- `SectionSpec`: The header, offset, end marker and parser of one section.
+- `SectionRegistry`: Ordered collection of SectionSpecs, unique by name and by header.
+
+Constants:
+- `BUILTIN_SECTIONS`: The specs of the query summary, task summary and detailed metrics sections.
+- `DEFAULT_REGISTRY`: The registry `LogFileParser` uses unless it is given another one.
+
+Functions:
+- `register_section(name, header, offset, end, parser, stage)`: Registers a section in `DEFAULT_REGISTRY`.
+"""
+from .detailed_metrics import DetailedMetrics
+from .query_summary import QuerySummary
+from .section_stream import DETAILED_METRICS_HEADER, QUERY_COMPLETED, QUERY_SUMMARY_HEADER, SECTION_END, TASK_SUMMARY_HEADER
+from .task_execution_summary import TaskExecutionSummary
+
+
+class SectionSpec:
+    """
+    SectionSpec holds the definition of one section of the log file.
+
+    Attributes:
+        name (str): Name of the section, also the name of its summary (e.g. "task_summary").
+        header (str): The header line starting the section, a line only counts if it is exactly this text.
+        offset (int): The first line of the section is `header line + offset + 1` (-1 makes the header itself the first line).
+        end (str): The section ends right before the first line containing this marker (or at the end of the file).
+        parser (callable): Called with the list of (idx, line) pairs of the section, returns an object whose `data` is
+            (summary, errors). `lines_matched` and `lines_failed` counters are used for the stats if it has them.
+        stage (str): Name of the ParserStats stage timing the parser (the section name by default).
+
+    Methods:
+        __init__(self, name, header, offset, end, parser, stage): Constructor that checks the definition.
+        definition: A property returning the (header, offset, end) triple `SectionStream` takes.
+        parse(self, lines, stats): Runs the parser on the lines of the section, returns (summary, errors).
+    """
+    __slots__ = ("name", "header", "offset", "end", "parser", "stage")
+
+    def __init__(self, name, header, offset, end, parser, stage=None):
+        """Constructor that checks the definition."""
+        if not header or "\n" in header or "\r" in header:
+            raise ValueError(f"The header of section {name!r} must be a non empty, single line text.")
+        if not end:
+            raise ValueError(f"The end marker of section {name!r} must not be empty.")
+        if not isinstance(offset, int) or offset < -1:
+            raise ValueError(f"The offset of section {name!r} must be an integer of at least -1, got {offset!r}.")
+        self.name = name
+        self.header = header
+        self.offset = offset
+        self.end = end
+        self.parser = parser
+        self.stage = stage or name
+
+    @property
+    def definition(self):
+        """Returns the (header, offset, end) triple SectionStream takes."""
+        return self.header, self.offset, self.end
+
+    def parse(self, lines, stats=None):
+        """Runs the parser (timed into `stats`, a ParserStats, if given), sections that were not found (or are empty) give (None, None)."""
+        if not lines:
+            return None, None
+        if stats is None:
+            return self.parser(lines).data
+        with stats.stage(self.stage) as stage:
+            parser = self.parser(lines)
+        stage.lines += len(lines)
+        stage.matched += getattr(parser, "lines_matched", 0)
+        stage.errors += getattr(parser, "lines_failed", 0)
+        return parser.data
+
+    def __repr__(self):
+        return f"SectionSpec(name={self.name!r}, header={self.header!r}, offset={self.offset}, end={self.end!r})"
+
+
+class SectionRegistry:
+    """
+    SectionRegistry is an ordered collection of SectionSpecs, unique by name and by header.
+
+    Attributes:
+        _specs (dict): The registered SectionSpecs by name, in the order they were registered.
+
+    Methods:
+        __init__(self, specs): Constructor that registers the given SectionSpecs.
+        register(self, name, header, offset, end, parser, stage): Registers a new section and returns its SectionSpec.
+        add(self, spec): Registers a SectionSpec.
+        unregister(self, name): Removes a section.
+        copy(self): Returns an independent registry with the same sections.
+        names: A property returning the names of the sections, in order.
+        definitions: A property returning the (header, offset, end) triple of every section, in order.
+
+    Usage:
+        registry = DEFAULT_REGISTRY.copy()
+        registry.register("llap_io_summary", "INFO  : LLAP IO Summary", 3, "INFO  : -------", LlapIoSummary)
+        parser = LogFileParser(log_file_path, registry=registry)
+        parser.parse()
+        summary, errors = parser.section_data("llap_io_summary")
+
+    Notes:
+        A registry is read when a LogFileParser is made, sections registered later only apply to later parsers.
+    """
+    def __init__(self, specs=()):
+        """Constructor that registers the given SectionSpecs."""
+        self._specs = {}
+        for spec in specs:
+            self.add(spec)
+
+    def register(self, name, header, offset, end, parser, stage=None):
+        """Registers a new section and returns its SectionSpec."""
+        spec = SectionSpec(name, header, offset, end, parser, stage)
+        self.add(spec)
+        return spec
+
+    def add(self, spec):
+        """Registers a SectionSpec, names and headers have to be unique."""
+        if spec.name in self._specs:
+            raise ValueError(f"A section named {spec.name!r} is already registered.")
+        for other in self._specs.values():
+            if other.header == spec.header:
+                raise ValueError(f"The header {spec.header!r} is already registered by section {other.name!r}.")
+        self._specs[spec.name] = spec
+
+    def unregister(self, name):
+        """Removes a section."""
+        if name not in self._specs:
+            raise ValueError(f"Unknown section: {name}.")
+        del self._specs[name]
+
+    def copy(self):
+        """Returns an independent registry with the same sections."""
+        return SectionRegistry(self._specs.values())
+
+    @property
+    def names(self):
+        """Returns the names of the sections, in order."""
+        return tuple(self._specs)
+
+    @property
+    def definitions(self):
+        """Returns the (header, offset, end) triple of every section, in order."""
+        return tuple(spec.definition for spec in self._specs.values())
+
+    def __getitem__(self, name):
+        return self._specs[name]
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(tuple(self._specs.values()))
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __repr__(self):
+        return f"SectionRegistry({', '.join(self._specs)})"
+
+
+BUILTIN_SECTIONS = (
+    SectionSpec("query_summary", QUERY_SUMMARY_HEADER, 3, SECTION_END, QuerySummary),
+    SectionSpec("task_summary", TASK_SUMMARY_HEADER, 3, SECTION_END, TaskExecutionSummary),
+    SectionSpec("detailed_summary", DETAILED_METRICS_HEADER, -1, QUERY_COMPLETED, DetailedMetrics, stage="detailed_metrics"),
+)
+
+DEFAULT_REGISTRY = SectionRegistry(BUILTIN_SECTIONS)
+
+
+def register_section(name, header, offset, end, parser, stage=None):
+    """Registers a section in DEFAULT_REGISTRY (used by every LogFileParser made afterwards) and returns its SectionSpec."""
+    return DEFAULT_REGISTRY.register(name, header, offset, end, parser, stage)
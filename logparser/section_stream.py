@@ -0,0 +1,298 @@
+"""
+section_stream.py
+
+Single pass section collection for log files.
+
+The `LogFileParser` originally located its sections by reading the whole log file into memory, scanning it once for the
+headers and then walking it again to cut out the lines between each header and its end marker. The `SectionStream`
+class in this module performs exactly the same header detection and line extraction but is fed one line at a time, so
+a caller can read the log file lazily and only ever hold the (small) sections of interest in memory.
+
+Constants:
+- `QUERY_SUMMARY_HEADER`, `TASK_SUMMARY_HEADER`, `DETAILED_METRICS_HEADER`: The three headers the parser looks for.
+- `SECTION_END`, `QUERY_COMPLETED`: The end markers of the sections.
+- `SECTIONS`: The (header, offset, end marker) definition of every section. The offset has the same meaning as the
+  index adjustment used by `LogFileParser._extract_lines`, i.e. the first collected line is `header line + offset + 1`.
+
+Functions:
+- `iter_log_lines(file)`: Yields `(idx, offset, line)` triples from a binary file object with the same numbering and
+  line splitting rules as `LogFileParser` uses, together with the byte offset where the line starts.
+- `iter_raw_lines(file, end)`: Yields the raw lines of a binary file object up to a byte offset.
+- `has_exotic_line_breaks(data)`: Tells whether a chunk of bytes holds line separators other than \\n and \\r\\n.
+- `count_log_lines(file, start, end)`: Counts the lines of a byte range exactly like `iter_log_lines` numbers them.
+- `is_line_start(buffer, pos)`, `is_line_end(buffer, pos)`: Tell whether a byte offset of a buffer is a line boundary.
+- `compile_headers(headers)`: Compiles one bytes pattern finding any of the headers, so all are searched in a single pass.
+"""
+import io
+import re
+import warnings
+
+QUERY_SUMMARY_HEADER = "INFO  : Query Execution Summary"
+TASK_SUMMARY_HEADER = "INFO  : Task Execution Summary"
+DETAILED_METRICS_HEADER = "INFO  : org.apache.tez.common.counters.DAGCounter:"
+
+SECTION_END = "INFO  : -------"
+QUERY_COMPLETED = "INFO  : Completed executing command(queryId="
+
+SECTIONS = (
+    (QUERY_SUMMARY_HEADER, 3, SECTION_END),
+    (TASK_SUMMARY_HEADER, 3, SECTION_END),
+    (DETAILED_METRICS_HEADER, -1, QUERY_COMPLETED),
+)
+
+# Besides \n (and \r\n) these are all the byte sequences str.splitlines() treats as a line boundary in UTF-8 text
+SINGLE_BYTE_LINE_BREAKS = b"\n\r\x0b\x0c\x1c\x1d\x1e"
+MULTI_BYTE_LINE_BREAKS = (b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+EXOTIC_LINE_BREAKS = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e") + MULTI_BYTE_LINE_BREAKS
+# Every byte any of the separators above (or a lone \r) is made of
+EXOTIC_BYTES = b"\r\x0b\x0c\x1c\x1d\x1e\x85\xa8\xa9"
+
+BLOCK_SIZE = 1 << 20
+
+
+def compile_headers(headers):
+    """Compiles one bytes pattern matching any of the headers, so all of them are searched in a single pass."""
+    # Longest first, a header that is the start of another one must not hide it
+    needles = sorted((header.encode() for header in headers), key=len, reverse=True)
+    return re.compile(b"|".join(re.escape(needle) for needle in needles))
+
+
+def iter_log_lines(file, first_idx=1, first_offset=0):
+    """Yields (idx, offset, line) triples read lazily from a binary file object."""
+    idx = first_idx
+    offset = first_offset
+    for raw_line in file:
+        # splitlines() keeps the exact same line boundaries as the file.read().splitlines() the parser always used
+        for line in raw_line.decode("utf-8", errors="replace").splitlines():
+            yield idx, offset, line
+            idx += 1
+        offset += len(raw_line)
+
+
+def iter_raw_lines(file, end):
+    """Yields the raw lines of a binary file object from its current position up to the byte offset `end`."""
+    position = file.tell()
+    while position < end:
+        raw_line = file.readline()
+        if not raw_line:
+            return
+        # Never yield anything past `end`, even when it falls in the middle of a line
+        raw_line = raw_line[:end - position]
+        position += len(raw_line)
+        yield raw_line
+
+
+def has_exotic_line_breaks(data):
+    """Tells whether a chunk of bytes holds line separators other than \\n and \\r\\n."""
+    # A single translate() pass rules out the common case of a chunk holding none of their bytes at all
+    if len(data.translate(None, EXOTIC_BYTES)) == len(data):
+        return False
+    # A handful of memchr-like finds is a lot faster than any regex over the same bytes
+    if b"\r" in data and data.count(b"\r") != data.count(b"\r\n"):
+        return True
+    return any(separator in data for separator in EXOTIC_LINE_BREAKS)
+
+
+def count_log_lines(file, start, end):
+    """Counts the lines of a byte range starting at a line boundary exactly like iter_log_lines() numbers them."""
+    file.seek(start)
+    count, tail, last_byte = 0, b"", b"\n"
+    remaining = end - start
+    while remaining > 0:
+        block = file.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        # Keep the tail of the previous block so separators split across two blocks are seen as well,
+        # whenever there is anything but plain \n or \r\n line endings fall back to decoding the lines
+        if has_exotic_line_breaks(block) or has_exotic_line_breaks(tail + block[:2]):
+            file.seek(start)
+            return sum(1 for _ in iter_log_lines(iter_raw_lines(file, end)))
+        count += block.count(b"\n")
+        tail, last_byte = block[-2:], block[-1:]
+        remaining -= len(block)
+    return count + (last_byte != b"\n")
+
+
+def is_line_start(buffer, pos):
+    """Tells whether the byte offset `pos` of the buffer is the start of a line."""
+    return (pos == 0 or buffer[pos - 1] in SINGLE_BYTE_LINE_BREAKS
+            or buffer[max(pos - 2, 0):pos] == MULTI_BYTE_LINE_BREAKS[0] or buffer[max(pos - 3, 0):pos] in MULTI_BYTE_LINE_BREAKS[1:])
+
+
+def is_line_end(buffer, pos):
+    """Tells whether the byte offset `pos` of the buffer is the end of a line."""
+    return (pos >= len(buffer) or buffer[pos] in SINGLE_BYTE_LINE_BREAKS
+            or buffer[pos:pos + 2] == MULTI_BYTE_LINE_BREAKS[0] or buffer[pos:pos + 3] in MULTI_BYTE_LINE_BREAKS[1:])
+
+
+class SectionStream:
+    """
+    SectionStream collects the lines of every known section of a log file while being fed the file one line at a time.
+
+    Attributes:
+        header_idxs (dict): Dictionary containing the headers and the line index of their first encounter (None if not found yet).
+        section_lines (dict): Dictionary containing the headers and the lines collected so far for their section.
+        _sections (tuple): The (header, offset, end marker) definitions of the sections.
+        _skip (dict): Headers whose section starts a few lines after the header, mapped to the lines left to skip.
+        _collecting (dict): Headers whose section is currently being collected, mapped to their end marker.
+
+    Methods:
+        __init__(self, sections, warn_duplicates): Constructor that initializes an empty stream.
+        feed(self, idx, line): Processes the next line of the log file.
+        feed_file(self, file, first_idx): Processes every line of a binary file object, returns the number of lines.
+        found_headers(self): Returns the headers encountered so far.
+        active(self): Tells whether any section is still being skipped to or collected.
+        get_state(self): Returns the progress of the stream as a JSON serializable dictionary.
+        set_state(self, state): Restores the progress of the stream from a dictionary made by get_state().
+
+    Description:
+        A section starts `offset + 1` lines after the first encounter of its header (an offset of -1 means the header line
+        itself is the first line of the section) and ends right before the first line containing its end marker, or at the
+        end of the file. This mirrors the behaviour of `LogFileParser._extract_headers` and `LogFileParser._extract_lines`
+        line for line, including the warning given for headers found more than once.
+
+    Notes:
+        Only the lines of the sections are kept in memory, the rest of the log file is inspected and then forgotten.
+
+        feed_file() gives the same result as feeding every line of the file, but reads it in blocks and, while no section
+        is being skipped to or collected, jumps straight to the next header line with a plain byte search instead of
+        decoding every line in between. Blocks holding line separators other than \n and \r\n are fed line by line.
+    """
+    def __init__(self, sections=SECTIONS, warn_duplicates=True):
+        """Constructor that initializes an empty stream."""
+        self._sections = sections
+        self._warn_duplicates = warn_duplicates
+        self._headers = {header: (offset, identifier) for header, offset, identifier in sections}
+        self._header_pattern = compile_headers(self._headers)
+        self.header_idxs = {header: None for header, _, _ in sections}
+        self.section_lines = {header: [] for header, _, _ in sections}
+        self._skip = {}
+        self._collecting = {}
+
+    def feed(self, idx, line):
+        """Processes the next line of the log file."""
+        # Sections already started get the line first, exactly as if they were extracted after the header scan
+        for header in list(self._collecting):
+            if self._collecting[header] in line:
+                del self._collecting[header]
+            else:
+                self.section_lines[header].append((idx, line))
+        for header in list(self._skip):
+            if self._skip[header] > 1:
+                self._skip[header] -= 1
+            else:
+                del self._skip[header]
+                self._collecting[header] = self._headers[header][1]
+
+        if line not in self._headers:
+            return
+        if self.header_idxs[line] is not None:
+            if self._warn_duplicates:
+                self._warn_duplicate(line)
+            return
+
+        self.header_idxs[line] = idx
+        offset, identifier = self._headers[line]
+        if offset == -1:
+            # The header itself is the first line of the section
+            if identifier in line:
+                return
+            self.section_lines[line].append((idx, line))
+            self._collecting[line] = identifier
+        elif offset == 0:
+            self._collecting[line] = identifier
+        else:
+            self._skip[line] = offset
+
+    @staticmethod
+    def _warn_duplicate(header):
+        warnings.warn(f"Header: {header} | found multiple times in the log file... ignoring all but the first instance ...", stacklevel=4)
+
+    def feed_file(self, file, first_idx=1, block_size=BLOCK_SIZE):
+        """Processes every line of a binary file object from its current position on, returns the number of lines."""
+        idx = first_idx
+        tail = b""
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            data = tail + block if tail else block
+            # Only complete lines are fed, the unfinished last line waits for the next block
+            end = data.rfind(b"\n") + 1
+            tail = data[end:]
+            if end:
+                idx = self._feed_block(data[:end], idx)
+        if tail:
+            idx = self._feed_lines(tail, idx)
+        return idx - first_idx
+
+    def _feed_lines(self, data, idx):
+        """Feeds the lines of a chunk of bytes one by one, returns the index of the line after the chunk."""
+        for idx, _, line in iter_log_lines(io.BytesIO(data), idx):
+            self.feed(idx, line)
+        return idx + 1
+
+    def _feed_block(self, block, idx):
+        """Feeds a block of complete lines, jumping over the lines outside the sections, returns the index of the next line."""
+        if has_exotic_line_breaks(block):
+            return self._feed_lines(block, idx)
+
+        pos, size = 0, len(block)
+        while pos < size:
+            if self.active():
+                end = block.index(b"\n", pos) + 1
+                line = block[pos:end].decode("utf-8", errors="replace")
+                self.feed(idx, line[:-2] if line.endswith("\r\n") else line[:-1])
+                idx += 1
+                pos = end
+                continue
+
+            if None not in self.header_idxs.values():
+                # Every header was found already, nothing is left to change the state but duplicates to warn about
+                if self._warn_duplicates:
+                    for _, header in self._find_header_lines(block, pos):
+                        self._warn_duplicate(header)
+                return idx + block.count(b"\n", pos)
+
+            # Nothing but a header line can change the state, find the closest one that spans a whole line
+            next_header, _ = next(self._find_header_lines(block, pos), (size, None))
+            idx += block.count(b"\n", pos, next_header)
+            pos = next_header
+            if pos < size:
+                # Fed like any other line, which also gives the warning of a duplicate header
+                end = block.index(b"\n", pos) + 1
+                self.feed(idx, block[pos:end].rstrip(b"\r\n").decode())
+                idx += 1
+                pos = end
+        return idx
+
+    def _find_header_lines(self, block, pos):
+        """Yields (offset, header) of the lines of the block from `pos` on that are exactly one of the headers, in order."""
+        for match in self._header_pattern.finditer(block, pos):
+            start, after = match.span()
+            if (start == 0 or block[start - 1] == 10) and (block[after] == 10 or block[after:after + 2] == b"\r\n"):
+                yield start, match[0].decode()
+
+    def found_headers(self):
+        """Returns the headers encountered so far."""
+        return [header for header, idx in self.header_idxs.items() if idx is not None]
+
+    def active(self):
+        """Tells whether any section is still being skipped to or collected."""
+        return bool(self._skip or self._collecting)
+
+    def get_state(self):
+        """Returns the progress of the stream as a JSON serializable dictionary."""
+        return {
+            "header_idxs": self.header_idxs,
+            "section_lines": {header: [list(line) for line in lines] for header, lines in self.section_lines.items()},
+            "skip": self._skip,
+            "collecting": list(self._collecting),
+        }
+
+    def set_state(self, state):
+        """Restores the progress of the stream from a dictionary made by get_state()."""
+        self.header_idxs = dict(state["header_idxs"])
+        self.section_lines = {header: [tuple(line) for line in lines] for header, lines in state["section_lines"].items()}
+        self._skip = dict(state["skip"])
+        self._collecting = {header: self._headers[header][1] for header in state["collecting"]}
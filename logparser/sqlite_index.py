@@ -0,0 +1,279 @@
+"""
+sqlite_index.py
+
+Persistent SQLite index of parsed queries.
+
+Answering "which queries ran Run DAG for more than 60s last week" from the `.txt` summaries (or by running
+`run-logparser` over the archives again) means parsing every log file once more. The `SQLiteIndex` class in this module
+writes every parsed query into a local SQLite database instead, with its queryId, log file, byte offset, the durations
+of its Query Execution Summary, its vertices and its counters, so such questions become index lookups.
+
+Tables:
+- `files`: One row per indexed log file (`file_id`, `path`, `size`, `mtime`, `indexed_at`).
+- `queries`: One row per query (`file_id`, `seq`, `query_id`, `line_idx`, `byte_offset`, `started_at`, `errors`).
+- `operations`: One row per operation of a Query Execution Summary (`file_id`, `seq`, `operation`, `seconds`).
+- `vertices`: One row per vertex of a Task Execution Summary (`file_id`, `seq`, `vertex`, `vertex_type` and the five metrics).
+- `counters`: One row per counter of the detailed metrics (`file_id`, `seq`, `counter_group`, `counter`, `value`).
+
+A query is identified by its log file and its position in it (`file_id`, `seq`), the other tables refer to it with the
+same pair. `started_at` is the `YYYY-MM-DD HH:MM:SS` start time taken from the queryId (`hive_20200501144051_...`), so
+SQLite's date functions work on it.
+
+Classes:
+- `SQLiteIndex`: Writes parsed queries into the database in batches and looks them up.
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime
+from .log_file_parser import LogFileParser
+from .records import VertexMetrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    file_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    query_id TEXT,
+    line_idx INTEGER,
+    byte_offset INTEGER,
+    started_at TEXT,
+    errors INTEGER,
+    PRIMARY KEY (file_id, seq)
+);
+CREATE TABLE IF NOT EXISTS operations (
+    file_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS vertices (
+    file_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    vertex TEXT NOT NULL,
+    vertex_type TEXT,
+    duration REAL,
+    cpu_time REAL,
+    gc_time REAL,
+    input_records REAL,
+    output_records REAL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    file_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    counter_group TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS queries_query_id ON queries (query_id);
+CREATE INDEX IF NOT EXISTS queries_started_at ON queries (started_at);
+CREATE INDEX IF NOT EXISTS operations_query ON operations (file_id, seq);
+CREATE INDEX IF NOT EXISTS operations_seconds ON operations (operation, seconds);
+CREATE INDEX IF NOT EXISTS vertices_query ON vertices (file_id, seq);
+CREATE INDEX IF NOT EXISTS vertices_vertex ON vertices (vertex_type, vertex);
+CREATE INDEX IF NOT EXISTS counters_query ON counters (file_id, seq);
+CREATE INDEX IF NOT EXISTS counters_counter ON counters (counter_group, counter, value);
+"""
+
+INSERTS = {
+    "queries": "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "operations": "INSERT INTO operations VALUES (?, ?, ?, ?)",
+    "vertices": "INSERT INTO vertices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "counters": "INSERT INTO counters VALUES (?, ?, ?, ?, ?)",
+}
+
+
+def query_start(query_id):
+    """Returns the start time ("YYYY-MM-DD HH:MM:SS") encoded in a queryId like hive_20200501144051_..., None if there is none."""
+    parts = (query_id or "").split("_")
+    if len(parts) < 2:
+        return None
+    try:
+        return datetime.strptime(parts[1], "%Y%m%d%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SQLiteIndex:
+    """
+    SQLiteIndex writes parsed queries into a local SQLite database in batches and looks them up.
+
+    Attributes:
+        path (str): Path of the database file (":memory:" for an in-memory database).
+        batch_size (int): Number of queries buffered before they are written with executemany().
+        _connection (sqlite3.Connection): The connection to the database.
+        _rows (dict): The buffered rows of every table.
+        _next_seq (dict): The next `seq` of every file_id that got queries in this session.
+        _file_ids (dict): The file_id of every source name add() was called with.
+
+    Methods:
+        __init__(self, path, batch_size, timeout): Constructor that opens (and if needed creates) the database.
+        add_file(self, log_file_path, records): (Re)indexes every query of a log file in a single transaction, returns the number of queries.
+        is_current(self, log_file_path): Returns whether the log file is indexed at its current size and modification time.
+        add(self, record, file): Buffers one QueryRecord of a file (or any other source name).
+        flush(self): Writes the buffered rows and commits.
+        slow_queries(self, operation, min_seconds, since): Returns the queries whose operation took at least `min_seconds`.
+        execute(self, sql, params): Runs any SQL statement on the database and returns the cursor.
+        close(self): Writes the buffered rows and closes the database.
+
+    Description:
+        Rows are buffered per table and written with one executemany() per table and batch, inside a transaction.
+        add_file() first deletes the rows of a log file that was indexed before, so indexing a file again replaces
+        its queries instead of duplicating them, and commits only once all its queries are written. A caller that
+        already has the QueryRecords of the file (e.g. the `queries` list of `parser.parse(queries=records)`) hands
+        them to add_file(), which then does not parse the log file on its own. The records are all read before the
+        transaction starts, so the write lock is never held while a log file is parsed.
+
+    Usage:
+        with SQLiteIndex("queries.db") as index:
+            for log_file_path in log_file_paths:
+                index.add_file(log_file_path)
+            index.slow_queries("Run DAG", 60, since="2020-05-01")
+
+        # Anything else is plain SQL
+        index.execute("SELECT vertex_type, AVG(duration) FROM vertices GROUP BY vertex_type").fetchall()
+
+    Notes:
+        The database runs in WAL mode with a busy `timeout`, so several processes can add files to the same database.
+    """
+    def __init__(self, path, batch_size=500, timeout=60.0):
+        """Constructor that opens (and if needed creates) the database."""
+        self.path = path
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._rows = {table: [] for table in INSERTS}
+        self._buffered = 0
+        self._next_seq = {}
+        self._file_ids = {}
+
+    def _file_id(self, path, size=None, mtime=None):
+        """Returns the file_id of a file (or source name), registering it if needed."""
+        self._connection.execute("INSERT OR IGNORE INTO files (path) VALUES (?)", (path,))
+        self._connection.execute("UPDATE files SET size = ?, mtime = ?, indexed_at = ? WHERE path = ?", (size, mtime, time.time(), path))
+        return self._connection.execute("SELECT file_id FROM files WHERE path = ?", (path,)).fetchone()[0]
+
+    def _buffer(self, file_id, record):
+        seq = self._next_seq.get(file_id)
+        if seq is None:
+            seq = self._connection.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM queries WHERE file_id = ?", (file_id,)).fetchone()[0]
+        self._next_seq[file_id] = seq + 1
+
+        # The collectors also count the errors whose message was not kept
+        errors = sum(getattr(errors, "total", len(errors or [])) for errors in (record.query_errors, record.task_errors, record.detailed_errors))
+        self._rows["queries"].append((file_id, seq, record.query_id, record.line_idx, record.offset, query_start(record.query_id), errors))
+        for operation, seconds in (record.query_summary or {}).items():
+            self._rows["operations"].append((file_id, seq, operation, _float(seconds)))
+        for vertex, metrics in (record.task_summary or {}).items():
+            self._rows["vertices"].append((file_id, seq, vertex, vertex.split()[0],
+                                           *(_float(metrics.get(metric)) for metric in VertexMetrics.KEYS)))
+        for group, counters in (record.detailed_summary or {}).items():
+            for counter, value in counters.items():
+                self._rows["counters"].append((file_id, seq, group, counter, _float(value)))
+
+        self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self._write_rows()
+
+    def _write_rows(self):
+        """Writes the buffered rows with one executemany() per table, in the open transaction."""
+        for table, rows in self._rows.items():
+            if rows:
+                self._connection.executemany(INSERTS[table], rows)
+                rows.clear()
+        self._buffered = 0
+
+    def add_file(self, log_file_path, records=None):
+        """(Re)indexes every query of a log file (its QueryRecords if given, read from it otherwise) in a single transaction, returns the number of queries."""
+        stat = os.stat(log_file_path)
+        path = os.path.abspath(log_file_path)
+        if records is None:
+            records = LogFileParser(log_file_path).iter_queries()
+        # The first write statement takes the write lock of the database, so the (possibly lazy) records are all read
+        # before it: other processes only wait for the writes, never for the parse of the file
+        records = list(records)
+        self.flush()
+        try:
+            file_id = self._file_id(path, stat.st_size, stat.st_mtime)
+            # Indexing a file again replaces its queries
+            for table in INSERTS:
+                self._connection.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+            self._next_seq[file_id] = 0
+            for record in records:
+                self._buffer(file_id, record)
+            self._write_rows()
+            self._connection.commit()
+        except BaseException:
+            for rows in self._rows.values():
+                rows.clear()
+            self._buffered = 0
+            self._next_seq.clear()
+            self._connection.rollback()
+            raise
+        return len(records)
+
+    def is_current(self, log_file_path):
+        """Returns whether the log file is indexed at its current size and modification time (so add_file() can be skipped)."""
+        stat = os.stat(log_file_path)
+        row = self._connection.execute("SELECT size, mtime FROM files WHERE path = ?", (os.path.abspath(log_file_path),)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def add(self, record, file=""):
+        """Buffers one QueryRecord of a file (or any other source name, e.g. a host), written by the next batch or flush()."""
+        file_id = self._file_ids.get(file)
+        if file_id is None:
+            file_id = self._file_ids[file] = self._file_id(file)
+        self._buffer(file_id, record)
+        if not self._buffered:
+            # The batch was just written
+            self._connection.commit()
+
+    def flush(self):
+        """Writes the buffered rows and commits."""
+        self._write_rows()
+        self._connection.commit()
+
+    def slow_queries(self, operation="Run DAG", min_seconds=60, since=None):
+        """Returns (query_id, path, byte_offset, started_at, seconds) of the queries whose operation took at least `min_seconds`, slowest first."""
+        self.flush()
+        sql = ("SELECT q.query_id, f.path, q.byte_offset, q.started_at, o.seconds FROM operations o "
+               "JOIN queries q ON q.file_id = o.file_id AND q.seq = o.seq JOIN files f ON f.file_id = o.file_id "
+               "WHERE o.operation = ? AND o.seconds >= ?")
+        params = [operation, min_seconds]
+        if since is not None:
+            sql += " AND q.started_at >= ?"
+            params.append(since)
+        return self._connection.execute(sql + " ORDER BY o.seconds DESC", params).fetchall()
+
+    def execute(self, sql, params=()):
+        """Runs any SQL statement on the database (after writing the buffered rows) and returns the cursor."""
+        self.flush()
+        return self._connection.execute(sql, params)
+
+    def close(self):
+        """Writes the buffered rows and closes the database."""
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,24 +1,30 @@
-import re
+from .error_collector import MAX_SAMPLES, TASK_CORRUPT_LINE, ErrorCollector
+from .line_classifier import TASK_CLASSIFIER, VERTEX
+from .records import VertexMetrics
 
 class TaskExecutionSummary:
     """
     TaskExecutionSummary class is designed to parse specific lines of log data to extract summaries of task executions.
 
     Attributes:
-        _data (tuple): A tuple containing parsed task execution summary data and errors encountered during parsing.
+        lines_matched (int): Number of lines that matched a pattern.
+        lines_failed (int): Number of lines that matched no pattern and were reported as errors.
+        max_errors (int): Number of errors kept per error code (the others are only counted), None keeps all.
+        _data (tuple): A tuple containing parsed task execution summary data and errors (an ErrorCollector) encountered during parsing.
 
     Methods:
-        __init__(self, lines): Constructor that initializes the TaskExecutionSummary object and initiates the parsing process.
+        __init__(self, lines, max_errors): Constructor that initializes the TaskExecutionSummary object and initiates the parsing process.
         data: A property that returns the parsed task execution summary data.
         _parse(self, lines): A private method that performs the actual parsing of provided log lines.
 
     Description:
         The primary purpose of the class is to identify and extract detailed metrics about task executions from the 
         provided log lines. These metrics include operation durations, CPU times, garbage collection times, input records, 
-        and output records. The class uses regular expressions to parse these metrics from each valid log line.
+        and output records. The class uses the shared, precompiled `TASK_CLASSIFIER` to parse these metrics from each valid log line.
 
         Each parsed line is expected to contain a specific task identifier (referred to as 'vertice' in the code) followed 
-        by the metrics values. The values are then stored in a dictionary with the 'vertice' as the key.
+        by the metrics values. The values are then stored in a `VertexMetrics` record (a compact, read-only mapping of the
+        metric names to their values) in a dictionary with the 'vertice' as the key.
 
     Usage:
         Instantiate the class with a list of log lines meant for parsing:
@@ -30,8 +36,11 @@ class TaskExecutionSummary:
         If a log line doesn't fit the expected format, it's deemed an error and is reported while also being skipped from summary.
         Commas within the log lines are removed to ensure accurate numeric conversion of metric values.
     """
-    def __init__(self, lines):
+    def __init__(self, lines, max_errors=MAX_SAMPLES):
         """Constructor that initializes the TaskExecutionSummary object and initiates the parsing process."""
+        self.max_errors = max_errors
+        self.lines_matched = 0
+        self.lines_failed = 0
         self._data = self._parse(lines)
     
     @property
@@ -49,29 +58,33 @@ class TaskExecutionSummary:
             "OUTPUT_RECORDS"
         ]
         summary = {}
-        errors = []
+        errors = ErrorCollector(self.max_errors)
 
-        # Make a regex of what a correct line pattern will look like for Task Summary lines
-        pattern = re.compile(r"^INFO\s{2}:\s+([a-zA-Z]+)\s(\d+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)")
+        # The shared, precompiled classifier knows what a correct Task Summary line looks like
+        match = TASK_CLASSIFIER.pattern.match
+        vertex_groups = TASK_CLASSIFIER.value_groups[VERTEX]
+        matched = failed = 0
 
         for idx, line in lines:
             # Remove commas from the line
             line = line.replace(",", "")
 
-            match = pattern.search(line)
-            if match:
-                vertice = f"{match.group(1)} {match.group(2)}"
-                metrics = {
-                    "DURATION": float(match.group(3)),
-                    "CPU_TIME": float(match.group(4)),
-                    "GC_TIME": float(match.group(5)),
-                    "INPUT_RECORDS": float(match.group(6)),
-                    "OUTPUT_RECORDS": float(match.group(7))
-                }
-                summary[vertice] = metrics
+            token = match(line)
+            if token is not None:
+                values = token.group(*vertex_groups)
+                # DURATION, CPU_TIME, GC_TIME, INPUT_RECORDS, OUTPUT_RECORDS ([\d.]+ also matches e.g. "1.2.3", a corrupt line)
+                try:
+                    metrics = VertexMetrics(*map(float, values[2:]))
+                except ValueError:
+                    token = None
+            if token is not None:
+                summary[f"{values[0]} {values[1]}"] = metrics
+                matched += 1
             else:
-                errors.append(f"Err parsing idx: {idx}, line: '{line}'. Line has corrupt structure... skipped")
+                errors.add(TASK_CORRUPT_LINE, idx, line)
+                failed += 1
                 continue
 
+        self.lines_matched, self.lines_failed = matched, failed
         return summary, errors
 
@@ -0,0 +1,351 @@
+"""
+vertex_analysis.py
+
+Per vertex analysis of the Task Execution Summary, with the critical path of the DAG when its plan is in the log.
+
+The Task Execution Summary gives the `DURATION`, `CPU_TIME`, `GC_TIME` and record counts of every `Map N`/`Reducer N`,
+but which vertex is worth tuning only shows in how they relate: a vertex with a low CPU to wall clock ratio waits (on
+its inputs, on containers), a high GC share points at memory pressure and the records per second and output to input
+ratio tell a slow vertex from a big one. When the `Vertex dependency in root stage` lines of the query plan are logged
+too, the edges of the DAG are rebuilt from them and the critical path (the chain of dependent vertices with the longest
+total duration) tells which vertices the query actually waited for.
+
+The metrics of many queries are kept column wise in a `VertexTable`, one `array('d')` per metric. A derived column is
+built by one plain Python loop (a list comprehension) over the rows of these arrays, there is no vectorized math, but it
+is computed once for all the vertices of all the queries and cached until rows are added.
+
+Classes:
+- `DagPlan`: Section parser turning the vertex dependency lines of a query plan into the edges of the DAG.
+- `VertexTable`: Columns of the vertex metrics of many queries, with the derived ratios and the critical paths.
+
+Functions:
+- `parse_edges(lines)`: Returns the edges ({vertex: [(source vertex, edge type), ...]}) of vertex dependency lines.
+- `critical_path(task_summary, edges)`: Returns the critical path of a DAG and its total duration.
+- `plan_of(results)`: Returns the edges of the `dag_plan` section collected with a parse result, None without one.
+- `analyze(results, edges)`: Returns the derived metrics of every vertex of one parse result.
+
+Constants:
+- `PLAN_HEADER`, `PLAN_END`: The header and end marker of the vertex dependency lines.
+- `DAG_PLAN_SECTION`: The SectionSpec of the vertex dependency lines, register it to collect them with the other sections.
+- `DERIVED_COLUMNS`: The names of the derived columns of a VertexTable.
+"""
+import heapq
+import math
+import re
+import warnings
+from array import array
+from collections.abc import Mapping
+from .error_collector import MAX_SAMPLES, ErrorCollector
+from .records import VertexMetrics
+from .section_registry import SectionSpec
+
+PLAN_HEADER = "INFO  : Vertex dependency in root stage"
+# The vertex dependencies are followed by the stages of the plan (Stage-0, ...)
+PLAN_END = "Stage-"
+
+# e.g. "Reducer 3 <- Map 1 (SIMPLE_EDGE), Map 2 (BROADCAST_EDGE)", with or without the "INFO  : " prefix
+_EDGE_LINE = re.compile(r"^(?:INFO\s{2}:\s*)?\s*([A-Za-z]+ \d+)\s+<-\s+(.+?)\s*$")
+_SOURCE = re.compile(r"([A-Za-z]+ \d+)\s*\(([A-Za-z_]+)\)")
+
+DERIVED_COLUMNS = ("CPU_RATIO", "GC_SHARE", "RECORDS_PER_SECOND", "RECORD_RATIO", "FAN_IN", "FAN_OUT", "CRITICAL")
+
+NAN = float("nan")
+
+
+def _add_edge_line(edges, line):
+    """Adds the edges of one vertex dependency line to `edges`, returns False if the line is not one."""
+    match = _EDGE_LINE.match(line)
+    if match is None:
+        return False
+    sources = _SOURCE.findall(match.group(2))
+    if not sources:
+        return False
+    edges.setdefault(match.group(1), []).extend(sources)
+    return True
+
+
+def parse_edges(lines):
+    """Returns the edges ({vertex: [(source vertex, edge type), ...]}) of vertex dependency lines, other lines are skipped."""
+    edges = {}
+    for line in lines:
+        _add_edge_line(edges, line)
+    return edges
+
+
+class DagPlan:
+    """
+    DagPlan class parses the vertex dependency lines of a query plan into the edges of the DAG.
+
+    Attributes:
+        lines_matched (int): Number of vertex dependency lines.
+        lines_failed (int): Always 0, the other lines of the plan are not errors.
+        max_errors (int): Number of errors kept per error code, only there for the same signature as the other parsers.
+        _data (tuple): A tuple containing the edges ({vertex: [(source vertex, edge type), ...]}) and errors (an ErrorCollector).
+
+    Methods:
+        __init__(self, lines, max_errors): Constructor that initializes the DagPlan object and initiates the parsing process.
+        data: A property that returns the edges and errors.
+        _parse(self, lines): A private method that performs the actual parsing of provided log lines.
+
+    Description:
+        A plan lists the dependencies of every vertex that has inputs on one line, e.g.
+        `Reducer 3 <- Map 1 (SIMPLE_EDGE), Map 2 (BROADCAST_EDGE)`. The lines are read up to the first line after them
+        that is not a dependency (the blank line before the stages of the plan), vertices without inputs have no line.
+
+    Usage:
+        registry = DEFAULT_REGISTRY.copy()
+        registry.add(DAG_PLAN_SECTION)
+        parser = LogFileParser(log_file_path, registry=registry)
+        edges, errors = parser.section_data("dag_plan")
+    """
+    def __init__(self, lines, max_errors=MAX_SAMPLES):
+        """Constructor that initializes the DagPlan object and initiates the parsing process."""
+        self.max_errors = max_errors
+        self.lines_matched = 0
+        self.lines_failed = 0
+        self._data = self._parse(lines)
+
+    @property
+    def data(self):
+        """Returns the edges and errors."""
+        return self._data
+
+    def _parse(self, lines):
+        """Parses the vertex dependency lines of the provided log lines."""
+        edges = {}
+        for _, line in lines:
+            if _add_edge_line(edges, line):
+                self.lines_matched += 1
+            elif edges:
+                # The dependencies are listed together, whatever follows them is the rest of the plan
+                break
+        return edges, ErrorCollector(self.max_errors)
+
+
+DAG_PLAN_SECTION = SectionSpec("dag_plan", PLAN_HEADER, 0, PLAN_END, DagPlan)
+
+
+def _durations(task_summary):
+    return {vertex: metrics.get("DURATION") or 0.0 for vertex, metrics in task_summary.items()}
+
+
+def critical_path(task_summary, edges):
+    """
+    Returns (path, duration in ms) of the chain of dependent vertices with the longest total DURATION, (None, None)
+    without edges or for edges that are not a DAG. Vertices of the plan without metrics (e.g. unions) count as 0 ms.
+    """
+    if not edges:
+        return None, None
+    weights = _durations(task_summary or {})
+    inputs = {target: [source for source, _ in sources] for target, sources in edges.items()}
+    vertices = list(weights)
+    for target, sources in inputs.items():
+        vertices.append(target)
+        vertices.extend(sources)
+    vertices = list(dict.fromkeys(vertices))
+
+    # Kahn's algorithm: every vertex is settled once all its inputs are
+    pending = {vertex: len(set(inputs.get(vertex, ()))) for vertex in vertices}
+    outputs = {}
+    for target, sources in inputs.items():
+        for source in set(sources):
+            outputs.setdefault(source, []).append(target)
+    ready = [vertex for vertex in vertices if not pending[vertex]]
+    longest, previous = {}, {}
+    settled = 0
+    while ready:
+        vertex = ready.pop()
+        settled += 1
+        best = max(inputs.get(vertex, ()), key=longest.__getitem__, default=None)
+        longest[vertex] = weights.get(vertex, 0.0) + (longest[best] if best is not None else 0.0)
+        previous[vertex] = best
+        for target in outputs.get(vertex, ()):
+            pending[target] -= 1
+            if not pending[target]:
+                ready.append(target)
+    if settled != len(vertices):
+        warnings.warn("The vertex dependencies of the plan contain a cycle, no critical path.")
+        return None, None
+
+    vertex = max(vertices, key=longest.__getitem__)
+    total = longest[vertex]
+    path = []
+    while vertex is not None:
+        path.append(vertex)
+        vertex = previous[vertex]
+    return path[::-1], total
+
+
+def _summary_of(results):
+    if isinstance(results, Mapping):
+        return results.get("query_id"), results.get("task_summary")
+    return getattr(results, "query_id", None), results.task_summary
+
+
+def plan_of(results):
+    """Returns the edges of the `dag_plan` section collected with a parse result (parser, QueryRecord or dict), None without one."""
+    if isinstance(results, Mapping):
+        return results.get(DAG_PLAN_SECTION.name)
+    try:
+        return results.section_data(DAG_PLAN_SECTION.name)[0]
+    except (AttributeError, ValueError):
+        # Results without sections, or a parser without the section registered
+        return None
+
+
+def _ratio(numerators, denominators, scale=1.0):
+    # A row by row loop over two columns, NaN where the denominator is 0
+    return array('d', [n * scale / d if d else NAN for n, d in zip(numerators, denominators)])
+
+
+class VertexTable:
+    """
+    VertexTable holds the vertex metrics of many queries column wise, with the derived ratios and the critical paths.
+
+    Attributes:
+        queries (list): The query id (or position, for results without one) of every row.
+        vertices (list): The vertex of every row.
+        metrics (dict): An `array('d')` per metric of VertexMetrics.KEYS, one value per row.
+        fan_in, fan_out (array): Number of input and output vertices of every row, NaN for queries without a plan.
+        critical (array): 1.0 for the rows on the critical path of their query, 0.0 off it, NaN without a plan.
+        critical_paths (dict): {query: (path, duration in ms)} of every query added with a plan.
+        results (int): Number of parse results added.
+        _derived (dict): The derived columns computed so far, dropped whenever rows are added.
+
+    Methods:
+        __init__(self): Constructor that initializes an empty table.
+        add(self, results, edges): Adds the vertices of one parse result, with the edges of its plan if known.
+        extend(self, results, plans): Adds every parse result of an iterable with its plan (from `plans` or collected with it).
+        column(self, name): Returns a metric or derived column.
+        rows(self, indexes): Yields every row (or the rows at the given indexes) as a dictionary.
+        top(self, name, n): Returns the n rows with the highest values of a column.
+
+    Description:
+        The derived columns are
+        - `CPU_RATIO`: CPU_TIME / DURATION, the number of cores the vertex kept busy on average.
+        - `GC_SHARE`: GC_TIME / CPU_TIME, the share of the CPU time spent collecting garbage.
+        - `RECORDS_PER_SECOND`: INPUT_RECORDS per second of DURATION.
+        - `RECORD_RATIO`: OUTPUT_RECORDS / INPUT_RECORDS, above 1 for exploding joins, far below for selective filters.
+        - `FAN_IN`, `FAN_OUT`, `CRITICAL`: From the plan, see above.
+        Ratios with a denominator of 0 are NaN. Each derived column is one row by row loop into a new array, computed
+        on first use and cached.
+
+    Usage:
+        table = VertexTable()
+        # With DAG_PLAN_SECTION registered, every QueryRecord carries the edges of its own plan
+        table.extend(LogFileParser(log_file_path, registry=registry).iter_queries())
+        for row in table.top("GC_SHARE", 10):
+            print(row["query"], row["vertex"], row["GC_SHARE"])
+    """
+    def __init__(self):
+        """Constructor that initializes an empty table."""
+        self.queries = []
+        self.vertices = []
+        self.metrics = {key: array('d') for key in VertexMetrics.KEYS}
+        self.fan_in = array('d')
+        self.fan_out = array('d')
+        self.critical = array('d')
+        self.critical_paths = {}
+        self.results = 0
+        self._derived = {}
+
+    def add(self, results, edges=None):
+        """Adds the vertices of one parse result (LogFileParser, QueryRecord or dictionary), with the edges of its plan if known."""
+        query, task_summary = _summary_of(results)
+        if query is None:
+            query = self.results
+        self.results += 1
+        if not task_summary:
+            return
+        if edges:
+            path, total = critical_path(task_summary, edges)
+            on_path = set(path or ())
+            fan_in = {target: len(sources) for target, sources in edges.items()}
+            fan_out = {}
+            for sources in edges.values():
+                for source, _ in sources:
+                    fan_out[source] = fan_out.get(source, 0) + 1
+            if path is not None:
+                self.critical_paths[query] = (path, total)
+        for vertex, metrics in task_summary.items():
+            self.queries.append(query)
+            self.vertices.append(vertex)
+            for key, column in self.metrics.items():
+                column.append(metrics.get(key, NAN))
+            if edges:
+                self.fan_in.append(fan_in.get(vertex, 0))
+                self.fan_out.append(fan_out.get(vertex, 0))
+                self.critical.append(float(vertex in on_path) if path is not None else NAN)
+            else:
+                self.fan_in.append(NAN)
+                self.fan_out.append(NAN)
+                self.critical.append(NAN)
+        self._derived.clear()
+
+    def extend(self, results, plans=None):
+        """Adds every parse result of an iterable, with the edges of its plan from `plans` (by query id) or else from its `dag_plan` section."""
+        for result in results:
+            edges = plans.get(_summary_of(result)[0]) if plans else None
+            if edges is None:
+                edges = plan_of(result)
+            self.add(result, edges)
+
+    def column(self, name):
+        """Returns a metric (e.g. "DURATION") or derived (e.g. "GC_SHARE") column, one value per row."""
+        if name in self.metrics:
+            return self.metrics[name]
+        column = self._derived.get(name)
+        if column is not None:
+            return column
+        metrics = self.metrics
+        if name == "CPU_RATIO":
+            column = _ratio(metrics["CPU_TIME"], metrics["DURATION"])
+        elif name == "GC_SHARE":
+            column = _ratio(metrics["GC_TIME"], metrics["CPU_TIME"])
+        elif name == "RECORDS_PER_SECOND":
+            # DURATION counts milliseconds
+            column = _ratio(metrics["INPUT_RECORDS"], metrics["DURATION"], 1000.0)
+        elif name == "RECORD_RATIO":
+            column = _ratio(metrics["OUTPUT_RECORDS"], metrics["INPUT_RECORDS"])
+        elif name == "FAN_IN":
+            column = self.fan_in
+        elif name == "FAN_OUT":
+            column = self.fan_out
+        elif name == "CRITICAL":
+            column = self.critical
+        else:
+            raise ValueError(f"Unknown column: {name}. Expected one of: {', '.join(VertexMetrics.KEYS + DERIVED_COLUMNS)}.")
+        self._derived[name] = column
+        return column
+
+    def rows(self, indexes=None):
+        """Yields every row (or the rows at the given indexes) as a dictionary with the query, the vertex, its metrics and the derived columns."""
+        names = VertexMetrics.KEYS + DERIVED_COLUMNS
+        columns = [self.column(name) for name in names]
+        for i in range(len(self.vertices)) if indexes is None else indexes:
+            row = {"query": self.queries[i], "vertex": self.vertices[i]}
+            row.update(zip(names, (column[i] for column in columns)))
+            yield row
+
+    def top(self, name, n=10):
+        """Returns the n rows with the highest values of a column (NaN values are left out)."""
+        column = self.column(name)
+        indexes = (i for i, value in enumerate(column) if not math.isnan(value))
+        return list(self.rows(heapq.nlargest(n, indexes, key=column.__getitem__)))
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __repr__(self):
+        return f"VertexTable(rows={len(self.vertices)}, results={self.results})"
+
+
+def analyze(results, edges=None):
+    """Returns {vertex: {metric or derived column: value}} of one parse result, with the edges of its plan if known."""
+    table = VertexTable()
+    table.add(results, edges)
+    analysis = {}
+    for row in table.rows():
+        del row["query"]
+        analysis[row.pop("vertex")] = row
+    return analysis
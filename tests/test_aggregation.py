@@ -0,0 +1,130 @@
+"""
+Tests for the cross-run aggregation of the `logparser` package (`logparser.aggregation`).
+
+This test module ensures that the quantile sketches stay within their relative accuracy and their bucket bound, that
+merging gives the same result as aggregating everything in one place and that parse results fold in correctly.
+
+The test scenarios include:
+- `test_sketch_accuracy`: Quantiles of a skewed distribution are within the relative accuracy of the exact ones.
+
+- `test_sketch_merge_is_exact`: Merging the sketches of several parts gives the very same sketch.
+
+- `test_sketch_bounded`: Values over many orders of magnitude never need more than `max_buckets`, p99 stays accurate.
+
+- `test_sketch_invalid`: Negative values, bad accuracies and sketches of different accuracy are refused.
+
+- `test_aggregate_records`: Totals, counts and quantiles per vertex type and counter of a multi-query log.
+
+- `test_worker_merge`: Aggregators of worker processes (pickled) and from JSON merge into the single-process result.
+
+Example:
+    $ pytest test_aggregation.py
+"""
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from logparser.aggregation import Aggregator, QuantileSketch
+from logparser.log_file_parser import LogFileParser
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+
+
+def exact_quantile(values, q):
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+def aggregate_paths(paths):
+    aggregator = Aggregator()
+    for path in paths:
+        aggregator.update(LogFileParser(path).iter_queries())
+    return aggregator
+
+
+def test_sketch_accuracy():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(8, 2) for _ in range(20000)] + [0.0] * 100
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0.001, 0.25, 0.5, 0.95, 0.99, 1):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.01, abs=1e-12)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_sketch_merge_is_exact():
+    rng = random.Random(2)
+    values = [rng.expovariate(0.001) for _ in range(5000)]
+    whole = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(part)
+    assert merged.to_dict() == whole.to_dict()
+
+
+def test_sketch_bounded():
+    rng = random.Random(3)
+    values = [10 ** rng.uniform(-5, 12) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=256)
+    for value in values:
+        sketch.add(value)
+        assert len(sketch) <= 256
+
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(values, 0.99), rel=0.01)
+    assert QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))).to_dict() == sketch.to_dict()
+
+
+def test_sketch_invalid():
+    with pytest.raises(ValueError):
+        QuantileSketch().add(-1)
+    with pytest.raises(ValueError):
+        QuantileSketch(relative_accuracy=0)
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_aggregate_records():
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    aggregator = Aggregator()
+    aggregator.update(records)
+    report = aggregator.report()
+
+    assert report["results"] == len(records)
+    map_durations = [metrics["DURATION"] for record in records for vertice, metrics in (record.task_summary or {}).items()
+                     if vertice.startswith("Map")]
+    map_report = report["vertices"]["Map"]["DURATION"]
+    assert map_report["count"] == len(map_durations)
+    assert map_report["total"] == pytest.approx(sum(map_durations))
+    assert (map_report["min"], map_report["max"]) == (min(map_durations), max(map_durations))
+    assert min(map_durations) <= map_report["p50"] <= max(map_durations)
+    assert set(report["vertices"]["Map"]) == {"DURATION", "CPU_TIME", "GC_TIME"}
+
+    succeeded = report["counters"]["org.apache.tez.common.counters.DAGCounter"]["NUM_SUCCEEDED_TASKS"]
+    assert succeeded["total"] == sum(record.detailed_summary["org.apache.tez.common.counters.DAGCounter"]["NUM_SUCCEEDED_TASKS"]
+                                     for record in records if record.detailed_summary)
+
+    # Only the chosen counter groups are aggregated
+    dag_only = Aggregator(groups=["org.apache.tez.common.counters.DAGCounter"])
+    dag_only.update(records)
+    assert {group for group, _ in dag_only.counters} == {"org.apache.tez.common.counters.DAGCounter"}
+
+
+def test_worker_merge():
+    paths = [PATH_TO_MULTI_QUERY_LOG, PATH_TO_VALID_LOG] * 3
+    expected = aggregate_paths(paths)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        partials = list(executor.map(aggregate_paths, [paths[:3], paths[3:]]))
+    merged = Aggregator()
+    for partial in partials:
+        merged.merge(Aggregator.from_dict(json.loads(json.dumps(partial.to_dict()))))
+
+    assert merged.to_dict() == expected.to_dict()
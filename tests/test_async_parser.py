@@ -0,0 +1,148 @@
+"""
+Tests for the asynchronous parsing API of the `logparser` package (`logparser.async_parser`).
+
+This test module ensures that a log arriving over a local pipe, a local TCP connection or an async iterable of chunks
+gives exactly the queries `LogFileParser.iter_queries()` gives for the same file, that the section parsers run in the
+executor and that the stream is not read ahead of a slow consumer.
+
+The test scenarios include:
+- `test_chunked_iterable`: Chunks cut at every possible size, even in the middle of lines and UTF-8 sequences.
+
+- `test_pipe`: The log written into an OS pipe and read through an `asyncio.StreamReader`.
+
+- `test_tcp_server`: The log sent by a local TCP server, parsed with a process pool.
+
+- `test_backpressure`: Only what is needed for the requested records (plus `max_pending` queries) is read.
+
+- `test_invalid_max_pending`: At least one query has to be allowed to be parsed at a time.
+
+Example:
+    $ pytest test_async_parser.py
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest
+from logparser.async_parser import aiter_queries
+from logparser.log_file_parser import LogFileParser
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def read_log():
+    with open(PATH_TO_MULTI_QUERY_LOG, 'rb') as file:
+        return file.read()
+
+
+def expected_records():
+    return [record.to_dict() for record in LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries()]
+
+
+async def collect(stream, **kwargs):
+    return [record.to_dict() async for record in aiter_queries(stream, **kwargs)]
+
+
+async def iter_chunks(content, size, consumed=None):
+    for start in range(0, len(content), size):
+        if consumed is not None:
+            consumed.append(start)
+        yield content[start:start + size]
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.mark.parametrize("size", [1, 7, 97, 4096])
+def test_chunked_iterable(size, tmp_path):
+    content = read_log().replace(b"INFO  : Query Execution Summary", "INFO  : é\n".encode() + b"INFO  : Query Execution Summary", 1)
+    log_file_path = tmp_path / "hive.log"
+    log_file_path.write_bytes(content)
+    expected = [record.to_dict() for record in LogFileParser(str(log_file_path)).iter_queries()]
+
+    executor = CountingExecutor()
+    with executor:
+        records = asyncio.run(collect(iter_chunks(content, size), executor=executor))
+    assert records == expected
+    # Every query was parsed in the executor
+    assert executor.submitted == len(expected)
+
+
+def test_pipe():
+    content = read_log()
+
+    async def main():
+        read_fd, write_fd = os.pipe()
+        reader = asyncio.StreamReader()
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, 'rb'))
+
+        def write():
+            with os.fdopen(write_fd, 'wb') as pipe:
+                for start in range(0, len(content), 100):
+                    pipe.write(content[start:start + 100])
+                    pipe.flush()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            return await collect(reader, chunk_size=64)
+        finally:
+            writer.join()
+            transport.close()
+
+    assert asyncio.run(main()) == expected_records()
+
+
+def test_tcp_server():
+    content = read_log()
+
+    async def main():
+        async def send(reader, writer):
+            writer.write(content)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(send, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                records = await collect(reader, executor=executor, max_pending=2)
+            writer.close()
+            return records
+
+    assert asyncio.run(main()) == expected_records()
+
+
+def test_backpressure():
+    content = read_log()
+    consumed = []
+
+    async def main():
+        queries = aiter_queries(iter_chunks(content, 50, consumed), max_pending=1)
+        first = await queries.__anext__()
+        read_before_close = len(consumed)
+        await queries.aclose()
+        return first, read_before_close
+
+    first, read_before_close = asyncio.run(main())
+    assert first.to_dict() == expected_records()[0]
+    # The first query ends on line 54, nothing much past it has been read
+    assert read_before_close * 50 < content.index(b"INFO  : Completed executing command") + 200
+    assert read_before_close < len(range(0, len(content), 50))
+
+
+def test_invalid_max_pending():
+    async def main():
+        return [record async for record in aiter_queries(iter_chunks(b"", 1), max_pending=0)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Tests for the binary columnar results file (`logparser.columnar`).
+
+This test module ensures that the summaries of many parsed logs and queries can be appended to one columnar file and
+read back, column by column, with exactly the values of the parsers.
+
+The test scenarios include:
+- `test_roundtrip`: Appends parsed logs and reads every table back.
+
+- `test_query_records`: Appends the QueryRecords of a multi-query log in one block, missing operations read as NaN.
+
+- `test_operation_named_source`: An operation named `source` is written under a prefixed name, not over the source column.
+
+- `test_truncated_file`: A partially written last block is skipped with a warning.
+
+- `test_cli_columnar`: The `--columnar` option of run-logparser appends every parsed log file.
+
+Example:
+    $ pytest test_columnar.py
+"""
+import math
+import warnings
+from types import SimpleNamespace
+import pytest
+from logparser.columnar import ColumnarReader, ColumnarWriter
+from logparser.log_file_parser import LogFileParser
+from logparser.run_parser import main
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_SEMIVALID_LOG = "tests/test_data/test_log_semivalid.txt"
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def parsed(log_file_path):
+    parser = LogFileParser(log_file_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parser.parse()
+    return parser
+
+
+def test_roundtrip(tmp_path):
+    path = str(tmp_path / "results.lpc")
+    valid, semivalid = parsed(PATH_TO_VALID_LOG), parsed(PATH_TO_SEMIVALID_LOG)
+    valid.save_columnar(path)
+    semivalid.save_columnar(path)
+    valid.save_columnar(path, source="again")
+
+    with ColumnarReader(path) as reader:
+        assert reader.tables() == ["queries", "vertices", "counters"]
+        assert reader.column("queries", "source") == [PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, "again"]
+        assert reader.column("queries", "Run DAG")[0] == float(valid.query_summary["Run DAG"])
+
+        vertices = reader.table("vertices")
+        assert reader.num_rows("vertices") == 2 * len(valid.task_summary)
+        for i, vertex in enumerate(valid.task_summary):
+            assert vertices["vertex"][i] == vertex
+            assert {key: vertices[key][i] for key in valid.task_summary[vertex]} == valid.task_summary[vertex]
+
+        counters = reader.table("counters")
+        read_back = {}
+        for source, group, name, value in zip(counters["source"], counters["group"], counters["counter"], counters["value"]):
+            if source == PATH_TO_VALID_LOG:
+                read_back.setdefault(group, {})[name] = value
+        assert read_back == valid.detailed_summary
+
+        with pytest.raises(KeyError):
+            reader.column("queries", "nothing")
+
+
+def test_query_records(tmp_path):
+    path = str(tmp_path / "results.lpc")
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    with ColumnarWriter(path) as writer:
+        writer.extend(records)
+
+    with ColumnarReader(path) as reader:
+        with_summary = [record for record in records if record.query_summary]
+        assert reader.column("queries", "source") == [record.query_id or "" for record in with_summary]
+        for operation in reader.columns("queries")[1:]:
+            for record, value in zip(with_summary, reader.column("queries", operation)):
+                if operation in record.query_summary:
+                    assert value == float(record.query_summary[operation])
+                else:
+                    assert math.isnan(value)
+
+
+def test_operation_named_source(tmp_path):
+    path = str(tmp_path / "results.lpc")
+    result = SimpleNamespace(query_summary={"source": 1.5, "Run DAG": 2.0}, task_summary=None, detailed_summary=None)
+    with ColumnarWriter(path) as writer:
+        with pytest.warns(UserWarning, match="operation:source"):
+            writer.append(result, source="hive.log")
+
+    with ColumnarReader(path) as reader:
+        assert reader.columns("queries") == ["source", "operation:source", "Run DAG"]
+        assert reader.column("queries", "source") == ["hive.log"]
+        assert list(reader.column("queries", "operation:source")) == [1.5]
+
+
+def test_truncated_file(tmp_path):
+    path = str(tmp_path / "results.lpc")
+    valid = parsed(PATH_TO_VALID_LOG)
+    valid.save_columnar(path)
+    valid.save_columnar(path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    with open(path, 'wb') as f:
+        f.write(content[:-10])
+
+    with pytest.warns(UserWarning, match="Truncated block"):
+        reader = ColumnarReader(path)
+    # The first append is complete, only the counters block of the second one got cut
+    assert reader.num_rows("queries") == 2 and reader.num_rows("vertices") == 2 * len(valid.task_summary)
+    assert len(reader.column("counters", "value")) == sum(len(group) for group in valid.detailed_summary.values())
+    reader.close()
+
+    with open(path, 'wb') as f:
+        f.write(b"not columnar")
+    with pytest.raises(ValueError):
+        ColumnarReader(path)
+
+
+@pytest.mark.filterwarnings("ignore:Headers not found")
+def test_cli_columnar(tmp_path, capsys):
+    path = str(tmp_path / "results.lpc")
+    exit_code = main([PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, "-o", str(tmp_path / "results"), "-j", "1", "--columnar", path])
+
+    assert exit_code == 0
+    with ColumnarReader(path) as reader:
+        assert sorted(reader.column("queries", "source")) == sorted([PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG])
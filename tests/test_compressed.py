@@ -0,0 +1,69 @@
+"""
+Tests for the compressed log input of the `logparser` package (`logparser.compressed`).
+
+This test module ensures that gzip, bz2 and xz compressed log files are recognized by their magic bytes and parse to
+exactly the same results as the plain log files, through parse(), iter_queries() and parse_parallel().
+
+The test scenarios include:
+- `test_detect_compression`: The compression is found from the content, whatever the file name.
+
+- `test_parse_compressed`: parse() of a compressed log gives the same summaries, errors and warnings as the plain one.
+
+- `test_iter_queries_compressed`: iter_queries() and parse_parallel() give the same records as for the plain log.
+
+Example:
+    $ pytest test_compressed.py
+"""
+import bz2
+import gzip
+import lzma
+import warnings
+import pytest
+from logparser.compressed import detect_compression
+from logparser.log_file_parser import LogFileParser
+from logparser.parallel_parser import parse_parallel
+from logparser.result_cache import RESULT_FIELDS
+
+PATH_TO_SEMIVALID_LOG = "tests/test_data/test_log_semivalid.txt"
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+COMPRESSIONS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+def compressed_copy(path, compression, tmp_path, name="hive.log"):
+    with open(path, 'rb') as file:
+        content = file.read()
+    compressed_path = tmp_path / name
+    compressed_path.write_bytes(COMPRESSIONS[compression](content))
+    return str(compressed_path)
+
+
+def parse(path):
+    parser = LogFileParser(path)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        parser.parse()
+    return {field: getattr(parser, field) for field in RESULT_FIELDS}, [str(warning.message) for warning in caught]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_detect_compression(compression, tmp_path):
+    # The name says plain text, the content is what counts
+    assert detect_compression(compressed_copy(PATH_TO_VALID_LOG, compression, tmp_path, "hive.txt")) == compression
+    assert detect_compression(PATH_TO_VALID_LOG) is None
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("path", [PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG])
+def test_parse_compressed(compression, path, tmp_path):
+    assert parse(compressed_copy(path, compression, tmp_path)) == parse(path)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_iter_queries_compressed(compression, tmp_path):
+    compressed_path = compressed_copy(PATH_TO_MULTI_QUERY_LOG, compression, tmp_path)
+    expected = [record.to_dict() for record in LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries()]
+
+    assert [record.to_dict() for record in LogFileParser(compressed_path).iter_queries()] == expected
+    assert [record.to_dict() for record in parse_parallel(compressed_path, workers=2)] == expected
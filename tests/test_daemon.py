@@ -0,0 +1,221 @@
+"""
+Tests for the resident parser service (`logparser.daemon`).
+
+This test module ensures that parse jobs are answered with the summaries and errors of the log file, from the
+in-memory cache when the log file did not change, that the queue of the worker pool is bounded and that the HTTP and
+Unix socket servers pass jobs and metrics through.
+
+The test scenarios include:
+- `test_parse`: A job gives the results of LogFileParser as JSON, the second time from the cache, with the metrics counted.
+
+- `test_failures`: A log file without headers, a missing file, invalid jobs and unexpected errors are reported, not raised.
+
+- `test_busy`: With the only worker blocked and no queue, a further job is answered "busy" right away.
+
+- `test_save_root`: Jobs only save under the save root of the service, and not at all without one.
+
+- `test_dead_worker`: A worker that dies fails its job, the pool is started again and answers the next jobs.
+
+- `test_servers`: Jobs and metrics round trip over HTTP and a Unix socket, the HTTP server refuses non loopback hosts.
+
+- `test_http_refuses_browsers`: Requests with an Origin, a foreign Host, a non JSON content type or a huge body are refused.
+
+- `test_lazy_import`: Importing the package or the CLI does not load the servers or asyncio, `logparser.ParserService` still works.
+
+Example:
+    $ pytest test_daemon.py
+"""
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import pytest
+from logparser.daemon import MAX_JOB_BYTES, ParserHTTPServer, ParserService, ParserUnixServer, parse_job, request
+from logparser.log_file_parser import LogFileParser
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_INVALID_LOG = "tests/test_data/test_log_invalid.txt"
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    with ParserService(workers=1, max_queue=4, save_root=str(tmp_path_factory.mktemp("results"))) as service:
+        yield service
+
+
+def test_parse(service, tmp_path):
+    parser = LogFileParser(PATH_TO_VALID_LOG)
+    parser.parse()
+
+    response = service.parse({"path": PATH_TO_VALID_LOG})
+    assert response["status"] == "ok" and response["error"] is None and not response["cached"]
+    results = response["results"]
+    assert results["query_summary"] == parser.query_summary
+    assert results["task_summary"] == {vertex: dict(metrics) for vertex, metrics in parser.task_summary.items()}
+    assert results["detailed_errors"] == list(parser.detailed_errors)
+    # Everything can be sent as JSON
+    assert json.loads(json.dumps(response)) == response
+
+    again = service.parse({"path": PATH_TO_VALID_LOG})
+    assert again["cached"] and again["results"] == results
+
+    selected = service.parse({"path": PATH_TO_VALID_LOG, "sections": ["task_summary"], "save": "hive"})
+    assert not selected["cached"] and list(selected["results"]) == ["task_summary", "task_errors"]
+    assert os.listdir(os.path.join(service.save_root, "hive"))
+
+    metrics = service.metrics()
+    assert metrics["cache_hits"] >= 1 and metrics["queue_depth"] == 0 and metrics["running"] == 0
+    assert metrics["latency_ms"]["count"] == metrics["completed"] + metrics["failed"] + metrics["cache_hits"]
+
+
+def test_failures(service, tmp_path):
+    response = service.parse({"path": PATH_TO_INVALID_LOG})
+    assert response["status"] == "failed" and response["error"] and response["results"] is None
+
+    missing = service.parse({"path": str(tmp_path / "missing.log")})
+    assert missing["status"] == "failed" and "missing.log" in missing["error"]
+
+    for job in ([], {"file": PATH_TO_VALID_LOG}, {"path": PATH_TO_VALID_LOG, "sections": ["nope"]}):
+        assert service.parse(job)["status"] == "invalid"
+
+    # Unexpected errors in a worker are answered too
+    assert parse_job({"path": PATH_TO_VALID_LOG, "sections": 5})["error"].startswith("TypeError")
+
+    with pytest.raises(ValueError):
+        ParserService(workers=0)
+
+
+def test_busy(tmp_path):
+    fifo = str(tmp_path / "fifo.log")
+    os.mkfifo(fifo)
+    with ParserService(workers=1, max_queue=0) as service:
+        # The worker blocks opening the FIFO until something opens it for writing
+        blocked = []
+        thread = threading.Thread(target=lambda: blocked.append(service.parse({"path": fifo})))
+        thread.start()
+        while service.metrics()["running"] == 0:
+            thread.join(0.01)
+
+        response = service.parse({"path": PATH_TO_VALID_LOG})
+        assert response["status"] == "busy" and service.metrics()["rejected"] == 1
+
+        with open(fifo, "w"):
+            # Removed while the worker still reads it, so it can not block on opening it again
+            os.remove(fifo)
+        thread.join()
+        assert blocked[0]["status"] == "failed"
+        assert service.parse({"path": PATH_TO_VALID_LOG})["status"] == "ok"
+
+
+def test_save_root(service, tmp_path):
+    outside = str(tmp_path / "outside")
+    for save in (outside, "../outside", "hive/../../outside"):
+        response = service.parse({"path": PATH_TO_VALID_LOG, "save": save})
+        assert response["status"] == "invalid" and "save root" in response["error"]
+    assert not os.path.exists(outside)
+
+    inside = os.path.join(service.save_root, "absolute")
+    assert service.parse({"path": PATH_TO_VALID_LOG, "save": inside})["status"] == "ok"
+    assert os.listdir(inside)
+
+    with ParserService(workers=1) as no_root:
+        response = no_root.parse({"path": PATH_TO_VALID_LOG, "save": str(tmp_path)})
+        assert response["status"] == "invalid" and "turned off" in response["error"]
+
+
+def test_dead_worker(tmp_path):
+    fifo = str(tmp_path / "fifo.log")
+    os.mkfifo(fifo)
+    with ParserService(workers=1, max_queue=0) as service:
+        # The worker blocks opening the FIFO, then gets killed
+        blocked = []
+        thread = threading.Thread(target=lambda: blocked.append(service.parse({"path": fifo})))
+        thread.start()
+        while service.metrics()["running"] == 0:
+            thread.join(0.01)
+        for pid in list(service._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        thread.join()
+
+        assert blocked[0]["status"] == "failed" and "died" in blocked[0]["error"]
+        assert service.metrics()["restarts"] == 1 and service.metrics()["running"] == 0
+        assert service.parse({"path": PATH_TO_VALID_LOG})["status"] == "ok"
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_servers(service, tmp_path):
+    http_server = ParserHTTPServer(service, "127.0.0.1", 0)
+    _serve(http_server)
+    url = "http://127.0.0.1:%d" % http_server.server_address[1]
+    try:
+        assert request({"path": PATH_TO_VALID_LOG}, url=url)["status"] == "ok"
+        assert request({"path": 42}, url=url)["status"] == "invalid"
+        assert request({"op": "metrics"}, url=url)["workers"] == 1
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+    with pytest.raises(ValueError):
+        ParserHTTPServer(service, "8.8.8.8", 0)
+
+    socket_path = str(tmp_path / "parser.sock")
+    unix_server = ParserUnixServer(service, socket_path)
+    _serve(unix_server)
+    try:
+        assert oct(os.stat(socket_path).st_mode & 0o777) == "0o600"
+        assert request({"path": PATH_TO_VALID_LOG, "sections": ["query_summary"]}, socket_path=socket_path)["status"] == "ok"
+        assert "latency_ms" in request({"op": "metrics"}, socket_path=socket_path)
+    finally:
+        unix_server.shutdown()
+        unix_server.server_close()
+    assert not os.path.exists(socket_path)
+
+
+def _post(port, body, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request("POST", "/parse", body, headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_http_refuses_browsers(service):
+    server = ParserHTTPServer(service, "127.0.0.1", 0)
+    _serve(server)
+    port = server.server_address[1]
+    job = json.dumps({"path": PATH_TO_VALID_LOG})
+    try:
+        assert _post(port, job, {"Content-Type": "application/json"})[0] == 200
+        assert _post(port, job, {"Content-Type": "application/json", "Host": f"localhost:{port}"})[0] == 200
+        # What a page can send without a CORS preflight
+        assert _post(port, job, {"Content-Type": "text/plain"})[0] == 415
+        assert _post(port, job, {"Content-Type": "application/json", "Origin": "http://evil.example"})[0] == 403
+        # DNS rebinding: the right address under a foreign name
+        assert _post(port, job, {"Content-Type": "application/json", "Host": f"evil.example:{port}"})[0] == 403
+        status, response = _post(port, b"x" * (MAX_JOB_BYTES + 1), {"Content-Type": "application/json"})
+        assert status == 413 and response["status"] == "invalid"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_lazy_import():
+    code = ("import sys, logparser.run_parser; "
+            "print(sorted(m for m in ('asyncio', 'http.server', 'socketserver', 'logparser.daemon') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+    import logparser
+    assert logparser.ParserService is ParserService and "ParserService" in dir(logparser)
+    with pytest.raises(AttributeError):
+        logparser.nope
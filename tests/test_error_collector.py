@@ -0,0 +1,81 @@
+"""
+Tests for the `ErrorCollector` class from the `logparser` package (`logparser.error_collector`).
+
+This test module ensures that the errors of the section parsers are counted per error code, that only the first records
+of each code are kept, and that the collector reads exactly like the list of messages the parsers used to build.
+
+The test scenarios include:
+- `test_reads_like_message_list`: Below the limit, the collector equals, iterates and indexes like the message list.
+
+- `test_bounded`: Beyond the limit only the first records of each code are kept, the others are counted and summarized,
+  indexing and slicing give the messages of the list.
+
+- `test_corrupt_section_is_bounded`: A section made of nothing but corrupt lines keeps `max_errors` records per code.
+
+- `test_serialization`: to_dict()/from_dict() and pickling give back an equal collector.
+
+Example:
+    $ pytest test_error_collector.py
+"""
+import json
+import pickle
+import pytest
+from logparser.detailed_metrics import DetailedMetrics
+from logparser.error_collector import DETAILED_CORRUPT_LINE, QUERY_MISSING_OPERATION, TASK_CORRUPT_LINE, ErrorCollector
+from logparser.task_execution_summary import TaskExecutionSummary
+
+
+def test_reads_like_message_list():
+    errors = ErrorCollector()
+    assert errors == [] and not errors and len(errors) == 0
+
+    errors.add(TASK_CORRUPT_LINE, 3, "INFO  : Map 1 x")
+    errors.add(QUERY_MISSING_OPERATION, None, "Run DAG")
+    messages = ["Err parsing idx: 3, line: 'INFO  : Map 1 x'. Line has corrupt structure... skipped",
+                "Critical operation: 'Run DAG' missing in the log data."]
+
+    assert errors == messages and list(errors) == messages
+    assert errors[1] == messages[1] and len(errors) == 2
+    assert errors.total == 2 and errors.dropped == 0
+    assert errors.counts == {TASK_CORRUPT_LINE: 1, QUERY_MISSING_OPERATION: 1}
+
+
+def test_bounded():
+    errors = ErrorCollector(max_samples=2)
+    for idx in range(5):
+        errors.add(TASK_CORRUPT_LINE, idx, "x")
+    errors.add(QUERY_MISSING_OPERATION, None, "Run DAG")
+
+    assert errors.samples == [(TASK_CORRUPT_LINE, 0, "x"), (TASK_CORRUPT_LINE, 1, "x"), (QUERY_MISSING_OPERATION, None, "Run DAG")]
+    assert errors.total == 6 and errors.dropped == 3
+    assert len(errors) == 4
+    assert errors[-1] == "... 3 more 'task_corrupt_line' errors (only the first 2 are kept)."
+
+    # Indexing and slicing give what the message list would
+    messages = list(errors)
+    assert [errors[i] for i in range(-4, 4)] == [messages[i] for i in range(-4, 4)]
+    assert errors[1:] == messages[1:] and errors[::-2] == messages[::-2]
+    with pytest.raises(IndexError):
+        errors[4]
+
+
+def test_corrupt_section_is_bounded():
+    lines = [(idx, f"INFO  : corrupt line {idx}") for idx in range(10000)]
+
+    errors = DetailedMetrics(lines, max_errors=10).data[1]
+    assert errors.counts == {DETAILED_CORRUPT_LINE: 10000}
+    assert len(errors.samples) == 10
+    assert errors[0].startswith("Err parsing idx: 0, line: 'INFO  : corrupt line 0'.")
+
+    # None keeps every record
+    assert len(TaskExecutionSummary(lines, max_errors=None).data[1]) == 10000
+
+
+def test_serialization():
+    errors = ErrorCollector(max_samples=1)
+    errors.add(TASK_CORRUPT_LINE, 1, "a")
+    errors.add(TASK_CORRUPT_LINE, 2, "b")
+
+    assert ErrorCollector.from_dict(json.loads(json.dumps(errors.to_dict()))) == errors
+    assert pickle.loads(pickle.dumps(errors)) == errors
+    assert ErrorCollector.from_dict(errors.to_dict()) != ErrorCollector()
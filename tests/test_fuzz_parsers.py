@@ -0,0 +1,97 @@
+"""
+Tests for the equivalence fuzzer of the section parsers (`benchmarks.fuzz_parsers`).
+
+This test module ensures that the section parsers give exactly the results of the reference regexes on mutated summary
+lines, that the fuzzer does report an engine that differs, and that the backtracking check tells superlinear matchers
+from linear ones. The timings of the real patterns depend on the load of the machine, they are run by
+`python -m benchmarks.fuzz_parsers`, not here.
+
+The test scenarios include:
+- `test_engines_match_references`: QuerySummary, TaskExecutionSummary and DetailedMetrics agree with their references.
+
+- `test_mismatch_is_reported`: An engine that differs from the reference is reported with the line it differs on.
+
+- `test_unparsable_values`: Lines whose value matches the pattern but is no number are corrupt lines, not a crash.
+
+- `test_tokenizer_matches_reference`: The linear time tokenizer QuerySummary falls back to gives the reference results.
+
+- `test_backtracking`: On a fake clock advanced by the matchers, a quadratic matcher is flagged and a linear one is not.
+
+Example:
+    $ pytest test_fuzz_parsers.py
+"""
+from functools import partial
+import pytest
+from benchmarks import fuzz_parsers
+from benchmarks.fuzz_parsers import (SECTION_NAMES, compare, find_backtracking, fuzz, fuzz_lines, growth,
+                                     reference_detailed_metrics)
+from logparser.detailed_metrics import DetailedMetrics
+from logparser.error_collector import DETAILED_CORRUPT_LINE, QUERY_CORRUPT_LINE, TASK_CORRUPT_LINE
+from logparser.query_summary import QuerySummary
+from logparser.task_execution_summary import TaskExecutionSummary
+
+
+def test_engines_match_references():
+    report = fuzz(count=20000, seed=0)
+    assert set(report) == set(SECTION_NAMES)
+    assert all(mismatches == [] for mismatches, _ in report.values())
+
+
+class _NoHeaderTrim:
+    # DetailedMetrics without the strip() of the header names
+    def __init__(self, lines, max_errors=None):
+        summary, errors = DetailedMetrics(lines, max_errors).data
+        self.data = {f"{name} " if name == "File System Counters" else name: group for name, group in summary.items()}, errors
+
+
+def test_mismatch_is_reported():
+    lines = ["INFO  : org.apache.tez.common.counters.DAGCounter:", "INFO  :    NUM_SUCCEEDED_TASKS: 58",
+             "INFO  : File System Counters:", "INFO  :    FILE_BYTES_READ: 954341"]
+    assert compare("detailed_summary", lines) == []
+    assert compare("detailed_summary", lines, engine=_NoHeaderTrim) == ["INFO  : File System Counters:"]
+
+
+def test_unparsable_values():
+    errors = QuerySummary([(1, "INFO  : Run DAG .s"), (2, "INFO  : Start DAG 1.2.3s")]).data[1]
+    assert errors.counts[QUERY_CORRUPT_LINE] == 2
+
+    summary, errors = TaskExecutionSummary([(1, "INFO  :      Map 1   1.2.3   516,890   7,624   13,119,189   1,200")]).data
+    assert summary == {} and errors.counts == {TASK_CORRUPT_LINE: 1}
+
+    lines = [(0, "INFO  : File System Counters:"), (1, "INFO  :    FILE_BYTES_READ: "), (2, "INFO  :    HDFS_READ_OPS: 12x"),
+             (3, "INFO  :    HDFS_OP_OPEN: 44012")]
+    summary, errors = DetailedMetrics(lines).data
+    assert summary == {"File System Counters": {"HDFS_OP_OPEN": 44012.0}}
+    assert errors.counts == {DETAILED_CORRUPT_LINE: 2}
+    assert list(errors) == reference_detailed_metrics(lines)[1]
+
+
+def test_tokenizer_matches_reference():
+    # Every line goes to the tokenizer
+    engine = partial(QuerySummary, max_line_length=0)
+    assert compare("query_summary", fuzz_lines("query_summary", 20000, seed=1), engine=engine) == []
+
+
+def test_backtracking(monkeypatch):
+    # The matchers advance a fake clock by their cost instead of taking time, so nothing depends on the machine
+    clock = [0.0]
+    monkeypatch.setattr(fuzz_parsers.time, "perf_counter", lambda: clock[0])
+
+    def matcher(cost):
+        def match(line):
+            clock[0] += cost(line)
+        return match
+
+    linear = matcher(lambda line: 1e-7 * len(line))
+    quadratic = matcher(lambda line: 1e-7 * (len(line) + line.count("1") ** 2))
+    make_line = lambda size: "INFO  : " + "1" * size
+    assert growth(linear, make_line) == pytest.approx(1.0, abs=0.05)
+    assert growth(quadratic, make_line) == pytest.approx(2.0, abs=0.05)
+
+    assert find_backtracking(linear) == []
+    found = find_backtracking(quadratic)
+    # Exactly the inputs made of units with a digit
+    units = fuzz_parsers.BACKTRACKING_UNITS
+    units += tuple(a + b for a in units for b in units if a != b)
+    assert all("1" in unit for _, _, unit, _ in found)
+    assert len(found) == sum("1" in unit for unit in units) * len(fuzz_parsers.BACKTRACKING_TAILS)
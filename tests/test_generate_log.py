@@ -0,0 +1,37 @@
+"""
+Tests for the synthetic log generator of the benchmarks (`benchmarks.generate_log`).
+
+This test module ensures that the generated logs look like real ones to the parser, so that the benchmarks measure the
+same code paths as production logs.
+
+The test scenarios include:
+- `test_clean_log`: Without corruption every query parses without errors, with the configured vertices and counters.
+
+- `test_corrupted_log`: With corruption the parser reports errors but still finds every query.
+
+Example:
+    $ pytest test_generate_log.py
+"""
+from benchmarks.generate_log import generate_log
+from logparser.log_file_parser import LogFileParser
+
+
+def test_clean_log(tmp_path):
+    log_file_path = str(tmp_path / "synthetic.log")
+    queries, written = generate_log(log_file_path, queries=5, vertices=7, counters=30, seed=1)
+
+    records = list(LogFileParser(log_file_path).iter_queries())
+    assert queries == len(records) == 5 and written > 0
+    for record in records:
+        assert record.query_id and record.query_errors == [] and record.task_errors == [] and record.detailed_errors == []
+        assert len(record.query_summary) == 6 and len(record.task_summary) == 7
+        assert sum(len(group) for group in record.detailed_summary.values()) == 30
+
+
+def test_corrupted_log(tmp_path):
+    log_file_path = str(tmp_path / "synthetic.log")
+    queries, _ = generate_log(log_file_path, queries=50, corruption=0.2, seed=2)
+
+    records = list(LogFileParser(log_file_path).iter_queries())
+    assert len(records) == queries == 50
+    assert any(record.task_errors or record.detailed_errors for record in records)
@@ -0,0 +1,95 @@
+"""
+Tests for the opt-in instrumentation of `LogFileParser` (`logparser.instrumentation`).
+
+This test module ensures that every stage of parse() and save() gets timed and counted, that the counters agree with
+the parse results and that the cProfile dump can be read back.
+
+The test scenarios include:
+- `test_stats_disabled_by_default`: Without `stats` no counters are kept.
+
+- `test_stage_counters`: Checks the stages (default and stream mode) and their line, byte, match and error counters.
+
+- `test_shared_stats`: One ParserStats shared by several parsers adds up their counters.
+
+- `test_profile_dump`: The profile of parse() and save() is dumped and readable with pstats.
+
+Example:
+    $ pytest test_instrumentation.py
+"""
+import os
+import pstats
+import pytest
+from logparser.instrumentation import ParserStats
+from logparser.log_file_parser import LogFileParser
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_SEMIVALID_LOG = "tests/test_data/test_log_semivalid.txt"
+
+
+def test_stats_disabled_by_default():
+    parser = LogFileParser(PATH_TO_VALID_LOG)
+    parser.parse()
+    assert parser.stats is None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_stage_counters(stream, tmp_path):
+    parser = LogFileParser(PATH_TO_SEMIVALID_LOG, stream=stream, stats=True)
+    with pytest.warns(UserWarning):
+        parser.parse()
+    parser.save(str(tmp_path))
+    stages = parser.stats.stages
+
+    read_stages = ["stream_lines"] if stream else ["extract_headers", "extract_lines"]
+    # The semivalid log only has a Query Execution Summary
+    assert list(stages) == read_stages + ["query_summary", "save"]
+    assert all(stage.calls == 1 and stage.seconds >= 0 for stage in stages.values())
+
+    size = os.path.getsize(PATH_TO_SEMIVALID_LOG)
+    if stream:
+        assert stages["stream_lines"].bytes == size
+        with open(PATH_TO_SEMIVALID_LOG, 'rb') as f:
+            assert stages["stream_lines"].lines == len(f.read().decode().splitlines())
+    else:
+        assert stages["extract_headers"].bytes == size
+        assert 0 < stages["extract_lines"].bytes < size
+
+    query_stage = stages["query_summary"]
+    line_errors = [error for error in parser.query_errors if error.startswith("Err parsing")]
+    assert query_stage.errors == len(line_errors) > 0
+    assert query_stage.matched == len(parser.query_summary)
+    assert query_stage.lines == query_stage.matched + query_stage.errors
+    assert stages["save"].bytes > 0
+
+    assert set(parser.stats.to_dict()["query_summary"]) == {"calls", "seconds", "lines", "bytes", "matched", "errors"}
+    assert "query_summary" in parser.stats.report()
+
+
+def test_shared_stats():
+    shared = ParserStats()
+    for _ in range(3):
+        LogFileParser(PATH_TO_VALID_LOG, stats=shared).parse()
+
+    single = LogFileParser(PATH_TO_VALID_LOG, stats=True)
+    single.parse()
+    assert shared.stages["detailed_metrics"].calls == 3
+    assert shared.stages["detailed_metrics"].lines == 3 * single.stats.stages["detailed_metrics"].lines
+
+    merged = ParserStats()
+    merged.merge(shared)
+    merged.merge(single.stats)
+    assert merged.stages["task_summary"].calls == 4
+    assert merged.total_seconds == pytest.approx(shared.total_seconds + single.stats.total_seconds)
+
+
+def test_profile_dump(tmp_path):
+    profile_path = str(tmp_path / "parse.prof")
+    parser = LogFileParser(PATH_TO_VALID_LOG, profile_path=profile_path)
+    parser.parse()
+    functions = {function for _, _, function in pstats.Stats(profile_path).stats}
+    assert {"_extract_headers", "_extract_lines"} <= functions
+    calls_of_parse = pstats.Stats(profile_path).total_calls
+
+    # The dump after save() holds both calls
+    parser.save(str(tmp_path / "results"))
+    assert pstats.Stats(profile_path).total_calls > calls_of_parse
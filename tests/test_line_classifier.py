@@ -0,0 +1,58 @@
+"""
+Tests for the shared line classifiers (`logparser.line_classifier`).
+
+This test module ensures that every kind of summary line comes back as the right (kind, values) token, that a line
+matching no kind is recognized as such and that the value groups point at the values of their kind.
+
+The test scenarios include:
+- `test_tokens`: One line of every kind of every classifier and the token it becomes.
+
+- `test_unmatched`: Corrupt lines and lines of other sections give (None, None).
+
+- `test_header_precedence`: A line that used to match both the header and the metric pattern is still a header.
+
+- `test_value_groups`: `pattern.match` with the value groups gives the same values as classify().
+
+Example:
+    $ pytest test_line_classifier.py
+"""
+import pytest
+from logparser.line_classifier import (LineClassifier, QUERY_CLASSIFIER, TASK_CLASSIFIER, DETAILED_CLASSIFIER,
+                                       OPERATION, VERTEX, HEADER, METRIC)
+
+
+@pytest.mark.parametrize("classifier, line, token", [
+    (QUERY_CLASSIFIER, "INFO  : Get Query Coordinator (AM)              0.03s\n", (OPERATION, ("Get Query Coordinator (AM)", "0.03"))),
+    (TASK_CLASSIFIER, "INFO  :      Map 1          10217.00    140,710    1,937  1,039,616,458      3,038,797\n".replace(",", ""),
+     (VERTEX, ("Map", "1", "10217.00", "140710", "1937", "1039616458", "3038797"))),
+    (DETAILED_CLASSIFIER, "INFO  : org.apache.tez.common.counters.DAGCounter:\n", (HEADER, ("org.apache.tez.common.counters.DAGCounter",))),
+    (DETAILED_CLASSIFIER, "INFO  :    NUM_SUCCEEDED_TASKS: 1219\n", (METRIC, ("NUM_SUCCEEDED_TASKS", "1219"))),
+])
+def test_tokens(classifier, line, token):
+    assert classifier.classify(line) == token
+
+
+@pytest.mark.parametrize("classifier, line", [
+    (QUERY_CLASSIFIER, "INFO  : Compile Query  abc\n"),
+    (TASK_CLASSIFIER, "INFO  :      Map 1          10217.00    140710\n"),
+    (DETAILED_CLASSIFIER, "INFO  :    NUM_SUCCEEDED_TASKS 1219\n"),
+    (DETAILED_CLASSIFIER, "INFO  : Completed executing command(queryId=hive_1)\n"),
+    (DETAILED_CLASSIFIER, "WARN  :    NUM_SUCCEEDED_TASKS: 1219\n"),
+])
+def test_unmatched(classifier, line):
+    assert classifier.classify(line) == (None, None)
+
+
+@pytest.mark.parametrize("line", ["INFO  :    FILE_BYTES_READ:\n", "INFO  :    FILE_BYTES_READ:"])
+def test_header_precedence(line):
+    kind, values = DETAILED_CLASSIFIER.classify(line)
+    assert kind == HEADER and values[0].strip() == "FILE_BYTES_READ"
+
+
+def test_value_groups():
+    classifier = LineClassifier([("pair", r"\s(\w+)=(\d+)$"), ("flag", r"\s(\w+)!$")])
+    assert classifier.value_groups == {"pair": (2, 3), "flag": (5,)}
+    for line in ("INFO  : a=1", "INFO  : b!"):
+        kind, values = classifier.classify(line)
+        match = classifier.pattern.match(line)
+        assert tuple(match[group] for group in classifier.value_groups[kind]) == values
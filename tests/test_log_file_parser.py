@@ -19,6 +19,17 @@ The test scenarios include:
   none of the expected headers are found. It ensures the parser raises an appropriate error and doesn't 
   produce any parsed data.
 
+- `test_stream_blocks_match_lines`: The block-wise reading of the streaming mode collects the same sections as feeding
+  every line, whatever the block size and line endings.
+
+- `test_parse_with_queries`: parse(queries=records) gives the results and warnings of parse() and the records of
+  iter_queries() from a single read of the log file.
+
+- `test_selected_sections`: With `sections=`, only the selected sections are parsed by parse(), the others are parsed
+  once, on first access, and end up exactly as with a full parse.
+
+- `test_unknown_section`: Selecting a section that does not exist raises a ValueError.
+
 Usage:
     This module can be run directly or imported as part of a larger test suite.
 
@@ -36,8 +47,11 @@ Notes:
     and Efficiency. My logic in this case is that since these other private methods are encapsulated in 
     the .parse() method this test will be more of an E2E test than a unit test.   
 """
+import io
+import warnings
 import pytest
 from logparser.log_file_parser import LogFileParser
+from logparser.section_stream import SectionStream, iter_log_lines
 
 # Paths to your test logs.
 PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
@@ -130,3 +144,127 @@ def test_parse_with_invalid_log(setup_log_file_parser):
     assert task_summary is None, task_errors is None
     assert detailed_summary is None, detailed_errors is None
     
+
+
+@pytest.mark.parametrize("log_file_path", [PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, "logparser/logfile.txt"])
+def test_stream_parse_matches_parse(log_file_path):
+    # The streaming mode reads the file line by line but has to end up with exactly the same results and warnings
+    with warnings.catch_warnings(record=True) as default_warnings:
+        warnings.simplefilter("always")
+        parser = LogFileParser(log_file_path)
+        parser.parse()
+    with warnings.catch_warnings(record=True) as stream_warnings:
+        warnings.simplefilter("always")
+        stream_parser = LogFileParser(log_file_path, stream=True)
+        stream_parser.parse()
+
+    assert [str(w.message) for w in stream_warnings] == [str(w.message) for w in default_warnings]
+    assert (stream_parser.query_summary, stream_parser.query_errors) == (parser.query_summary, parser.query_errors)
+    assert (stream_parser.task_summary, stream_parser.task_errors) == (parser.task_summary, parser.task_errors)
+    assert (stream_parser.detailed_summary, stream_parser.detailed_errors) == (parser.detailed_summary, parser.detailed_errors)
+
+
+@pytest.mark.parametrize("log_file_path", [PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, "tests/test_data/test_log_multi_query.txt"])
+def test_parse_with_queries(log_file_path, monkeypatch):
+    with warnings.catch_warnings(record=True) as default_warnings:
+        warnings.simplefilter("always")
+        parser = LogFileParser(log_file_path)
+        parser.parse()
+    expected = [record.to_dict() for record in parser.iter_queries()]
+
+    # Neither the header search of parse() nor a separate iter_queries() read is made
+    for method in ("_extract_headers", "_extract_lines", "iter_queries"):
+        monkeypatch.setattr(LogFileParser, method, lambda self, *args, method=method: pytest.fail(f"{method} read the log file again"))
+    with warnings.catch_warnings(record=True) as queries_warnings:
+        warnings.simplefilter("always")
+        queries_parser = LogFileParser(log_file_path)
+        records = []
+        queries_parser.parse(queries=records)
+    monkeypatch.undo()
+
+    assert [record.to_dict() for record in records] == expected
+    assert [str(w.message) for w in queries_warnings] == [str(w.message) for w in default_warnings]
+    for name in ("query_summary", "query_errors", "task_summary", "task_errors", "detailed_summary", "detailed_errors"):
+        assert getattr(queries_parser, name) == getattr(parser, name)
+
+
+@pytest.mark.parametrize("line_end", [b"\n", b"\r\n", b"\x0c\n"])
+@pytest.mark.parametrize("block_size", [1, 5, 64, 1 << 20])
+def test_stream_blocks_match_lines(line_end, block_size):
+    with open("tests/test_data/test_log_multi_query.txt", 'rb') as file:
+        content = file.read().replace(b"\n", line_end)
+
+    def collect(feed):
+        stream = SectionStream()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            lines = feed(stream)
+        return stream.header_idxs, stream.section_lines, lines, [str(w.message) for w in caught]
+
+    def feed_lines(stream):
+        lines = 0
+        for idx, _, line in iter_log_lines(io.BytesIO(content)):
+            stream.feed(idx, line)
+            lines += 1
+        return lines
+
+    assert collect(lambda stream: stream.feed_file(io.BytesIO(content), block_size=block_size)) == collect(feed_lines)
+
+
+def test_stream_parse_with_invalid_log():
+    parser = LogFileParser(PATH_TO_INVALID_LOG, stream=True)
+
+    with pytest.raises(ValueError, match="No headers found in the log file."):
+        parser.parse()
+
+    assert parser.query_summary is None and parser.task_summary is None and parser.detailed_summary is None
+
+
+def test_parse_with_empty_log(tmp_path):
+    # An empty file can not be memory mapped, it simply has no headers
+    log_file_path = tmp_path / "empty.txt"
+    log_file_path.write_text("")
+
+    with pytest.raises(ValueError, match="No headers found in the log file."):
+        LogFileParser(str(log_file_path)).parse()
+
+
+def test_headers_must_span_whole_lines(tmp_path):
+    # Headers are searched in the raw file buffer, text that only contains a header is not a header
+    with open(PATH_TO_VALID_LOG) as file:
+        content = file.read()
+    content = "x INFO  : Task Execution Summary\nINFO  : Query Execution Summary y\n" + content
+    log_file_path = tmp_path / "log.txt"
+    log_file_path.write_text(content)
+
+    parser = LogFileParser(str(log_file_path))
+    parser.parse()
+
+    assert parser._header_idxs == {"INFO  : Query Execution Summary": 10,
+                                   "INFO  : Task Execution Summary": 22,
+                                   "INFO  : org.apache.tez.common.counters.DAGCounter:": 36}
+    assert parser.query_errors == [] and parser.task_errors == [] and parser.detailed_errors == []
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_selected_sections(stream):
+    full_parser = LogFileParser(PATH_TO_VALID_LOG, stream=stream)
+    parser = LogFileParser(PATH_TO_VALID_LOG, stream=stream, stats=True, sections=["task_summary"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        full_parser.parse()
+        parser.parse()
+
+    assert "task_summary" in parser.stats.stages
+    assert "query_summary" not in parser.stats.stages and "detailed_metrics" not in parser.stats.stages
+
+    assert (parser.query_summary, parser.query_errors) == (full_parser.query_summary, full_parser.query_errors)
+    assert (parser.detailed_errors, parser.detailed_summary) == (full_parser.detailed_errors, full_parser.detailed_summary)
+    assert (parser.task_summary, parser.task_errors) == (full_parser.task_summary, full_parser.task_errors)
+    # Each section was parsed exactly once
+    assert all(parser.stats.stages[name].calls == 1 for name in ("query_summary", "task_summary", "detailed_metrics"))
+
+
+def test_unknown_section():
+    with pytest.raises(ValueError, match="Unknown sections: query"):
+        LogFileParser(PATH_TO_VALID_LOG, sections=["query", "task_summary"])
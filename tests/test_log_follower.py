@@ -0,0 +1,127 @@
+"""
+Tests for the `LogFollower` class from the `logparser` package.
+
+This test module ensures that following a growing log file gives the same queries as parsing the complete file,
+that every query is returned as soon as it completes and that following continues from the checkpoint file after a
+restart, including a query whose sections were only partially written before the restart.
+
+The test scenarios include:
+- `test_follow_growing_log`: Appends the log file in small pieces (even in the middle of lines) and polls in between.
+
+- `test_resume_from_checkpoint`: A new LogFollower picks up where the previous one stopped.
+
+- `test_rotated_log`: A truncated log file is followed from its beginning again.
+
+- `test_regrown_log`: A log file truncated and written again past the old offset is followed from its beginning again.
+
+- `test_checkpoint_after_consumed`: follow() only writes the checkpoint once a poll's queries are consumed, and not when idle.
+
+Example:
+    $ pytest test_log_follower.py
+"""
+from logparser.log_file_parser import LogFileParser
+from logparser.log_follower import LogFollower
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def read_log():
+    with open(PATH_TO_MULTI_QUERY_LOG, 'rb') as file:
+        return file.read()
+
+
+def completed_records():
+    # Following never returns the trailing unfinished query
+    return [record.to_dict() for record in LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries() if record.query_id]
+
+
+def test_follow_growing_log(tmp_path):
+    content = read_log()
+    log_file_path = tmp_path / "hive.log"
+    log_file_path.write_bytes(b"")
+    follower = LogFollower(str(log_file_path))
+
+    records = []
+    for end in range(0, len(content) + 97, 97):
+        with open(log_file_path, 'wb') as file:
+            file.write(content[:end])
+        records.extend(follower.poll())
+
+    assert [record.to_dict() for record in records] == completed_records()
+
+
+def test_resume_from_checkpoint(tmp_path):
+    content = read_log()
+    log_file_path = tmp_path / "hive.log"
+    checkpoint_path = str(tmp_path / "hive.checkpoint.json")
+
+    # Stop in the middle of the Task Execution Summary of the second query
+    middle = content.rindex(b"INFO  :  Reducer 2")
+    log_file_path.write_bytes(content[:middle])
+    follower = LogFollower(str(log_file_path), checkpoint_path)
+    first_records = follower.poll()
+    follower.save_checkpoint()
+
+    log_file_path.write_bytes(content)
+    second_records = LogFollower(str(log_file_path), checkpoint_path).poll()
+
+    assert [record.to_dict() for record in first_records + second_records] == completed_records()
+    assert [record.query_id for record in first_records] == [completed_records()[0]["query_id"]]
+
+
+def test_rotated_log(tmp_path):
+    content = read_log()
+    log_file_path = tmp_path / "hive.log"
+    log_file_path.write_bytes(content)
+    follower = LogFollower(str(log_file_path))
+    assert len(follower.poll()) == 2
+
+    log_file_path.write_bytes(content[:content.index(b"INFO  : OK")])
+
+    assert [record.to_dict() for record in follower.poll()] == completed_records()[:1]
+
+
+def test_regrown_log(tmp_path):
+    content = read_log()
+    log_file_path = tmp_path / "hive.log"
+    checkpoint_path = str(tmp_path / "hive.checkpoint.json")
+    first_query_end = content.index(b"INFO  : OK")
+    log_file_path.write_bytes(content[:first_query_end])
+    follower = LogFollower(str(log_file_path), checkpoint_path)
+    assert len(follower.poll()) == 1
+    follower.save_checkpoint()
+
+    # Truncated in place (same inode) and written again with other, longer content
+    other = content.replace(b"hive_", b"hivex")
+    with open(log_file_path, 'r+b') as file:
+        file.truncate(0)
+        file.write(other)
+
+    for follower in (follower, LogFollower(str(log_file_path), checkpoint_path)):
+        assert [record.query_id[:5] for record in follower.poll()] == ["hivex", "hivex"]
+
+
+def test_checkpoint_after_consumed(tmp_path):
+    content = read_log()
+    log_file_path = tmp_path / "hive.log"
+    checkpoint_path = tmp_path / "hive.checkpoint.json"
+    log_file_path.write_bytes(content)
+
+    follower = LogFollower(str(log_file_path), str(checkpoint_path))
+    # Stops before the second poll
+    polls = iter((False, True))
+    queries = follower.follow(interval=0, stop=lambda: next(polls))
+    next(queries)
+    next(queries)
+    # The caller did not ask for more yet, a crash now returns both queries again
+    assert not checkpoint_path.exists()
+    assert len(LogFollower(str(log_file_path), str(checkpoint_path)).poll()) == 2
+
+    assert list(queries) == []
+    assert LogFollower(str(log_file_path), str(checkpoint_path)).poll() == []
+
+    # An idle poll writes nothing
+    mtime = checkpoint_path.stat().st_mtime_ns
+    follower.poll()
+    follower.save_checkpoint()
+    assert checkpoint_path.stat().st_mtime_ns == mtime
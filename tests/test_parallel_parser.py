@@ -0,0 +1,47 @@
+"""
+Tests for the `parallel_parser` module of the `logparser` package.
+
+This test module ensures that parsing a multi-query log file in parallel byte ranges gives exactly the same
+QueryRecords, in the same order and with the same line indexes, as the sequential `LogFileParser.iter_queries`.
+
+The test scenarios include:
+- `test_find_query_boundaries`: Checks that every range starts right after a `Completed executing command` line.
+
+- `test_parse_parallel_matches_iter_queries`: Compares the parallel results with the sequential ones, also for log
+  files with Windows line endings and other line separators where the fast line count can not be used.
+
+Example:
+    $ pytest test_parallel_parser.py
+"""
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.parallel_parser import find_query_boundaries, parse_parallel
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def test_find_query_boundaries():
+    with open(PATH_TO_MULTI_QUERY_LOG, 'rb') as file:
+        content = file.read()
+
+    boundaries = find_query_boundaries(PATH_TO_MULTI_QUERY_LOG, 8)
+
+    assert boundaries[0] == 0 and boundaries[-1] == len(content)
+    assert boundaries == sorted(set(boundaries))
+    for boundary in boundaries[1:-1]:
+        previous_line = content[:boundary].splitlines()[-1]
+        assert previous_line.startswith(b"INFO  : Completed executing command(queryId=")
+
+
+@pytest.mark.parametrize("line_ending", ["\n", "\r\n", "\x0c\n"])
+def test_parse_parallel_matches_iter_queries(tmp_path, line_ending):
+    with open(PATH_TO_MULTI_QUERY_LOG) as file:
+        content = file.read().replace("\n", line_ending)
+    log_file_path = tmp_path / "log.txt"
+    log_file_path.write_bytes(content.encode())
+
+    expected = [record.to_dict() for record in LogFileParser(str(log_file_path)).iter_queries()]
+
+    for workers, ranges in [(1, 3), (2, 3), (2, 8)]:
+        records = parse_parallel(str(log_file_path), workers=workers, ranges=ranges)
+        assert [record.to_dict() for record in records] == expected
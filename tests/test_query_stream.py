@@ -0,0 +1,64 @@
+"""
+Tests for the multi-query support of the `logparser` package (`QueryStream` and `LogFileParser.iter_queries`).
+
+This test module ensures that a log file holding several queries is split at every
+`Completed executing command(queryId=...)` line and that each query gets its own summaries.
+
+The test scenarios include:
+- `test_iter_queries_splits_every_query`: Checks that every query block is yielded with its queryId and summaries.
+
+- `test_first_query_matches_parse`: The first query of a log file has to be summarized exactly like parse() does it.
+
+- `test_iter_queries_is_lazy`: The first query has to be available before the rest of the file is read.
+
+Example:
+    $ pytest test_query_stream.py
+"""
+import io
+from logparser.log_file_parser import LogFileParser
+from logparser.query_stream import iter_queries
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def test_iter_queries_splits_every_query():
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+
+    assert [record.query_id for record in records] == ["hive_20200501144051_33d3f99c-b08a-45f2-a2af-4710568dacce",
+                                                       "hive_20200501150000_0a1b2c3d-0000-4000-8000-000000000002",
+                                                       None]
+    assert [record.line_idx for record in records] == [1, 55, 90]
+
+    second = records[1]
+    assert second.query_summary == {'Compile Query': '1.10', 'Prepare Plan': '2.20', 'Get Query Coordinator (AM)': '0.00',
+                                    'Submit Plan': '0.30', 'Start DAG': '0.40', 'Run DAG': '12.50'}
+    assert second.task_summary == {'Map 1': {'DURATION': 10000.0, 'CPU_TIME': 20000.0, 'GC_TIME': 100.0, 'INPUT_RECORDS': 50000.0, 'OUTPUT_RECORDS': 10.0},
+                                   'Reducer 2': {'DURATION': 2000.0, 'CPU_TIME': 3000.0, 'GC_TIME': 10.0, 'INPUT_RECORDS': 10.0, 'OUTPUT_RECORDS': 1.0}}
+    assert second.detailed_summary == {'org.apache.tez.common.counters.DAGCounter': {'NUM_SUCCEEDED_TASKS': 3.0, 'TOTAL_LAUNCHED_TASKS': 3.0}}
+    assert (second.query_errors, second.task_errors, second.detailed_errors) == ([], [], [])
+
+    # The trailing block never completed, its sections run until the end of the file
+    trailing = records[2]
+    assert trailing.query_summary == {'Compile Query': '0.50'}
+    assert trailing.task_summary is None and trailing.detailed_summary is None
+
+
+def test_first_query_matches_parse():
+    parser = LogFileParser("tests/test_data/test_log_valid.txt")
+    parser.parse()
+    record, = LogFileParser("tests/test_data/test_log_valid.txt").iter_queries()
+
+    assert (record.query_summary, record.query_errors) == (parser.query_summary, parser.query_errors)
+    assert (record.task_summary, record.task_errors) == (parser.task_summary, parser.task_errors)
+    assert (record.detailed_summary, record.detailed_errors) == (parser.detailed_summary, parser.detailed_errors)
+
+
+def test_iter_queries_is_lazy():
+    with open(PATH_TO_MULTI_QUERY_LOG, 'rb') as file:
+        content = file.read()
+    file = io.BytesIO(content)
+
+    first = next(iter_queries(file))
+
+    assert first.query_id == "hive_20200501144051_33d3f99c-b08a-45f2-a2af-4710568dacce"
+    assert file.tell() < len(content)
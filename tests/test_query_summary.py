@@ -14,6 +14,9 @@ Tests include:
 - `test_parse_incorrect_lines`: Validates the parser's ability to detect lines with corrupt structures,
   report them, and also identify any missing critical operations from the logs.
 
+- `test_long_lines`: Lines beyond `max_line_length` are read by the tokenizer, with the same results, reading every
+  character at most twice (counted, not timed, the timings are in `benchmarks/`).
+
 Usage:
     This module can be run directly or imported as part of a larger test suite.
 
@@ -30,6 +33,7 @@ Notes:
 """
 
 import re
+from logparser.line_classifier import scan_operation
 from logparser.query_summary import QuerySummary
 
 def test_parse_correct_lines():
@@ -82,3 +86,33 @@ def test_parse_incorrect_lines():
                           "Err parsing idx: 6, line: 'INFO da sdasf ffffgdhkgj'dlfl''' : INCORRECT LINE 2'. Line has corrupt structure... skipped", 
                           "Critical operation: 'Run DAG' missing in the log data."])
 
+
+def test_long_lines():
+    # A stack trace glued to a summary line, and a summary line padded beyond the limit
+    trace = "INFO  : Run DAG" + " at org apache hadoop hive ql exec Task" * 5000 + " 1.5"
+    padded = "INFO  : Run DAG" + " " * 2000 + "80.54s"
+    sample_lines = [(0, trace), (1, padded), (2, "INFO  : Start DAG                               1.45s")]
+
+    qs = QuerySummary(sample_lines)
+    assert qs.lines_scanned == 2 and qs.lines_matched == 2 and qs.lines_failed == 1
+    assert qs.data[0] == {'Run DAG': '80.54', 'Start DAG': '1.45'}
+    # The pattern gives the same results
+    assert QuerySummary(sample_lines, max_line_length=10 ** 9).data == qs.data
+
+    # Ten times the line, ten times the characters read, never more than twice each
+    short = "INFO  : Run DAG" + " at org apache hadoop hive ql exec Task" * 100 + " 1.5"
+    for line in (short, short[:15] + short[15:-4] * 10 + " 1.5", padded):
+        counting = CountingLine(line)
+        scan_operation(counting)
+        assert counting.reads <= 2 * len(line)
+        assert QuerySummary([(0, line)]).lines_scanned == 1
+
+
+class CountingLine(str):
+    # Counts the characters (and slices) the tokenizer reads
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
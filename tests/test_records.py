@@ -0,0 +1,61 @@
+"""
+Tests for the `VertexMetrics` and `CounterGroup` records from the `logparser` package.
+
+This test module ensures that the compact records returned by the parsers can be used exactly like the dictionaries
+they replace: same keys, values, equality and repr, and that they survive pickling (process pools) and the result cache.
+
+The test scenarios include:
+- `test_vertex_metrics`: Checks the mapping interface and the properties of VertexMetrics.
+
+- `test_counter_group`: Checks the mapping interface of CounterGroup and that counter names are shared between groups.
+
+- `test_parsed_records`: The parsers return records that compare and print like the former dictionaries.
+
+Example:
+    $ pytest test_records.py
+"""
+import pickle
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.records import CounterGroup, VertexMetrics
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+
+
+def test_vertex_metrics():
+    metrics = VertexMetrics(65013.0, 516890.0, 7624.0, 13119189.0, 1200.0)
+    as_dict = {'DURATION': 65013.0, 'CPU_TIME': 516890.0, 'GC_TIME': 7624.0, 'INPUT_RECORDS': 13119189.0, 'OUTPUT_RECORDS': 1200.0}
+
+    assert metrics == as_dict and as_dict == metrics
+    assert dict(metrics) == as_dict and list(metrics) == list(as_dict)
+    assert repr(metrics) == repr(as_dict)
+    assert metrics["CPU_TIME"] == metrics.cpu_time == 516890.0
+    assert VertexMetrics.from_dict(as_dict) == metrics
+    assert pickle.loads(pickle.dumps(metrics)) == metrics
+    with pytest.raises(KeyError):
+        metrics["MEMORY"]
+    with pytest.raises(AttributeError):
+        metrics.extra = 1
+
+
+def test_counter_group():
+    counters = {'NUM_SUCCEEDED_TASKS': 12.0, 'TOTAL_LAUNCHED_TASKS': 13.0}
+    group = CounterGroup.from_dict(counters)
+
+    assert group == counters and repr(group) == repr(counters)
+    assert group["TOTAL_LAUNCHED_TASKS"] == 13.0 and len(group) == 2
+    assert pickle.loads(pickle.dumps(group)) == group
+    # Groups with the same counters share their names
+    assert CounterGroup(counters, [1, 2])._keys is group._keys
+    with pytest.raises(ValueError):
+        CounterGroup(counters, [1])
+
+
+def test_parsed_records():
+    parser = LogFileParser(PATH_TO_VALID_LOG)
+    parser.parse()
+
+    assert all(isinstance(metrics, VertexMetrics) for metrics in parser.task_summary.values())
+    assert all(isinstance(group, CounterGroup) for group in parser.detailed_summary.values())
+    assert parser.task_summary['Map 3'] == {'DURATION': 6061.0, 'CPU_TIME': 66320.0, 'GC_TIME': 1237.0, 'INPUT_RECORDS': 2058.0, 'OUTPUT_RECORDS': 31.0}
+    assert "'Map 3': {'DURATION': 6061.0, 'CPU_TIME': 66320.0" in str(parser.task_summary)
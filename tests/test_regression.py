@@ -0,0 +1,136 @@
+"""
+Tests for the query regression detection of the `logparser` package (`logparser.regression`).
+
+This test module ensures that runs of the same query get the same fingerprint, that only durations beyond all the
+thresholds of the baseline are flagged, and that a baseline survives a save/load round trip and merges.
+
+The test scenarios include:
+- `test_fingerprints`: Query texts differing only in literals, comments or spacing share a fingerprint, the shape of
+  the DAG (vertices, record magnitudes, edges, phases) is used when no query text is known, but only when asked for.
+
+- `test_detects_regressions`: A slow phase and a slow vertex are flagged, jitter below `min_delta` and fingerprints
+  with too few samples are not.
+
+- `test_query_texts`: Runs are fingerprinted by their query text when `query_texts` gives it.
+
+- `test_save_load_merge`: A saved and loaded baseline, or two merged halves, give the same reference values.
+
+- `test_parsed_records`: The QueryRecords of a parsed multi-query log can be used as baseline and checked.
+
+Example:
+    $ pytest test_regression.py
+"""
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.records import VertexMetrics
+from logparser.regression import Baseline, RegressionDetector, fingerprint, normalize_query, query_fingerprint
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+
+
+def run(query_id, run_dag=80.0, compile_query=7.0, map_ms=65000.0, vertices=("Map 1", "Reducer 2"), records=1.0):
+    return {
+        "query_id": query_id,
+        "query_summary": {"Compile Query": f"{compile_query:.2f}", "Run DAG": f"{run_dag:.2f}"},
+        "task_summary": {vertex: VertexMetrics(map_ms, 1.0, 1.0, records, 1.0) for vertex in vertices},
+    }
+
+
+@pytest.fixture
+def baseline():
+    baseline = Baseline(topology=True)
+    baseline.update(run(f"q{i}", run_dag=78 + i, map_ms=64000 + 500 * i) for i in range(5))
+    return baseline
+
+
+def test_fingerprints():
+    assert normalize_query("SELECT a FROM t1 WHERE id = 42 AND s = 'x''y' -- c\nAND v IN (1, 2, 3)") == \
+        "select a from t1 where id = ? and s = ? and v in ( ? )"
+    assert query_fingerprint("select * from t where d = '2020-05-01'") == query_fingerprint("SELECT *\n  FROM t /* daily */ WHERE d='2020-05-02'")
+    assert query_fingerprint("select * from t1") != query_fingerprint("select * from t2")
+
+    # Without a query text only opting in gives a fingerprint
+    assert fingerprint(run("a")) is None
+    assert fingerprint(run("a"), "select 1").startswith("sql:") and fingerprint(run("a"), topology=True).startswith("dag:")
+    assert fingerprint({"query_summary": {}, "task_summary": None}, topology=True) is None
+
+    shape = fingerprint(run("a"), topology=True)
+    assert shape == fingerprint(run("b", vertices=("Reducer 2", "Map 1"), records=9.0), topology=True)
+    assert shape != fingerprint(run("b", vertices=("Map 1",)), topology=True)
+    # Same vertices over another order of magnitude of records, or with other phases
+    assert shape != fingerprint(run("b", records=5e6), topology=True)
+    other_phases = run("b")
+    other_phases["query_summary"]["Prepare Plan"] = "1.00"
+    assert shape != fingerprint(other_phases, topology=True)
+    # Same vertices, other edges
+    join = {"Reducer 2": [("Map 1", "SIMPLE_EDGE")]}
+    broadcast = {"Reducer 2": [("Map 1", "BROADCAST_EDGE")]}
+    assert fingerprint(run("a"), edges=join, topology=True) not in (shape, fingerprint(run("a"), edges=broadcast, topology=True))
+
+
+def test_detects_regressions(baseline):
+    detector = RegressionDetector(baseline, ratio=1.5, min_delta=5.0)
+
+    assert detector.check(run("fast")) == []
+    # 9s instead of 7s is more than 1.25x but less than min_delta longer
+    assert detector.check(run("jitter", compile_query=9.5)) == []
+
+    regressions = detector.check(run("slow", run_dag=200.0, map_ms=200000.0))
+    assert sorted((r.kind, r.name) for r in regressions) == [("phase", "Run DAG"), ("vertex", "Map 1"), ("vertex", "Reducer 2")]
+    run_dag = next(r for r in regressions if r.name == "Run DAG")
+    assert run_dag.query_id == "slow" and run_dag.samples == 5 and run_dag.reference == pytest.approx(80, rel=0.02)
+    assert run_dag.to_dict()["ratio"] == pytest.approx(2.5, rel=0.02)
+
+    assert [r.kind for r in RegressionDetector(baseline, kinds=("phase",)).check(run("slow", run_dag=200.0, map_ms=200000.0))] == ["phase"]
+    assert RegressionDetector(baseline, min_samples=6).check(run("slow", run_dag=200.0)) == []
+    # Another topology has no baseline
+    assert detector.check(run("new", run_dag=200.0, vertices=("Map 1",))) == []
+    with pytest.raises(ValueError):
+        RegressionDetector(baseline, ratio=0.5)
+
+    # A baseline without topology fingerprints does not know runs without query text
+    untyped = Baseline()
+    untyped.update(run(f"q{i}") for i in range(5))
+    assert len(untyped) == 0 and RegressionDetector(untyped).check(run("slow", run_dag=200.0)) == []
+
+
+def test_query_texts():
+    baseline = Baseline()
+    texts = {f"q{i}": f"select * from t where id = {i}" for i in range(3)}
+    baseline.update((run(f"q{i}", vertices=(f"Map {i}",)) for i in range(3)), query_texts=texts)
+    assert len(baseline) == 1
+
+    detector = RegressionDetector(baseline)
+    slow = run("slow", run_dag=300.0, vertices=("Map 9",))
+    assert detector.check(slow) == []
+    assert [r.name for r in detector.scan([slow], query_texts={"slow": "SELECT * FROM t WHERE id = 99"})] == ["Run DAG"]
+
+
+def test_save_load_merge(baseline, tmp_path):
+    path = str(tmp_path / "baseline.json")
+    baseline.save(path)
+    loaded = Baseline.load(path)
+    key = fingerprint(run("a"), topology=True)
+    assert loaded.topology and loaded.references(key) == baseline.references(key)
+
+    first, second = Baseline(topology=True), Baseline(topology=True)
+    first.update(run(f"q{i}", run_dag=78 + i, map_ms=64000 + 500 * i) for i in range(2))
+    first.references(key)
+    second.update(run(f"q{i}", run_dag=78 + i, map_ms=64000 + 500 * i) for i in range(2, 5))
+    first.merge(second)
+    assert first.references(key) == baseline.references(key)
+    with pytest.raises(ValueError):
+        first.merge(Baseline())
+
+
+def test_parsed_records():
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    baseline = Baseline(topology=True)
+    for _ in range(3):
+        baseline.update(records)
+
+    detector = RegressionDetector(baseline)
+    assert list(detector.scan(records)) == []
+    slow = records[0].to_dict()
+    slow["query_summary"] = dict(slow["query_summary"], **{"Run DAG": "500.00"})
+    assert [r.name for r in detector.check(slow)] == ["Run DAG"]
@@ -0,0 +1,132 @@
+"""
+Tests for the `ResultCache` class from the `logparser` package.
+
+This test module ensures that a log file parsed before is not read again when a result cache is used, that the
+cached results and warnings are the same as those of a fresh parse and that the cache stays within its size bound.
+
+The test scenarios include:
+- `test_cache_hit`: A second parse returns the cached results (and warnings) without reading the log file.
+
+- `test_changed_log_file`: A modified log file is parsed again instead of using the stale entry.
+
+- `test_invalidate_and_clear`: Removing entries makes the next parse read the log file again.
+
+- `test_eviction`: The least recently used entries are evicted beyond max_bytes.
+
+Example:
+    $ pytest test_result_cache.py
+"""
+import os
+import shutil
+import warnings
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.result_cache import RESULT_FIELDS, ResultCache
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_SEMIVALID_LOG = "tests/test_data/test_log_semivalid.txt"
+
+
+def results_of(parser):
+    return {field: getattr(parser, field) for field in RESULT_FIELDS}
+
+
+def parse_counting_reads(parser, monkeypatch):
+    # Counts how often the log file itself gets parsed, a cache hit must not parse it at all
+    calls = []
+    original = LogFileParser._parse
+    monkeypatch.setattr(LogFileParser, "_parse", lambda self, *args: calls.append(1) or original(self, *args))
+    parser.parse()
+    monkeypatch.undo()
+    return len(calls)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    log_file_path = tmp_path / "hive.log"
+    shutil.copy(PATH_TO_SEMIVALID_LOG, log_file_path)
+    return str(log_file_path)
+
+
+def test_cache_hit(log_file, tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    with warnings.catch_warnings(record=True) as first_warnings:
+        warnings.simplefilter("always")
+        first = LogFileParser(log_file, cache=cache)
+        assert parse_counting_reads(first, monkeypatch) == 1
+
+    with warnings.catch_warnings(record=True) as second_warnings:
+        warnings.simplefilter("always")
+        second = LogFileParser(log_file, cache=cache)
+        assert parse_counting_reads(second, monkeypatch) == 0
+
+    uncached = LogFileParser(log_file)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        uncached.parse()
+
+    assert results_of(first) == results_of(second) == results_of(uncached)
+    assert [str(w.message) for w in second_warnings] == [str(w.message) for w in first_warnings]
+    assert any("Headers not found" in str(w.message) for w in second_warnings)
+
+    # use_cache=False always reads the log file
+    calls = []
+    original = LogFileParser._parse
+    monkeypatch.setattr(LogFileParser, "_parse", lambda self, *args: calls.append(1) or original(self, *args))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        LogFileParser(log_file, cache=cache).parse(use_cache=False)
+    assert calls == [1]
+
+
+def test_changed_log_file(log_file, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        LogFileParser(log_file, cache=cache).parse()
+
+    shutil.copy(PATH_TO_VALID_LOG, log_file)
+    parser = LogFileParser(log_file, cache=cache)
+    parser.parse()
+
+    assert parser.query_summary["Run DAG"] == '80.54'
+    assert parser.task_summary is not None and parser.detailed_summary is not None
+
+
+def test_invalidate_and_clear(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    LogFileParser(PATH_TO_VALID_LOG, cache=cache).parse()
+    assert cache.get(PATH_TO_VALID_LOG) is not None
+
+    cache.invalidate(PATH_TO_VALID_LOG)
+    assert cache.get(PATH_TO_VALID_LOG) is None
+    assert parse_counting_reads(LogFileParser(PATH_TO_VALID_LOG, cache=cache), monkeypatch) == 1
+
+    cache.clear()
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    log_files = []
+    for i in range(3):
+        log_file_path = str(tmp_path / f"hive{i}.log")
+        with open(PATH_TO_VALID_LOG) as src, open(log_file_path, 'w') as dst:
+            dst.write(src.read() + "INFO  : padding\n" * i)
+        log_files.append(log_file_path)
+
+    LogFileParser(log_files[0], cache=cache).parse()
+    entry_size = sum(os.path.getsize(tmp_path / "cache" / name) for name in os.listdir(tmp_path / "cache"))
+    # Room for two entries only
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+
+    LogFileParser(log_files[1], cache=cache).parse()
+    # Make the first entry the most recently used one, so the second one is evicted next
+    os.utime(os.path.join(cache.cache_dir, f"{cache.key_for(log_files[1])}.json"), ns=(0, 0))
+    assert cache.get(log_files[0]) is not None
+    LogFileParser(log_files[2], cache=cache).parse()
+
+    assert cache.get(log_files[0]) is not None
+    assert cache.get(log_files[1]) is None
+    assert cache.get(log_files[2]) is not None
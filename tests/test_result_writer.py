@@ -0,0 +1,101 @@
+"""
+Tests for the atomic result writing of the `logparser` package (`logparser.result_writer`).
+
+This test module ensures that the result files are replaced atomically, with the usual file permissions and without
+leaving temporary files behind, and that the sharded layout gives every log file its own output directory.
+
+The test scenarios include:
+- `test_atomic_write`: A file is replaced as a whole, a failed write leaves the old file and no temporary file.
+
+- `test_concurrent_saves`: Processes saving into the same output directory at the same time only ever leave complete files.
+
+- `test_shard_dir`: Log files with the same name get different, stable directories in the sharded layout.
+
+- `test_sharded_batch_run`: `run-logparser --shard` saves every input into its own sharded directory.
+
+Example:
+    $ pytest test_result_writer.py
+"""
+import os
+import shutil
+import stat
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.result_writer import ResultWriter, atomic_write, shard_dir
+from logparser.run_parser import main
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+
+
+def test_atomic_write(tmp_path):
+    path = str(tmp_path / "summary.txt")
+    assert atomic_write(path, "first") == 5
+    atomic_write(path, "second")
+    with open(path) as f:
+        assert f.read() == "second"
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+    class Unwritable:
+        pass
+
+    with pytest.raises(TypeError):
+        atomic_write(path, Unwritable())
+    with open(path) as f:
+        assert f.read() == "second"
+    assert os.listdir(tmp_path) == ["summary.txt"]
+
+    writer = ResultWriter(str(tmp_path / "out"))
+    writer.write(os.path.join("Summaries", "a.txt"), "abc")
+    assert writer.bytes_written == 3
+    writer.remove(os.path.join("Summaries", "a.txt"))
+    writer.remove(os.path.join("Summaries", "a.txt"))
+    assert os.listdir(tmp_path / "out" / "Summaries") == []
+
+
+def save(log_file_path, output_dir):
+    parser = LogFileParser(log_file_path)
+    parser.parse()
+    for _ in range(20):
+        parser.save(output_dir)
+
+
+def test_concurrent_saves(tmp_path):
+    expected_dir = str(tmp_path / "expected")
+    save(PATH_TO_VALID_LOG, expected_dir)
+
+    output_dir = str(tmp_path / "shared")
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(save, [PATH_TO_VALID_LOG] * 4, [output_dir] * 4))
+
+    for sub_dir in ["Summaries", "ParserLogs"]:
+        # No temporary file is left behind and every file is complete
+        assert sorted(os.listdir(os.path.join(output_dir, sub_dir))) == sorted(os.listdir(os.path.join(expected_dir, sub_dir)))
+        for name in os.listdir(os.path.join(expected_dir, sub_dir)):
+            with open(os.path.join(output_dir, sub_dir, name)) as f, open(os.path.join(expected_dir, sub_dir, name)) as expected:
+                assert f.read() == expected.read()
+
+
+def test_shard_dir(tmp_path):
+    first = shard_dir("out", "/logs/day1/hive.log")
+    second = shard_dir("out", "/logs/day2/hive.log")
+
+    assert first != second and first == shard_dir("out", "/logs/day1/../day1/hive.log")
+    shard, name = os.path.relpath(first, "out").split(os.sep)
+    assert len(shard) == 2 and name.startswith("hive.log-")
+
+
+def test_sharded_batch_run(tmp_path):
+    for sub_dir in ["day1", "day2"]:
+        os.makedirs(tmp_path / "logs" / sub_dir)
+        shutil.copy(PATH_TO_VALID_LOG, tmp_path / "logs" / sub_dir / "hive.log")
+    output_dir = str(tmp_path / "results")
+
+    assert main([str(tmp_path / "logs"), "-o", output_dir, "-j", "2", "--shard"]) == 0
+
+    for sub_dir in ["day1", "day2"]:
+        result_dir = shard_dir(output_dir, str(tmp_path / "logs" / sub_dir / "hive.log"))
+        with open(os.path.join(result_dir, "Summaries", "query_summary.txt")) as f:
+            assert "'Run DAG': '80.54'" in f.read()
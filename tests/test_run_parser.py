@@ -0,0 +1,61 @@
+"""
+Tests for the `run-logparser` command line entry point (`logparser.run_parser`).
+
+This test module ensures that batches of log files given as files, directories or glob patterns are parsed,
+that every input gets its own output directory and that failures and throughput are reported.
+
+The test scenarios include:
+- `test_expand_inputs`: Checks the expansion of files, directories and glob patterns.
+
+- `test_batch_run`: Runs the CLI on a batch of inputs (with a process pool and without) and checks the outputs.
+
+Example:
+    $ pytest test_run_parser.py
+"""
+import os
+import shutil
+import pytest
+from logparser.run_parser import expand_inputs, main
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_INVALID_LOG = "tests/test_data/test_log_invalid.txt"
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    # Two log files with the same name in different directories plus one log file without any header
+    for sub_dir in ["day1", "day2"]:
+        os.makedirs(tmp_path / "logs" / sub_dir)
+        shutil.copy(PATH_TO_VALID_LOG, tmp_path / "logs" / sub_dir / "hive.log")
+    shutil.copy(PATH_TO_INVALID_LOG, tmp_path / "logs" / "broken.log")
+    return tmp_path / "logs"
+
+
+def test_expand_inputs(log_dir):
+    day1 = str(log_dir / "day1" / "hive.log")
+    day2 = str(log_dir / "day2" / "hive.log")
+    broken = str(log_dir / "broken.log")
+
+    assert expand_inputs([str(log_dir)]) == sorted([day1, day2, broken])
+    assert expand_inputs([str(log_dir / "**" / "hive.log")]) == [day1, day2]
+    assert expand_inputs([broken, broken, str(log_dir / "nothing*")]) == [broken]
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_batch_run(log_dir, tmp_path, capsys, workers):
+    output_dir = tmp_path / "results"
+
+    exit_code = main([str(log_dir), "-o", str(output_dir), "-j", workers])
+
+    out = capsys.readouterr().out
+    assert exit_code == 1
+    assert f"FAILED {log_dir / 'broken.log'}: No headers found in the log file." in out
+    assert "Parsed 2/3 files" in out and "files/s" in out and "MB/s" in out
+
+    # Same file names get disambiguated output directories, the results of one input never overwrite another
+    result_dirs = sorted(os.listdir(output_dir))
+    assert len(result_dirs) == 2 and all(name.startswith("hive.log-") for name in result_dirs)
+    for name in result_dirs:
+        with open(output_dir / name / "Summaries" / "query_summary.txt") as f:
+            assert "'Run DAG': '80.54'" in f.read()
+        assert os.path.exists(output_dir / name / "ParserLogs" / "parser_error_logs.txt")
@@ -0,0 +1,135 @@
+"""
+Tests for the section registry of the `logparser` package (`logparser.section_registry`).
+
+This test module ensures that a section registered next to the three built-in ones is collected in the same single
+search and pass over the log file, parsed by its own handler and saved with the other summaries, without changing
+the results of the built-in sections.
+
+The test scenarios include:
+- `test_extra_section`: An `LLAP IO Summary` section is parsed in both modes, with one header search or one stream pass.
+
+- `test_extra_section_lazy_after_cache_hit`: A cached parse only holds the built-in sections, the extra one is read
+  from the log file on first access.
+
+- `test_save_extra_section`: save() writes the summary and errors of the extra section next to the others.
+
+- `test_invalid_registrations`: Duplicate names or headers and malformed definitions raise a ValueError.
+
+Example:
+    $ pytest test_section_registry.py
+"""
+import os
+import pytest
+from logparser.error_collector import TASK_CORRUPT_LINE, ErrorCollector
+from logparser.log_file_parser import LogFileParser
+from logparser.result_cache import ResultCache
+from logparser.section_registry import DEFAULT_REGISTRY, SectionRegistry
+from logparser.section_stream import SECTION_END
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+
+LLAP_HEADER = "INFO  : LLAP IO Summary"
+LLAP_SECTION = f"""{LLAP_HEADER}
+INFO  : ----------------------------------------------------------------------------------------------
+INFO  :   VERTICES ROWGROUPS  META_HIT  META_MISS  DATA_HIT  DATA_MISS
+INFO  : ----------------------------------------------------------------------------------------------
+INFO  :      Map 1       1234       100          5      2048       1024
+INFO  :      Map 3   corrupt
+INFO  : ----------------------------------------------------------------------------------------------
+"""
+
+
+class LlapIoSummary:
+    def __init__(self, lines):
+        self.lines_matched = self.lines_failed = 0
+        summary, errors = {}, ErrorCollector()
+        for idx, line in lines:
+            fields = line[len("INFO  : "):].split()
+            if len(fields) == 7:
+                summary[" ".join(fields[:2])] = [int(value) for value in fields[2:]]
+                self.lines_matched += 1
+            else:
+                errors.add(TASK_CORRUPT_LINE, idx, line)
+                self.lines_failed += 1
+        self.data = summary, errors
+
+
+@pytest.fixture
+def registry():
+    registry = DEFAULT_REGISTRY.copy()
+    registry.register("llap_io_summary", LLAP_HEADER, 3, SECTION_END, LlapIoSummary)
+    return registry
+
+
+@pytest.fixture
+def log_file_path(tmp_path):
+    with open(PATH_TO_VALID_LOG) as file:
+        lines = file.read().split("\n")
+    # Right after the Task Execution Summary
+    path = tmp_path / "llap.log"
+    path.write_text("\n".join(lines[:30]) + "\n" + LLAP_SECTION + "\n".join(lines[30:]))
+    return str(path)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_extra_section(registry, log_file_path, stream):
+    parser = LogFileParser(log_file_path, stream=stream, stats=True, registry=registry)
+    parser.parse()
+    plain_parser = LogFileParser(log_file_path, stream=stream)
+    plain_parser.parse()
+
+    summary, errors = parser.section_data("llap_io_summary")
+    assert summary == {"Map 1": [1234, 100, 5, 2048, 1024]}
+    assert errors.counts == {TASK_CORRUPT_LINE: 1} and errors[0].startswith("Err parsing idx: 36,")
+    assert parser._header_idxs[LLAP_HEADER] == 31
+
+    # The built-in sections are unaffected
+    assert (parser.task_summary, parser.task_errors) == (plain_parser.task_summary, plain_parser.task_errors)
+    assert (parser.detailed_summary, parser.detailed_errors) == (plain_parser.detailed_summary, plain_parser.detailed_errors)
+    # One search for all headers (or one pass over the file)
+    read_stage = "stream_lines" if stream else "extract_headers"
+    assert parser.stats.stages[read_stage].calls == 1
+    assert parser.stats.stages["llap_io_summary"].matched == 1
+
+    with pytest.raises(ValueError, match="Unknown section: hive_counters"):
+        parser.section_data("hive_counters")
+
+
+def test_extra_section_lazy_after_cache_hit(registry, log_file_path, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    LogFileParser(log_file_path, cache=cache, registry=registry).parse()
+
+    parser = LogFileParser(log_file_path, cache=cache, stats=True, registry=registry)
+    parser.parse()
+    assert "extract_headers" not in parser.stats.stages
+
+    assert parser.section_data("llap_io_summary")[0] == {"Map 1": [1234, 100, 5, 2048, 1024]}
+    assert parser.stats.stages["extract_headers"].calls == 1
+
+
+def test_save_extra_section(registry, log_file_path, tmp_path):
+    parser = LogFileParser(log_file_path, registry=registry)
+    parser.parse()
+    parser.save(str(tmp_path))
+
+    with open(tmp_path / "Summaries" / "llap_io_summary.txt") as f:
+        assert f.read() == "{'Map 1': [1234, 100, 5, 2048, 1024]}"
+    with open(tmp_path / "ParserLogs" / "parser_error_logs.txt") as f:
+        assert "llap_io_summary Errors:\n===============================\nErr parsing idx: 36," in f.read()
+
+    parser.delete(str(tmp_path))
+    assert not os.path.exists(tmp_path / "Summaries" / "llap_io_summary.txt")
+
+
+def test_invalid_registrations(registry):
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register("llap_io_summary", "INFO  : Other", 3, SECTION_END, LlapIoSummary)
+    with pytest.raises(ValueError, match="already registered by section 'llap_io_summary'"):
+        registry.register("other", LLAP_HEADER, 3, SECTION_END, LlapIoSummary)
+    with pytest.raises(ValueError, match="offset"):
+        SectionRegistry().register("other", "INFO  : Other", -2, SECTION_END, LlapIoSummary)
+    with pytest.raises(ValueError, match="single line"):
+        SectionRegistry().register("other", "INFO  : Other\n", 3, SECTION_END, LlapIoSummary)
+
+    registry.unregister("llap_io_summary")
+    assert registry.names == DEFAULT_REGISTRY.names == ("query_summary", "task_summary", "detailed_summary")
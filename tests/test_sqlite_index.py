@@ -0,0 +1,161 @@
+"""
+Tests for the SQLite index of parsed queries (`logparser.sqlite_index`).
+
+This test module ensures that every query of a log file ends up in the database with its summaries, that indexing a
+file again replaces its queries, that the lookups use the indexes and that the CLI fills the database.
+
+The test scenarios include:
+- `test_add_file`: All queries of a multi-query log with their operations, vertices and counters.
+
+- `test_reindex_replaces`: Indexing the same file twice keeps a single copy of its queries.
+
+- `test_slow_queries_use_index`: The "Run DAG > 60s since ..." lookup and the queryId lookup are index searches.
+
+- `test_add_records_in_batches`: QueryRecords of another source are written in batches.
+
+- `test_add_records`: A file is indexed from QueryRecords the caller already has, and is then current.
+
+- `test_parse_outside_transaction`: The records are all read before add_file() takes the write lock of the database.
+
+- `test_cli_sqlite`: `run-logparser --sqlite` indexes every input, also from several worker processes.
+
+- `test_cli_skips_indexed`: A second run does not index the unchanged files again, a changed file is indexed again.
+
+Example:
+    $ pytest test_sqlite_index.py
+"""
+import os
+import shutil
+import sqlite3
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.run_parser import main
+from logparser.sqlite_index import SQLiteIndex, query_start
+
+PATH_TO_MULTI_QUERY_LOG = "tests/test_data/test_log_multi_query.txt"
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+PATH_TO_SEMIVALID_LOG = "tests/test_data/test_log_semivalid.txt"
+
+
+def test_add_file(tmp_path):
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    with SQLiteIndex(str(tmp_path / "queries.db")) as index:
+        assert index.add_file(PATH_TO_MULTI_QUERY_LOG) == len(records)
+
+        rows = index.execute("SELECT query_id, line_idx, byte_offset, started_at FROM queries ORDER BY seq").fetchall()
+        assert rows == [(record.query_id, record.line_idx, record.offset, query_start(record.query_id)) for record in records]
+        assert rows[0][3] == "2020-05-01 14:40:51"
+
+        second = records[1]
+        operations = dict(index.execute("SELECT operation, seconds FROM operations WHERE seq = 1").fetchall())
+        assert operations == {operation: float(seconds) for operation, seconds in second.query_summary.items()}
+        vertices = index.execute("SELECT vertex, vertex_type, duration, output_records FROM vertices WHERE seq = 1 ORDER BY vertex").fetchall()
+        assert vertices == [("Map 1", "Map", 10000.0, 10.0), ("Reducer 2", "Reducer", 2000.0, 1.0)]
+        counters = index.execute("SELECT COUNT(*) FROM counters").fetchone()[0]
+        assert counters == sum(len(group) for record in records for group in (record.detailed_summary or {}).values())
+
+
+def test_reindex_replaces(tmp_path):
+    path = str(tmp_path / "queries.db")
+    with SQLiteIndex(path) as index:
+        first = index.add_file(PATH_TO_MULTI_QUERY_LOG)
+    with SQLiteIndex(path) as index:
+        index.add_file(PATH_TO_MULTI_QUERY_LOG)
+        assert index.execute("SELECT COUNT(*) FROM queries").fetchone()[0] == first
+        assert index.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 1
+        assert index.execute("SELECT path FROM files").fetchone()[0] == os.path.abspath(PATH_TO_MULTI_QUERY_LOG)
+
+
+def test_slow_queries_use_index(tmp_path):
+    with SQLiteIndex(str(tmp_path / "queries.db")) as index:
+        index.add_file(PATH_TO_MULTI_QUERY_LOG)
+        index.add_file(PATH_TO_VALID_LOG)
+
+        slow = index.slow_queries("Run DAG", 60)
+        assert slow and all(seconds >= 60 for *_, seconds in slow)
+        assert [seconds for *_, seconds in slow] == sorted((seconds for *_, seconds in slow), reverse=True)
+        assert index.slow_queries("Run DAG", 60, since="2030-01-01") == []
+        assert {query_id for query_id, *_ in index.slow_queries("Run DAG", 10)} >= {query_id for query_id, *_ in slow}
+
+        plan = " ".join(row[-1] for row in index.execute("EXPLAIN QUERY PLAN SELECT * FROM operations WHERE operation = 'Run DAG' AND seconds >= 60"))
+        assert "operations_seconds" in plan
+        plan = " ".join(row[-1] for row in index.execute("EXPLAIN QUERY PLAN SELECT * FROM queries WHERE query_id = 'x'"))
+        assert "queries_query_id" in plan
+        plan = " ".join(row[-1] for row in index.execute("EXPLAIN QUERY PLAN SELECT * FROM vertices WHERE vertex_type = 'Map'"))
+        assert "vertices_vertex" in plan
+
+
+def test_add_records_in_batches(tmp_path):
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    with SQLiteIndex(str(tmp_path / "queries.db"), batch_size=2) as index:
+        for record in records * 2:
+            index.add(record, file="hs2-host-1")
+        # An even number of records makes only complete batches of 2, all written already, so a second connection sees them
+        with SQLiteIndex(str(tmp_path / "queries.db")) as other:
+            assert other.execute("SELECT COUNT(*) FROM queries").fetchone()[0] == 2 * len(records)
+        seqs = [seq for seq, in index.execute("SELECT seq FROM queries ORDER BY seq")]
+        assert seqs == list(range(len(records) * 2))
+
+
+def test_add_records(tmp_path):
+    records = list(LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries())
+    with SQLiteIndex(str(tmp_path / "queries.db")) as index:
+        assert not index.is_current(PATH_TO_MULTI_QUERY_LOG)
+        assert index.add_file(PATH_TO_MULTI_QUERY_LOG, records) == len(records)
+        assert index.is_current(PATH_TO_MULTI_QUERY_LOG)
+        query_ids = [query_id for query_id, in index.execute("SELECT query_id FROM queries ORDER BY seq")]
+        assert query_ids == [record.query_id for record in records]
+
+
+def test_parse_outside_transaction(tmp_path):
+    path = str(tmp_path / "queries.db")
+
+    def records():
+        # Another writer gets the lock right away while the records are still being read
+        for record in LogFileParser(PATH_TO_MULTI_QUERY_LOG).iter_queries():
+            other = sqlite3.connect(path, timeout=0)
+            other.execute("BEGIN IMMEDIATE")
+            other.rollback()
+            other.close()
+            yield record
+
+    with SQLiteIndex(path) as index:
+        index.add_file(PATH_TO_VALID_LOG)
+        assert index.add_file(PATH_TO_MULTI_QUERY_LOG, records()) == 3
+        assert index.execute("SELECT COUNT(*) FROM queries").fetchone()[0] == 4
+
+
+@pytest.mark.filterwarnings("ignore:Headers not found", "ignore:Header:")
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_cli_sqlite(tmp_path, workers):
+    path = str(tmp_path / "queries.db")
+    exit_code = main([PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, PATH_TO_MULTI_QUERY_LOG, "-o", str(tmp_path / "results"),
+                      "-j", workers, "--sqlite", path])
+
+    assert exit_code == 0
+    with SQLiteIndex(path) as index:
+        paths = {path for path, in index.execute("SELECT path FROM files")}
+        assert paths == {os.path.abspath(p) for p in (PATH_TO_VALID_LOG, PATH_TO_SEMIVALID_LOG, PATH_TO_MULTI_QUERY_LOG)}
+        assert index.execute("SELECT COUNT(DISTINCT file_id) FROM queries").fetchone()[0] == 3
+
+
+@pytest.mark.filterwarnings("ignore:Header:")
+def test_cli_skips_indexed(tmp_path):
+    log = tmp_path / "hive.log"
+    shutil.copy(PATH_TO_MULTI_QUERY_LOG, log)
+    path = str(tmp_path / "queries.db")
+    arguments = [str(log), "-o", str(tmp_path / "results"), "--sqlite", path]
+
+    assert main(arguments) == 0
+    with SQLiteIndex(path) as index:
+        indexed_at, queries = index.execute("SELECT indexed_at, (SELECT COUNT(*) FROM queries) FROM files").fetchone()
+    assert main(arguments) == 0
+    with SQLiteIndex(path) as index:
+        assert index.execute("SELECT indexed_at, (SELECT COUNT(*) FROM queries) FROM files").fetchone() == (indexed_at, queries)
+
+    with open(log, "a") as f:
+        f.write("INFO  : Completed executing command(queryId=hive_20200502000000_x); Time taken: 1.0 seconds\n")
+    assert main(arguments) == 0
+    with SQLiteIndex(path) as index:
+        # The trailing unfinished query is now completed by the appended line
+        assert index.execute("SELECT COUNT(*) FROM queries WHERE query_id = 'hive_20200502000000_x'").fetchone()[0] == 1
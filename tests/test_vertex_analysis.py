@@ -0,0 +1,131 @@
+"""
+Tests for the vertex analysis of the `logparser` package (`logparser.vertex_analysis`).
+
+This test module ensures that the derived metrics of every vertex are computed from its Task Execution Summary row, that
+the edges of the DAG are rebuilt from the vertex dependency lines of a logged plan and that the critical path follows them.
+
+The test scenarios include:
+- `test_derived_metrics`: The CPU ratio, GC share, records per second and record ratio of the vertices of the valid log.
+
+- `test_plan_section`: With `DAG_PLAN_SECTION` registered the plan lines of a log give the edges, fan-in/out and critical path.
+
+- `test_plan_per_query`: iter_queries() collects the plan of every query with it and VertexTable.extend() uses it.
+
+- `test_critical_path`: The longest chain of dependent vertices, with plan only vertices and cycles.
+
+- `test_batch`: A VertexTable over many queries keeps every row and ranks them by any column.
+
+Example:
+    $ pytest test_vertex_analysis.py
+"""
+import math
+import pytest
+from logparser.log_file_parser import LogFileParser
+from logparser.section_registry import DEFAULT_REGISTRY
+from logparser.vertex_analysis import DAG_PLAN_SECTION, VertexTable, analyze, critical_path, parse_edges
+
+PATH_TO_VALID_LOG = "tests/test_data/test_log_valid.txt"
+
+PLAN = """INFO  : Vertex dependency in root stage
+INFO  : Map 1 <- Map 3 (BROADCAST_EDGE), Map 4 (BROADCAST_EDGE)
+INFO  : Reducer 2 <- Map 1 (SIMPLE_EDGE)
+INFO  : Reducer 34 <- Map 3 (CUSTOM_SIMPLE_EDGE)
+INFO  :
+INFO  : Stage-0
+"""
+
+
+def test_derived_metrics():
+    parser = LogFileParser(PATH_TO_VALID_LOG)
+    parser.parse()
+    analysis = analyze(parser)
+
+    map_1 = analysis["Map 1"]
+    assert map_1["CPU_RATIO"] == pytest.approx(516890 / 65013)
+    assert map_1["GC_SHARE"] == pytest.approx(7624 / 516890)
+    assert map_1["RECORDS_PER_SECOND"] == pytest.approx(13119189 / 65.013)
+    assert map_1["RECORD_RATIO"] == pytest.approx(1200 / 13119189)
+    # Without a plan there are no edges
+    assert math.isnan(map_1["FAN_IN"]) and math.isnan(map_1["CRITICAL"])
+    # No input records, no ratio
+    assert analysis["Reducer 2"]["RECORD_RATIO"] == pytest.approx(0.0)
+
+
+def test_plan_section(tmp_path):
+    with open(PATH_TO_VALID_LOG) as f:
+        log = f.read()
+    path = tmp_path / "plan.log"
+    path.write_text(PLAN + log)
+    registry = DEFAULT_REGISTRY.copy()
+    registry.add(DAG_PLAN_SECTION)
+
+    for stream in (False, True):
+        parser = LogFileParser(str(path), stream=stream, registry=registry)
+        parser.parse()
+        edges, errors = parser.section_data("dag_plan")
+        assert edges == {"Map 1": [("Map 3", "BROADCAST_EDGE"), ("Map 4", "BROADCAST_EDGE")],
+                         "Reducer 2": [("Map 1", "SIMPLE_EDGE")],
+                         "Reducer 34": [("Map 3", "CUSTOM_SIMPLE_EDGE")]}
+        assert errors == []
+
+        analysis = analyze(parser, edges)
+        assert analysis["Map 1"]["FAN_IN"] == 2 and analysis["Map 1"]["FAN_OUT"] == 1
+        assert analysis["Map 3"]["FAN_IN"] == 0 and analysis["Map 3"]["FAN_OUT"] == 2
+        assert [vertex for vertex, row in analysis.items() if row["CRITICAL"]] == ["Map 1", "Map 4", "Reducer 2"]
+
+
+def test_plan_per_query(tmp_path):
+    with open(PATH_TO_VALID_LOG) as f:
+        log = f.read()
+    # The first query has a plan, the second one does not
+    path = tmp_path / "plans.log"
+    path.write_text(PLAN + log + log.replace("hive_20200501144051", "hive_20200501144052"))
+    registry = DEFAULT_REGISTRY.copy()
+    registry.add(DAG_PLAN_SECTION)
+
+    records = list(LogFileParser(str(path), registry=registry).iter_queries())
+    assert len(records) == 2
+    first, second = records
+    assert first.sections["dag_plan"][0] == parse_edges(PLAN.splitlines())
+    assert second.section_data("dag_plan") == (None, None)
+    assert first.to_dict()["dag_plan"] == first.sections["dag_plan"][0]
+    assert first.section_data("task_summary") == (first.task_summary, first.task_errors)
+
+    table = VertexTable()
+    table.extend(records)
+    assert list(table.critical_paths) == [first.query_id]
+    assert table.critical_paths[first.query_id] == (["Map 4", "Map 1", "Reducer 2"], 7088 + 65013 + 40112)
+
+    # Without the section registered the records stay as before
+    plain = list(LogFileParser(str(path)).iter_queries())
+    assert plain[0].sections == {} and "dag_plan" not in plain[0].to_dict()
+
+
+def test_critical_path():
+    summary = {"Map 1": {"DURATION": 10.0}, "Map 2": {"DURATION": 30.0}, "Reducer 3": {"DURATION": 5.0}}
+    edges = parse_edges(["Union 4 <- Map 1 (CONTAINS), Map 2 (CONTAINS)", "Reducer 3 <- Union 4 (SIMPLE_EDGE)", "Stage-0"])
+
+    assert critical_path(summary, edges) == (["Map 2", "Union 4", "Reducer 3"], 35.0)
+    assert critical_path(summary, None) == (None, None)
+    with pytest.warns(UserWarning):
+        assert critical_path(summary, parse_edges(["Map 1 <- Map 2 (SIMPLE_EDGE)", "Map 2 <- Map 1 (SIMPLE_EDGE)"])) == (None, None)
+
+
+def test_batch():
+    parser = LogFileParser(PATH_TO_VALID_LOG)
+    parser.parse()
+    records = [{"query_id": f"q{i}", "task_summary": parser.task_summary} for i in range(100)]
+    edges = parse_edges(PLAN.splitlines())
+
+    table = VertexTable()
+    table.extend(records, plans={"q7": edges})
+    assert len(table) == 500 and table.results == 100
+    assert list(table.critical_paths) == ["q7"]
+    assert table.critical_paths["q7"] == (["Map 4", "Map 1", "Reducer 2"], 7088 + 65013 + 40112)
+
+    top = table.top("GC_SHARE", 3)
+    assert [row["vertex"] for row in top] == ["Map 4"] * 3
+    # Only the query with a plan has a fan-in
+    assert [row["query"] for row in table.top("FAN_IN", 5)][:1] == ["q7"]
+    with pytest.raises(ValueError):
+        table.column("NOPE")